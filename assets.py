@@ -0,0 +1,72 @@
+import asyncio
+import logging
+
+from telegram.error import BadRequest
+
+from metrics import CACHE_LOOKUPS
+
+# ================= ASSET REGISTRY =================
+# Menu images live on postimg.cc. Sent as a URL, Telegram downloads them again on every
+# /start and menu switch (slow, and it fails whenever postimg throttles). Sent once, the
+# photo gets a file_id that can be reused forever by this bot, so we remember url -> file_id
+# and only fall back to the URL for images we haven't learned yet.
+STALE_ID_ERRORS = ("file identifier", "file_id", "wrong file", "file reference")
+
+class AssetRegistry:
+    def __init__(self, store, ttl=180 * 86400):
+        self._store = store
+        self.ttl = ttl
+        self.learned = 0
+        self.stale = 0
+
+    async def get(self, url):
+        file_id = await self._store.aget(url)
+        CACHE_LOOKUPS.inc(cache="assets", result="hit" if file_id else "miss")
+        return file_id or url
+
+    def learn(self, url, message):
+        photos = getattr(message, 'photo', None)
+        if not photos: return None
+        # Largest size last; reusing it lets Telegram serve every thumbnail itself
+        file_id = photos[-1].file_id
+        self._store.set(url, file_id, self.ttl)
+        self.learned += 1
+        return file_id
+
+    def forget(self, url):
+        self._store.delete(url)
+
+    async def send(self, url, send):
+        # send(photo) performs the actual reply_photo / edit_message_media with a file_id or URL
+        photo = await self.get(url)
+        try:
+            message = await send(photo)
+        except BadRequest as e:
+            if photo == url or not any(hint in str(e).lower() for hint in STALE_ID_ERRORS): raise
+            # A file_id Telegram no longer accepts: drop it and go through the URL once more
+            logging.warning(f"Stored file_id for {url} rejected ({e}), re-uploading")
+            self.stale += 1
+            self.forget(url)
+            photo = url
+            message = await send(photo)
+        if photo == url: self.learn(url, message)
+        return message
+
+    async def warm(self, bot, chat_id, urls, pause=1.0):
+        # Uploads every unknown image to a scratch chat once and deletes the message again
+        for url in urls:
+            if await self._store.aget(url): continue
+            try:
+                message = await bot.send_photo(chat_id=chat_id, photo=url, disable_notification=True)
+                self.learn(url, message)
+                try: await message.delete()
+                except Exception: pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Asset warm-up failed for {url}: {e!r}")
+            await asyncio.sleep(pause)
+        logging.info(f"🖼️ Asset warm-up done, {self.learned} image(s) learned")
+
+    def stats(self):
+        return {"learned": self.learned, "stale": self.stale, **self._store.stats()}
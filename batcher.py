@@ -0,0 +1,65 @@
+import time
+import asyncio
+import logging
+
+# ================= MEDIA BATCHER =================
+# Collects files that belong together (same media_group_id, or episodes of the same show
+# arriving in a burst) and hands them over as one batch once the chat goes quiet for
+# `window` seconds, the batch is full, or the first file has waited `max_wait` seconds.
+class MediaBatcher:
+    def __init__(self, flush, window=1.5, max_items=50, max_wait=6.0):
+        self._flush = flush
+        self.window = window
+        self.max_items = max_items
+        self.max_wait = max_wait
+        self._pending = {}
+        self._tasks = {}
+        self.batches = 0
+        self.items = 0
+
+    def add(self, key, item):
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = {"items": [], "timer": None, "first": time.monotonic()}
+        entry["items"].append(item)
+        if entry["timer"]: entry["timer"].cancel()
+
+        waited = time.monotonic() - entry["first"]
+        if len(entry["items"]) >= self.max_items or waited >= self.max_wait:
+            self._fire(key)
+        else:
+            delay = min(self.window, self.max_wait - waited)
+            entry["timer"] = asyncio.get_running_loop().call_later(delay, self._fire, key)
+
+    def _fire(self, key):
+        entry = self._pending.pop(key, None)
+        if not entry: return None
+        if entry["timer"]: entry["timer"].cancel()
+        self.batches += 1
+        self.items += len(entry["items"])
+        task = asyncio.create_task(self._run(key, entry["items"]))
+        self._tasks[task] = key
+        task.add_done_callback(lambda t: self._tasks.pop(t, None))
+        return task
+
+    def fire_where(self, predicate):
+        # Hands every open batch whose key matches over now; returns their flush tasks, plus
+        # those of matching batches that already fired but haven't finished flushing
+        for key in [k for k in self._pending if predicate(k)]: self._fire(key)
+        return [task for task, key in self._tasks.items() if predicate(key)]
+
+    async def _run(self, key, items):
+        try: await self._flush(key, items)
+        except Exception as e: logging.exception(f"Flushing batch {key} failed: {e!r}")
+
+    async def drain(self):
+        for key in list(self._pending): self._fire(key)
+        if self._tasks: await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self):
+        return {
+            "open_batches": len(self._pending),
+            "flushed_batches": self.batches,
+            "batched_files": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+        }
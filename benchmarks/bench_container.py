@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import probe
+import container_parser
+from container_parser import ByteRanges
+from benchmarks import media
+
+# ================= CONTAINER PARSER BENCHMARK =================
+# Native EBML/ISO-BMFF parser vs hachoir on the synthetic containers: parse time on a
+# buffer that already holds everything, and bytes the probe has to download to get an answer
+# (same range logic as production, reading from memory instead of Telegram).
+def cases():
+    return media.samples() + [
+        ("mkv_multi_audio", "mkv", media.mkv(langs=("hin", "tel", "tam", "eng"))),
+        ("mkv_tracks_far", "mkv", media.mkv(pad=1_500_000)),
+        ("mp4_hevc_tail", "mp4", media.mp4(3840, 2160, langs=("eng", "spa"), codec=b"hvc1", mdat_size=8_000_000)),
+    ]
+
+def parse_native(data):
+    ranges = ByteRanges(len(data))
+    ranges.add(0, data)
+    return container_parser.parse(ranges)
+
+def time_parse(fn, data, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs)
+
+async def probe_bytes(data, name, native):
+    requests = 0
+    async def read(start, length):
+        nonlocal requests
+        requests += 1
+        return data[start:start + length]
+    info = await probe.probe_reader(read, len(data), name, native=native)
+    return info, requests
+
+def describe(info):
+    if not info: return "—"
+    out = f"{info['width']}x{info['height']}"
+    if info.get("codec"): out += f" {info['codec']}"
+    if info.get("hdr"): out += f" {info['hdr_format']}"
+    if info.get("duration"): out += f" {info['duration']:.0f}s"
+    langs = container_parser.audio_languages(info)
+    if langs: out += " audio " + "/".join(langs)
+    return out
+
+async def run(args):
+    print(f"{'sample':<18} {'parser':<8} {'parse':>10} {'read':>10} {'requests':>8}  result")
+    failed = False
+    for name, ext, data in cases():
+        file_name = f"{name}.{ext}"
+        rows = [
+            ("native", lambda d: parse_native(d), True),
+            ("hachoir", lambda d: probe.parse_video_info(d, file_name), False),
+        ]
+        results = {}
+        for label, fn, native in rows:
+            seconds = time_parse(fn, data, args.repeat)
+            info, requests = await probe_bytes(data, file_name, native)
+            results[label] = info
+            read = f"{info['bytes_read'] / 1024:.0f} KiB" if info else "—"
+            print(f"{name:<18} {label:<8} {seconds * 1e6:8.0f}µs {read:>10} {requests:>8}  {describe(info)}")
+        native, fallback = results["native"], results["hachoir"]
+        if not native or (fallback and (native["width"], native["height"]) != (fallback["width"], fallback["height"])):
+            print(f"   ❌ native parser disagrees with hachoir on {name}")
+            failed = True
+    return 1 if failed else 0
+
+def main():
+    ap = argparse.ArgumentParser(description="Native container parser vs hachoir: parse time and bytes read")
+    ap.add_argument("--repeat", type=int, default=50, help="parse runs per sample (median is reported)")
+    args = ap.parse_args()
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
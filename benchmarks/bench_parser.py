@@ -0,0 +1,78 @@
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guessit import guessit
+
+import filename_parser
+from benchmarks import corpus
+
+# ================= FILENAME PARSER BENCHMARK =================
+# Old path: five uncompiled re.sub passes + a full guessit() per file.
+# New path: precompiled cleaners + scene fast path + memoized guessit fallback.
+COMPARED_FIELDS = ("title", "year", "season", "episode", "screen_size", "language")
+
+def legacy_pre_clean(filename):
+    f = str(filename)
+    f = re.sub(r'@[a-zA-Z0-9_]+', '', f)
+    f = re.sub(r'(?i)DA Rips', '', f)
+    f = re.sub(r'(?i)t\.me/[a-zA-Z0-9_]+', '', f)
+    f = re.sub(r'\[.*?\]', '', f)
+    f = re.sub(r'[\.\_]+', ' ', f)
+    return f.strip()
+
+def run_legacy(names):
+    for name in names: guessit(legacy_pre_clean(name))
+
+def run_new(names):
+    for name in names: filename_parser.parse_filename(filename_parser.pre_clean_filename(name))
+
+def timed(fn, names):
+    start = time.perf_counter()
+    fn(names)
+    elapsed = time.perf_counter() - start
+    return len(names) / elapsed if elapsed else float("inf")
+
+def check_agreement(names):
+    fast, agree, mismatches = 0, 0, []
+    for name in dict.fromkeys(names):
+        clean = filename_parser.pre_clean_filename(name)
+        quick = filename_parser.fast_parse(clean)
+        if quick is None: continue
+        fast += 1
+        full = filename_parser.guessit_parse(clean)
+        diff = {k: (quick.get(k), full.get(k)) for k in COMPARED_FIELDS if quick.get(k) != full.get(k)}
+        if diff: mismatches.append((name, diff))
+        else: agree += 1
+    return fast, agree, mismatches
+
+def main():
+    ap = argparse.ArgumentParser(description="Filename parsing throughput, old vs new")
+    ap.add_argument("--corpus", help="file with one real filename per line (default: generated corpus)")
+    ap.add_argument("--count", type=int, default=3000)
+    args = ap.parse_args()
+
+    names = corpus.load(args.corpus, args.count)
+    unique = len(set(names))
+    print(f"📂 {len(names)} filenames ({unique} unique)")
+
+    legacy = timed(run_legacy, names)
+    filename_parser._parse_cached.cache_clear()
+    cold = timed(run_new, names)
+    warm = timed(run_new, names)
+    print(f"⏱️  legacy (re.sub + guessit)  : {legacy:10.0f} files/sec")
+    print(f"⚡ new, cold memo            : {cold:10.0f} files/sec  ({cold / legacy:.1f}x)")
+    print(f"⚡ new, warm memo            : {warm:10.0f} files/sec  ({warm / legacy:.1f}x)")
+
+    fast, agree, mismatches = check_agreement(names)
+    print(f"🧭 fast path took {fast}/{unique} unique names ({fast / unique:.0%}), agrees with guessit on {agree}/{fast}")
+    for name, diff in mismatches[:15]:
+        print(f"   ❌ {name}: {diff}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
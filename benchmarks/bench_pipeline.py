@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import corpus
+from benchmarks.stubs import Faults, Catalogue, Stub, TelegramStub
+
+# ================= MEDIA PIPELINE LOAD TEST =================
+# Runs the real bot (handlers, batcher, scheduler, caches, probe, provider engine) against
+# local stubs and measures upload -> captioned copy latency. Pass 1 is cold (fresh files,
+# empty caches), pass 2 re-sends the same files as new messages so the caches get to work.
+METADATA_SERVICES = ("tmdb", "tvmaze", "jikan", "omdb")
+
+def percentile(values, pct):
+    if not values: return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))]
+
+def start_stubs(args):
+    fixtures = None
+    if args.fixtures:
+        with open(args.fixtures, encoding="utf-8") as f: fixtures = json.load(f)
+    catalogue = Catalogue(fixtures)
+    args.catalogue = catalogue
+    stubs = {name: Stub(name, Faults(args.api_latency, args.api_jitter, args.error_rate, args.rate_limit, seed=i), catalogue).start()
+             for i, name in enumerate(METADATA_SERVICES)}
+    stubs["telegram"] = TelegramStub(Faults(args.tg_latency, args.tg_jitter, rate_limit_rate=args.tg_flood, seed=99), chat_rate=args.tg_chat_rate).start()
+    return stubs
+
+def point_bot_at(stubs, args):
+    # Everything the bot reads at import time has to be in place before `import bot`
+    os.environ.update({
+        "BOT_TOKEN": "123456:bench",
+        "CACHE_DIR": tempfile.mkdtemp(prefix="bench-cache-"),
+        "PORT": "0",
+        "TELEGRAM_API_URL": stubs["telegram"].url,
+        "TMDB_API_URL": stubs["tmdb"].url + "/3",
+        "TVMAZE_API_URL": stubs["tvmaze"].url,
+        "JIKAN_API_URL": stubs["jikan"].url + "/v4",
+        "OMDB_API_URL": stubs["omdb"].url + "/",
+        "BATCH_WINDOW": str(args.window),
+        "BOT_WORKERS": str(max(1, args.workers)),
+    })
+    if args.title_index: build_title_index(args.catalogue, os.environ["CACHE_DIR"])
+    import http_client
+    # Give every stub the connection limits of the host it stands in for
+    real_hosts = {"tmdb": "api.themoviedb.org", "tvmaze": "api.tvmaze.com", "jikan": "api.jikan.moe",
+                  "omdb": "www.omdbapi.com", "telegram": "api.telegram.org"}
+    for name, stub in stubs.items():
+        http_client.HOST_LIMITS[f"127.0.0.1:{stub.port}"] = http_client.HOST_LIMITS[real_hosts[name]]
+
+def build_title_index(catalogue, directory):
+    import gzip
+    import title_index
+    paths = {"movie": os.path.join(directory, "movie_ids.json.gz"), "tv": os.path.join(directory, "tv_series_ids.json.gz")}
+    files = {kind: gzip.open(path, "wt", encoding="utf-8") for kind, path in paths.items()}
+    for kind, row in catalogue.tmdb_export(): files[kind].write(json.dumps(row) + "\n")
+    for f in files.values(): f.close()
+    title_index.build([(path, kind) for kind, path in paths.items()], min_popularity=0)
+
+def make_uploads(names, chats, seed):
+    rng = random.Random(seed)
+    uploads = []
+    for i, name in enumerate(names):
+        sample = rng.randrange(4)
+        uploads.append({"chat_id": 1000 + i % chats, "file_id": f"{sample}-{i}", "name": name})
+    return uploads
+
+def make_update(upload, update_id, message_id, stub):
+    _, ext, data = stub.file_for(upload["file_id"])
+    name = upload["name"].rsplit(".", 1)[0] + "." + ext
+    chat = {"id": upload["chat_id"], "type": "private", "first_name": "Bench"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": message_id, "date": int(time.time()), "chat": chat,
+            "from": {"id": upload["chat_id"], "is_bot": False, "first_name": "Bench"},
+            "document": {"file_id": upload["file_id"], "file_unique_id": "u" + upload["file_id"], "file_name": name,
+                         "file_size": len(data), "mime_type": "video/x-matroska" if ext == "mkv" else "video/mp4"},
+        },
+    }
+
+def stage_summary(metrics):
+    rows = []
+    for key, series in metrics.STAGE_SECONDS._series.items():
+        if series["count"]: rows.append((key[0], series["count"], series["sum"] / series["count"]))
+    return sorted(rows, key=lambda r: -r[1] * r[2])
+
+async def run_pass(label, app, uploads, stubs, args, first_update_id):
+    from telegram import Update
+    tg = stubs["telegram"]
+    before = {name: stub.calls.copy() for name, stub in stubs.items()}
+    pending = []
+    started = time.perf_counter()
+    interval = 1 / args.rate if args.rate else 0
+
+    for i, upload in enumerate(uploads):
+        message_id = first_update_id + i
+        update = Update.de_json(make_update(upload, first_update_id + i, message_id, tg), app.bot)
+        sent_at = time.perf_counter()
+        pending.append((sent_at, tg.wait_for(upload["chat_id"], message_id)))
+        await app.update_queue.put(update)
+        if interval: await asyncio.sleep(interval)
+
+    latencies, last_done, lost = [], started, 0
+    deadline = time.perf_counter() + args.timeout
+    for sent_at, future in pending:
+        try:
+            done_at = await asyncio.wait_for(future, max(0.01, deadline - time.perf_counter()))
+            latencies.append(done_at - sent_at)
+            last_done = max(last_done, done_at)
+        except asyncio.TimeoutError:
+            lost += 1
+    elapsed = last_done - started
+
+    delivered = len(latencies)
+    calls = {name: stub.calls - before[name] for name, stub in stubs.items()}
+    result = {
+        "pass": label,
+        "messages": len(uploads),
+        "delivered": delivered,
+        "lost": lost,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "p99_s": percentile(latencies, 99),
+        "msgs_per_s": delivered / elapsed if elapsed > 0 else 0.0,
+        "calls_per_msg": {name: round(sum(v for k, v in calls[name].items() if k not in ("429", "5xx", "bytes_served")) / max(delivered, 1), 3)
+                          for name in stubs},
+        "injected_429": sum(c["429"] for c in calls.values()),
+        "injected_5xx": sum(c["5xx"] for c in calls.values()),
+        "probe_kib_per_msg": round(calls["telegram"]["bytes_served"] / 1024 / max(delivered, 1), 1),
+    }
+    print(f"\n📊 {label}: {delivered}/{len(uploads)} captions in {elapsed:.2f}s ({result['msgs_per_s']:.1f} msgs/sec), {lost} lost")
+    print(f"   ⏱️  latency p50 {result['p50_s'] * 1000:.0f} ms | p95 {result['p95_s'] * 1000:.0f} ms | p99 {result['p99_s'] * 1000:.0f} ms")
+    print("   📡 outbound calls/msg: " + ", ".join(f"{n} {v}" for n, v in result["calls_per_msg"].items()))
+    print(f"   💥 injected: {result['injected_429']} x 429, {result['injected_5xx']} x 5xx | 📦 probe download {result['probe_kib_per_msg']} KiB/msg")
+    return result
+
+async def run(args):
+    stubs = start_stubs(args)
+    point_bot_at(stubs, args)
+    import bot
+    import metrics
+    logging.getLogger().setLevel(args.log_level.upper())
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("tornado.access").setLevel(logging.CRITICAL)
+
+    names = corpus.load(args.corpus, args.count)[:args.count]
+    uploads = make_uploads(names, args.chats, args.seed)
+    print(f"📂 {len(uploads)} uploads across {args.chats} chats | API latency {args.api_latency * 1000:.0f}+{args.api_jitter * 1000:.0f} ms, "
+          f"{args.error_rate:.0%} errors, {args.rate_limit:.0%} 429s | Telegram {args.tg_latency * 1000:.0f} ms")
+
+    pool = None
+    if args.workers > 1:
+        # Receiver + worker processes; stage timings then live in the workers (see /stats), not here
+        from cluster import WorkerPool
+        pool = WorkerPool(args.workers)
+    app = bot.build_application(updater=False, worker_pool=pool)
+    await app.initialize()
+    await bot.on_startup(app)
+    await app.start()
+    results = []
+    try:
+        results.append(await run_pass("cold", app, uploads, stubs, args, 1))
+        for n in range(1, args.passes):
+            results.append(await run_pass(f"warm #{n}", app, uploads, stubs, args, 1 + n * len(uploads)))
+    finally:
+        await app.stop()
+        await bot.on_stop(app)
+        await app.shutdown()
+        await bot.on_shutdown(app)
+        for stub in stubs.values(): stub.stop()
+
+    print("\n🔬 where the time went (all passes, mean per call):")
+    for name, count, mean in stage_summary(metrics)[:14]:
+        print(f"   {name:<18} {count:>6} x {mean * 1000:8.1f} ms")
+
+    lookups = sorted(metrics.CACHE_LOOKUPS._values.items())
+    print("🗃️  cache lookups: " + ", ".join(f"{cache} {result} {n}" for (cache, result), n in lookups))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(results, f, indent=2)
+    failed = any(r["lost"] for r in results)
+    if args.max_p95 and results[0]["p95_s"] > args.max_p95:
+        print(f"❌ cold p95 {results[0]['p95_s']:.2f}s is over the {args.max_p95}s budget")
+        failed = True
+    return 1 if failed else 0
+
+def main():
+    ap = argparse.ArgumentParser(description="End-to-end media pipeline load test against local stubs")
+    ap.add_argument("--corpus", help="file with one real filename per line (default: generated corpus)")
+    ap.add_argument("--title-index", action="store_true", help="build the offline title index over the stub catalogue first")
+    ap.add_argument("--fixtures", help="JSON of recorded responses: {service: {lower-cased query: body}}")
+    ap.add_argument("--count", type=int, default=300, help="uploads per pass")
+    ap.add_argument("--chats", type=int, default=20)
+    ap.add_argument("--workers", type=int, default=1, help="BOT_WORKERS: worker processes behind one receiver")
+    ap.add_argument("--rate", type=float, default=0, help="uploads per second (0 = all at once)")
+    ap.add_argument("--passes", type=int, default=2, help="1 cold pass + N-1 warm passes")
+    ap.add_argument("--window", type=float, default=float(os.getenv("BATCH_WINDOW", 1.5)), help="BATCH_WINDOW for the bot")
+    ap.add_argument("--api-latency", type=float, default=0.15)
+    ap.add_argument("--api-jitter", type=float, default=0.1)
+    ap.add_argument("--error-rate", type=float, default=0.02)
+    ap.add_argument("--rate-limit", type=float, default=0.02)
+    ap.add_argument("--tg-latency", type=float, default=0.03)
+    ap.add_argument("--tg-jitter", type=float, default=0.02)
+    ap.add_argument("--tg-flood", type=float, default=0.0, help="share of copyMessage/sendSticker/reactions answered with 429")
+    ap.add_argument("--tg-chat-rate", type=float, default=0, help="messages/sec per chat before the Bot API stub answers 429 (real: ~1, 0 = unlimited)")
+    ap.add_argument("--timeout", type=float, default=120, help="seconds to wait for a pass to finish")
+    ap.add_argument("--max-p95", type=float, default=0, help="fail when the cold p95 (seconds) is above this")
+    ap.add_argument("--json", help="write the per-pass results here")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--log-level", default="error")
+    args = ap.parse_args()
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
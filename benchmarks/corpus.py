@@ -0,0 +1,69 @@
+import random
+
+# ================= FILENAME CORPUS =================
+# Deterministic stand-in for the names users actually forward: real titles dressed in the
+# usual scene, fansub and Telegram-channel conventions. Pass a file with one real name per
+# line to the benchmarks instead whenever you have one.
+MOVIES = [
+    ("The Matrix", 1999), ("Inception", 2010), ("Interstellar", 2014), ("The Dark Knight", 2008),
+    ("Parasite", 2019), ("Oppenheimer", 2023), ("Dune", 2021), ("Joker", 2019), ("Avatar", 2009),
+    ("Gladiator", 2000), ("Titanic", 1997), ("The Godfather", 1972), ("Pulp Fiction", 1994),
+    ("Fight Club", 1999), ("Whiplash", 2014), ("Arrival", 2016), ("Tenet", 2020), ("Barbie", 2023),
+    ("Pathaan", 2023), ("Jawan", 2023), ("Animal", 2023), ("Dangal", 2016), ("Drishyam", 2015),
+    ("Vikram", 2022), ("Pushpa The Rise", 2021), ("Kantara", 2022), ("Leo", 2023), ("Jailer", 2023),
+    ("Train to Busan", 2016), ("Oldboy", 2003), ("The Handmaiden", 2016), ("Your Name", 2016),
+    ("Spirited Away", 2001), ("Suzume", 2022), ("Godzilla Minus One", 2023), ("Shoplifters", 2018),
+    ("Mad Max Fury Road", 2015), ("Blade Runner 2049", 2017), ("The Batman", 2022), ("Top Gun Maverick", 2022),
+]
+SHOWS = [
+    ("Breaking Bad", None), ("Game of Thrones", None), ("Stranger Things", None), ("The Boys", None),
+    ("Squid Game", None), ("Crash Landing on You", None), ("Goblin", None), ("Moving", None),
+    ("The Last of Us", None), ("House of the Dragon", None), ("Mirzapur", None), ("Panchayat", None),
+    ("Loki", 2021), ("Shogun", 2024), ("Fallout", 2024), ("The Bear", 2022), ("Severance", 2022),
+]
+ANIME = ["One Piece", "Jujutsu Kaisen", "Frieren", "Demon Slayer", "Chainsaw Man", "Spy x Family",
+         "Attack on Titan", "Bleach", "Solo Leveling", "Blue Lock"]
+
+RESOLUTIONS = ["480p", "720p", "1080p", "2160p", "4K"]
+SOURCES = ["BluRay", "WEB-DL", "WEBRip", "HDRip", "NF.WEB-DL", "AMZN.WEB-DL", "HDTV", "DSNP.WEBRip"]
+CODECS = ["x264", "x265", "HEVC", "10bit.x265", "H.264", "h264"]
+AUDIO = ["", "AAC", "DDP5.1", "AAC2.0", "Atmos", "DTS"]
+GROUPS = ["RARBG", "YIFY", "NTb", "FLUX", "GalaxyRG", "PSA", "Pahe", "TEPES"]
+LANGS = ["", "", "Hindi", "Tamil", "Telugu", "Hindi.English", "Dual.Audio.Hindi.English", "Korean", "Multi"]
+CHANNEL_TAGS = ["", "", "@DA_Rips ", "[@TheUpdatedGuys] ", "@MoviesHub_", "t.me/cinema_club ", "[TG] "]
+FANSUBS = ["SubsPlease", "Erai-raws", "Judas", "EMBER", "ASW"]
+
+def _movie(rng):
+    title, year = rng.choice(MOVIES)
+    parts = [title.replace(" ", "."), str(year), rng.choice(LANGS), rng.choice(RESOLUTIONS),
+             rng.choice(SOURCES), rng.choice(AUDIO), rng.choice(CODECS) + "-" + rng.choice(GROUPS)]
+    name = ".".join(p for p in parts if p) + rng.choice([".mkv", ".mkv", ".mp4"])
+    return rng.choice(CHANNEL_TAGS) + name
+
+def _episode(rng):
+    title, year = rng.choice(SHOWS)
+    ep = f"S{rng.randint(1, 5):02d}E{rng.randint(1, 24):02d}"
+    parts = [title.replace(" ", "."), str(year) if year else "", ep, rng.choice(LANGS), rng.choice(RESOLUTIONS),
+             rng.choice(SOURCES), rng.choice(AUDIO), rng.choice(CODECS) + "-" + rng.choice(GROUPS)]
+    return rng.choice(CHANNEL_TAGS) + ".".join(p for p in parts if p) + ".mkv"
+
+def _anime(rng):
+    title = rng.choice(ANIME)
+    style = rng.randint(0, 2)
+    if style == 0: return f"[{rng.choice(FANSUBS)}] {title} - {rng.randint(1, 1100):02d} ({rng.choice(['720p', '1080p'])}) [{rng.getrandbits(32):08X}].mkv"
+    if style == 1: return f"{title.replace(' ', '.')}.S01E{rng.randint(1, 24):02d}.1080p.WEB-DL.x264-{rng.choice(GROUPS)}.mkv"
+    return f"@Anime_Hub {title} Episode {rng.randint(1, 24)} Dual Audio 720p.mkv"
+
+def _casual(rng):
+    title, year = rng.choice(MOVIES)
+    return f"{rng.choice(CHANNEL_TAGS)}{title} ({year}) {rng.choice(['Hindi', 'Tamil', 'English', ''])} {rng.choice(RESOLUTIONS)} HDRip x264 AAC ESub.mkv"
+
+def generate(count=3000, seed=7):
+    rng = random.Random(seed)
+    makers = [_movie] * 4 + [_episode] * 3 + [_anime] * 2 + [_casual]
+    return [rng.choice(makers)(rng) for _ in range(count)]
+
+def load(path=None, count=3000):
+    if not path: return generate(count)
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
@@ -0,0 +1,81 @@
+import struct
+
+# ================= SYNTHETIC CONTAINERS =================
+# Small but structurally honest Matroska / MP4 files: real EBML headers, Tracks with video
+# dimensions and audio languages, a Cluster or mdat payload behind them. Good enough for
+# every parser the bot uses, and nobody has to ship real movies with the benchmarks.
+
+# ---- Matroska (EBML) ----
+def _vint(n):
+    for length in range(1, 9):
+        if n < (1 << (7 * length)) - 1:
+            return ((1 << (7 * length)) | n).to_bytes(length, "big")
+    raise ValueError(f"EBML size too large: {n}")
+
+def _el(element_id, payload):
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + _vint(len(payload)) + payload
+
+def _uint(element_id, value):
+    return _el(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+def _str(element_id, value):
+    return _el(element_id, value.encode())
+
+def mkv(width=1920, height=1080, langs=("jpn", "eng"), codec="V_MPEGH/ISO/HEVC", hdr=False, duration_s=1440, pad=0, payload=200_000):
+    ebml = _el(0x1A45DFA3, _str(0x4282, "matroska") + _uint(0x4287, 4) + _uint(0x4285, 2))
+    info = _el(0x1549A966, _uint(0x2AD7B1, 1_000_000) + _el(0x4489, struct.pack(">f", duration_s * 1000.0)))
+    colour = _el(0x55B0, _uint(0x55BA, 16)) if hdr else b""
+    video = _el(0xAE, _uint(0xD7, 1) + _uint(0x83, 1) + _str(0x86, codec) + _el(0xE0, _uint(0xB0, width) + _uint(0xBA, height) + colour))
+    audio = b"".join(
+        _el(0xAE, _uint(0xD7, 2 + i) + _uint(0x83, 2) + _str(0x86, "A_AAC") + (_str(0x22B59C, lang) if lang else b"") + _el(0xE1, _uint(0x9F, 2)))
+        for i, lang in enumerate(langs)
+    )
+    tracks = _el(0x1654AE6B, video + audio)
+    # Void element: attachments/tags some muxers put before Tracks, pushes them past the first range
+    void = _el(0xEC, b"\0" * pad) if pad else b""
+    cluster = _el(0x1F43B675, _uint(0xE7, 0) + _el(0xA3, b"\x81\x00\x00\x80" + b"x" * payload))
+    segment = info + void + tracks + cluster
+    return ebml + b"\x18\x53\x80\x67" + _vint(len(segment)) + segment
+
+# ---- ISO-BMFF (MP4) ----
+def _box(box_type, payload):
+    return struct.pack(">I", 8 + len(payload)) + box_type + payload
+
+def _full_box(box_type, version, flags, payload):
+    return _box(box_type, struct.pack(">I", (version << 24) | flags) + payload)
+
+def _mp4_lang(lang):
+    # None writes 0 ("unspecified"), an int goes in as-is (QuickTime's Macintosh language codes)
+    if not lang: return 0
+    if isinstance(lang, int): return lang
+    c = [ord(x) - 0x60 for x in lang]
+    return (c[0] << 10) | (c[1] << 5) | c[2]
+
+def _trak(track_id, handler, width, height, lang, sample_entry, duration_s):
+    tkhd = _full_box(b"tkhd", 0, 3, struct.pack(">IIII", 0, 0, track_id, 0) + struct.pack(">I", duration_s * 1000)
+                     + b"\0" * 52 + struct.pack(">II", width << 16, height << 16))
+    mdhd = _full_box(b"mdhd", 0, 0, struct.pack(">IIII", 0, 0, 24000, 24000 * duration_s) + struct.pack(">HH", _mp4_lang(lang), 0))
+    hdlr = _full_box(b"hdlr", 0, 0, b"\0" * 4 + handler + b"\0" * 12 + b"name\0")
+    stsd = _full_box(b"stsd", 0, 0, struct.pack(">I", 1) + sample_entry)
+    minf = _box(b"minf", _box(b"stbl", stsd))
+    return _box(b"trak", tkhd + _box(b"mdia", mdhd + hdlr + minf))
+
+def mp4(width=1920, height=1080, langs=("eng",), codec=b"avc1", moov_at_end=True, duration_s=1440, mdat_size=2_000_000):
+    ftyp = _box(b"ftyp", b"isom" + struct.pack(">I", 512) + b"isomiso2avc1mp41")
+    mvhd = _full_box(b"mvhd", 0, 0, struct.pack(">IIII", 0, 0, 1000, duration_s * 1000) + b"\0" * 80)
+    video_entry = _box(codec, b"\0" * 6 + struct.pack(">H", 1) + b"\0" * 16 + struct.pack(">HH", width, height) + b"\0" * 50)
+    audio_entry = _box(b"mp4a", b"\0" * 6 + struct.pack(">H", 1) + b"\0" * 20)
+    traks = _trak(1, b"vide", width, height, "und", video_entry, duration_s)
+    traks += b"".join(_trak(2 + i, b"soun", 0, 0, lang, audio_entry, duration_s) for i, lang in enumerate(langs))
+    moov = _box(b"moov", mvhd + traks)
+    mdat = _box(b"mdat", b"\0" * mdat_size)
+    return ftyp + (mdat + moov if moov_at_end else moov + mdat)
+
+# Mix used by the pipeline benchmark: (name, file extension, bytes)
+def samples():
+    return [
+        ("mkv_1080p", "mkv", mkv()),
+        ("mkv_2160p_hdr", "mkv", mkv(3840, 2160, hdr=True, pad=300_000)),
+        ("mp4_moov_head", "mp4", mp4(1280, 720, moov_at_end=False)),
+        ("mp4_moov_tail", "mp4", mp4()),
+    ]
@@ -0,0 +1,316 @@
+import re
+import json
+import math
+import time
+import random
+import asyncio
+from collections import Counter
+
+import tornado.web
+import tornado.netutil
+from tornado.httpserver import HTTPServer
+
+from benchmarks import corpus, media
+
+# ================= LOCAL UPSTREAM STUBS =================
+# Stand-ins for TMDB, TVmaze, Jikan, OMDb and the Telegram Bot API, each on its own port so
+# the bot's per-host connection pools behave like production. Responses come from a fixture
+# file when one is given (recorded real answers, keyed by lower-cased query) and otherwise
+# from the corpus catalogue. Every service can add latency, jitter, 5xx errors and 429s.
+class Faults:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+
+    async def delay(self):
+        wait = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0)
+        if wait > 0: await asyncio.sleep(wait)
+
+    def roll(self):
+        # None, "error" or "rate_limit"
+        r = self.rng.random()
+        if r < self.rate_limit_rate: return "rate_limit"
+        if r < self.rate_limit_rate + self.error_rate: return "error"
+        return None
+
+class Catalogue:
+    # Answers for the titles the corpus generates; anything else is a miss, like upstream
+    def __init__(self, fixtures=None):
+        self.fixtures = fixtures or {}
+        self.movies = {t.lower(): (t, y) for t, y in corpus.MOVIES}
+        self.shows = {t.lower(): (t, y) for t, y in corpus.SHOWS}
+        self.anime = {t.lower(): t for t in corpus.ANIME}
+        # TMDB items by id, for search/multi and the /movie|tv/{id} detail endpoints alike
+        self.tmdb_items = {}
+        for i, (title, year) in enumerate(corpus.MOVIES):
+            self.tmdb_items[1000 + i] = {"id": 1000 + i, "media_type": "movie", "title": title, "release_date": f"{year}-06-01",
+                                         "vote_average": 7.9, "genre_ids": [28, 18], "original_language": "en", "popularity": 50.0 - i / 10}
+        for i, (title, year) in enumerate(corpus.SHOWS):
+            self.tmdb_items[5000 + i] = {"id": 5000 + i, "media_type": "tv", "name": title, "first_air_date": f"{year or 2016}-01-10",
+                                         "vote_average": 0, "genre_ids": [18, 10765], "original_language": "en", "origin_country": ["US"], "popularity": 40.0 - i / 10}
+        for i, title in enumerate(corpus.ANIME):
+            self.tmdb_items[9000 + i] = {"id": 9000 + i, "media_type": "tv", "name": title, "first_air_date": "2020-10-03", "vote_average": 8.6,
+                                         "genre_ids": [16, 10759], "original_language": "ja", "origin_country": ["JP"], "popularity": 30.0 - i / 10}
+        self._tmdb_names = {(item.get("title") or item["name"]).lower(): item_id for item_id, item in self.tmdb_items.items()}
+
+    def _find(self, table, query):
+        q = query.lower().strip()
+        if not q: return None
+        if q in table: return table[q]
+        for key, value in table.items():
+            if key.startswith(q) or q.startswith(key): return value
+        return None
+
+    def replay(self, service, query):
+        return self.fixtures.get(service, {}).get(query.lower().strip())
+
+    def tmdb(self, query):
+        q = query.lower().strip()
+        ids = [item_id for name, item_id in self._tmdb_names.items() if q and (name.startswith(q) or q.startswith(name))]
+        results = [self.tmdb_items[i] for i in ids]
+        return {"page": 1, "results": results, "total_results": len(results)}
+
+    def tmdb_detail(self, kind, item_id):
+        item = self.tmdb_items.get(item_id)
+        if not item or item["media_type"] != kind: return None
+        detail = {k: v for k, v in item.items() if k not in ("genre_ids", "media_type")}
+        detail["genres"] = [{"id": g, "name": str(g)} for g in item["genre_ids"]]
+        return detail
+
+    def tmdb_export(self):
+        # Rows shaped like TMDB's daily id exports, for building a title index over the stub
+        for item_id, item in self.tmdb_items.items():
+            if item["media_type"] == "movie": yield "movie", {"id": item_id, "original_title": item["title"], "popularity": item["popularity"]}
+            else: yield "tv", {"id": item_id, "original_name": item["name"], "popularity": item["popularity"]}
+
+    def tvmaze(self, query):
+        show = self._find(self.shows, query)
+        if not show: return None
+        return {"name": show[0], "premiered": f"{show[1] or 2016}-01-10", "rating": {"average": 8.4},
+                "genres": ["Drama", "Thriller"], "network": {"country": {"code": "US"}}, "webChannel": None}
+
+    def jikan(self, query):
+        anime = self._find(self.anime, query)
+        if not anime: return {"data": []}
+        return {"data": [{"title": anime, "title_english": anime, "score": 8.7, "year": 2020,
+                          "genres": [{"name": "Action"}, {"name": "Fantasy"}]}]}
+
+    def omdb(self, query):
+        movie = self._find(self.movies, query) or self._find(self.shows, query)
+        if not movie: return {"Response": "False", "Error": "Movie not found!"}
+        kind = "movie" if self._find(self.movies, query) else "series"
+        return {"Response": "True", "Title": movie[0], "Year": str(movie[1] or 2016), "imdbRating": "8.1",
+                "Genre": "Action, Drama", "Type": kind, "Country": "United States"}
+
+class StubHandler(tornado.web.RequestHandler):
+    def initialize(self, stub):
+        self.stub = stub
+
+    def send_json(self, body, status=200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(body))
+
+    async def faulted(self):
+        # Returns True when the request was answered with an injected failure
+        await self.stub.faults.delay()
+        fault = self.stub.faults.roll()
+        if fault == "rate_limit":
+            self.stub.count("429")
+            self.set_header("Retry-After", "1")
+            self.send_json({"status_message": "Too Many Requests"}, 429)
+            return True
+        if fault == "error":
+            self.stub.count("5xx")
+            self.send_json({"status_message": "Upstream exploded"}, 502)
+            return True
+        return False
+
+RE_TMDB_DETAIL = re.compile(r"/(movie|tv)/(\d+)$")
+
+class MetadataHandler(StubHandler):
+    async def get(self, *_):
+        self.stub.count("requests")
+        if await self.faulted(): return
+        service = self.stub.name
+        detail = RE_TMDB_DETAIL.search(self.request.path) if service == "tmdb" else None
+        if detail:
+            body = self.stub.catalogue.tmdb_detail(detail.group(1), int(detail.group(2)))
+            if body is None: self.send_json({"success": False, "status_code": 34}, 404)
+            else: self.send_json(body)
+            return
+        query = self.get_argument("query", None) or self.get_argument("q", None) or self.get_argument("t", "")
+        body = self.stub.catalogue.replay(service, query)
+        if body is None: body = getattr(self.stub.catalogue, service)(query)
+        if body is None:
+            # TVmaze answers a miss on /singlesearch with a 404
+            self.send_json({"name": "Not Found", "status": 404}, 404)
+            return
+        self.send_json(body)
+
+class Stub:
+    def __init__(self, name, faults, catalogue=None):
+        self.name = name
+        self.faults = faults
+        self.catalogue = catalogue
+        self.calls = Counter()
+        self.server = None
+        self.port = None
+
+    def count(self, what):
+        self.calls[what] += 1
+
+    def routes(self):
+        return [(r"/.*", MetadataHandler, {"stub": self})]
+
+    def start(self):
+        self.server = HTTPServer(tornado.web.Application(self.routes()))
+        sockets = tornado.netutil.bind_sockets(0, "127.0.0.1")
+        self.port = sockets[0].getsockname()[1]
+        self.server.add_sockets(sockets)
+        return self
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def stop(self):
+        if self.server: self.server.stop()
+
+# ================= FAKE BOT API =================
+# Enough of the Bot API for the media pipeline: getMe, getFile, ranged downloads of the
+# synthetic containers, sendSticker/deleteMessage/setMessageReaction/sendMessage and
+# copyMessage, which is where a caption counts as delivered.
+class BotApiHandler(StubHandler):
+    async def post(self, token, method):
+        await self.handle(method)
+
+    async def get(self, token, method):
+        await self.handle(method)
+
+    def params(self):
+        if self.request.headers.get("Content-Type", "").startswith("application/json") and self.request.body:
+            return json.loads(self.request.body)
+        return {k: self.get_body_argument(k) for k in self.request.body_arguments}
+
+    async def handle(self, method):
+        stub = self.stub
+        stub.count(method)
+        params = self.params()
+        await stub.faults.delay()
+        chat_id = int(params.get("chat_id", 0) or 0)
+        retry_after = stub.over_chat_limit(chat_id) if method in stub.message_methods else 0
+        if not retry_after and method in stub.flood_methods and stub.faults.roll() == "rate_limit": retry_after = 1
+        if retry_after:
+            stub.count("429")
+            self.send_json({"ok": False, "error_code": 429, "description": f"Too Many Requests: retry after {retry_after}",
+                            "parameters": {"retry_after": retry_after}}, 429)
+            return
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot",
+                      "can_join_groups": True, "can_read_all_group_messages": False, "supports_inline_queries": False}
+        elif method == "getFile":
+            file_id = params["file_id"]
+            kind, ext, data = stub.file_for(file_id)
+            result = {"file_id": file_id, "file_unique_id": f"u{file_id}", "file_size": len(data), "file_path": f"documents/{file_id}.{ext}"}
+        elif method in ("sendPhoto", "editMessageMedia"):
+            photo = params.get("photo") or json.loads(params.get("media") or "{}").get("media", "")
+            # URLs make the real API fetch the image first; file_ids are served from Telegram's own storage
+            stub.count("photo_by_url" if photo.startswith("http") else "photo_by_id")
+            if photo.startswith("http"): await asyncio.sleep(stub.url_fetch_delay)
+            result = stub.message(chat_id)
+            result["photo"] = [{"file_id": "AgAC" + photo[-12:], "file_unique_id": photo[-12:], "width": 1280, "height": 720}]
+        elif method in ("sendSticker", "sendMessage"):
+            result = stub.message(chat_id)
+        elif method == "copyMessage":
+            stub.delivered(chat_id, int(params["message_id"]), params.get("caption", ""))
+            result = {"message_id": stub.next_message_id()}
+        elif method == "editMessageCaption":
+            stub.edits.append((chat_id, int(params.get("message_id", 0) or 0), params.get("caption", "")))
+            result = stub.message(chat_id)
+        else:
+            # setMessageReaction, deleteMessage, answerCallbackQuery, ...
+            result = True
+        self.send_json({"ok": True, "result": result})
+
+class FileHandler(StubHandler):
+    async def get(self, token, path):
+        stub = self.stub
+        stub.count("file_download")
+        await stub.faults.delay()
+        file_id = path.rsplit("/", 1)[-1].split(".", 1)[0]
+        _, _, data = stub.file_for(file_id)
+        start, end = 0, len(data) - 1
+        rng = self.request.headers.get("Range", "")
+        if rng.startswith("bytes="):
+            first, _, last = rng[6:].partition("-")
+            start = int(first or 0)
+            end = min(int(last), len(data) - 1) if last else end
+            self.set_status(206)
+            self.set_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        chunk = data[start:end + 1]
+        stub.calls["bytes_served"] += len(chunk)
+        self.set_header("Content-Type", "application/octet-stream")
+        self.finish(chunk)
+
+class TelegramStub(Stub):
+    message_methods = {"sendMessage", "sendSticker", "sendPhoto", "copyMessage"}
+
+    def __init__(self, faults, flood_methods=("copyMessage", "sendSticker", "setMessageReaction"), chat_rate=0, chat_burst=3):
+        super().__init__("telegram", faults)
+        self.flood_methods = set(flood_methods)
+        # Like the real API: posting faster than chat_rate messages/s into one chat earns a 429
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._chat_tokens = {}
+        self.url_fetch_delay = 0.4
+        self.samples = media.samples()
+        self._message_id = 10_000_000
+        self.deliveries = {}
+        self.edits = []
+        self.waiters = {}
+
+    def routes(self):
+        return [
+            (r"/file/bot([^/]+)/(.+)", FileHandler, {"stub": self}),
+            (r"/bot([^/]+)/(\w+)", BotApiHandler, {"stub": self}),
+        ]
+
+    def file_for(self, file_id):
+        # file ids look like "<sample index>-<n>", so every upload maps onto one of the samples
+        index = int(file_id.split("-", 1)[0]) % len(self.samples)
+        return self.samples[index]
+
+    def over_chat_limit(self, chat_id):
+        if not self.chat_rate: return 0
+        now = time.monotonic()
+        tokens, last = self._chat_tokens.get(chat_id, (self.chat_burst, now))
+        tokens = min(self.chat_burst, tokens + (now - last) * self.chat_rate)
+        if tokens < 1:
+            self._chat_tokens[chat_id] = (tokens, now)
+            return max(1, math.ceil((1 - tokens) / self.chat_rate))
+        self._chat_tokens[chat_id] = (tokens - 1, now)
+        return 0
+
+    def next_message_id(self):
+        self._message_id += 1
+        return self._message_id
+
+    def message(self, chat_id):
+        return {"message_id": self.next_message_id(), "date": int(time.time()), "chat": {"id": chat_id, "type": "private"}}
+
+    def delivered(self, chat_id, message_id, caption):
+        key = (chat_id, message_id)
+        self.deliveries[key] = (time.perf_counter(), caption)
+        waiter = self.waiters.pop(key, None)
+        if waiter and not waiter.done(): waiter.set_result(self.deliveries[key][0])
+
+    def wait_for(self, chat_id, message_id):
+        future = asyncio.get_running_loop().create_future()
+        key = (chat_id, message_id)
+        if key in self.deliveries: future.set_result(self.deliveries[key][0])
+        else: self.waiters[key] = future
+        return future
@@ -1,26 +1,72 @@
 import os
-import re
+import sys
+import time
 import random
+import signal
+import hashlib
 import asyncio
 import logging
-import requests
-import tempfile
 import math
-from guessit import guessit
+from urllib.parse import quote
 
-# The Keep Alive Server
-from keep_alive import keep_alive
+# Cold-start timing (`python bot.py --profile-startup` prints it and exits)
+import startup
+if "--profile-startup" in sys.argv: startup.install()
 
-# ⚠️ Make sure hachoir is installed: pip install hachoir
-from hachoir.parser import createParser
-from hachoir.metadata import extractMetadata
+# The Keep Alive Server (health, stats and the webhook endpoint, on our own event loop)
+from keep_alive import start_server, register_stats, register_health
+
+# Async HTTP layer (pooled, non-blocking)
+import httpx
+import http_client
+
+# Two-tier (memory + SQLite) cache, plus the memory snapshot restored on start
+import cache
+from cache import TieredCache, normalize_key
+
+# Quota-aware API key scheduling
+from key_pool import KeyPool, KeyPoolExhausted
+
+# Filename parsing (precompiled cleaners, scene fast path, memoized guessit loaded on first use)
+import filename_parser
+from filename_parser import pre_clean_filename, detect_languages, track_languages, parse_filename, fast_parse
+
+# In-memory container probing: native MKV/MP4 header parser, hachoir as the lazy fallback (⚠️ pip install hachoir)
+import probe
+from probe import probe_media, parse_video_info
+from container_parser import audio_languages
+
+# Thread/process pool for the CPU-bound bits (guessit, hachoir)
+import workers
+
+# Admission control: per-chat round-robin queues + single-flight lookups
+from scheduler import MediaScheduler, SingleFlight, ArrivalOrder, QueueFull
+from batcher import MediaBatcher
+
+# Flood-limit pacing for our own Bot API calls (token buckets, priorities, retry_after)
+from outbound import OutboundScheduler, RESULT, NORMAL, COSMETIC
+
+# RE-VERIFY: locally ranked provider alternatives
+import candidates
+
+# url -> Telegram file_id for the menu images
+from assets import AssetRegistry
+
+# Offline TMDB title index (built by `python title_index.py`, optional)
+import title_index
+
+# Per-stage timing, provider outcomes and the /metrics exposition
+import metrics
+from metrics import stage, job_trace, record_provider, CallbackMetric, CACHE_LOOKUPS
 
 # Telegram Library Imports
 from telegram import Update, ReactionTypeEmoji, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
-from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, filters
+from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, TypeHandler, filters
 from telegram.constants import ParseMode
 from telegram.error import BadRequest
 
+startup.checkpoint("imports")
+
 # ================= CONFIGURATION =================
 # 🔥 NOW PULLS SECURELY FROM RENDER ENVIRONMENT VARIABLES 🔥
 BOT_TOKEN = os.getenv("BOT_TOKEN")
@@ -28,6 +74,13 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 if not BOT_TOKEN:
     raise ValueError("❌ BOT_TOKEN is missing! Please add it to your Render Environment Variables.")
 
+# Bot API server (a local telegram-bot-api instance, or the benchmark stub)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+
+# Multi-process mode (cluster.py): one receiver + BOT_WORKERS worker processes. Rate budgets
+# (API keys, Telegram's global limit) are split evenly so the processes together stay inside them.
+BOT_WORKERS = max(1, int(os.getenv("BOT_WORKERS", 1)))
+
 # ================= UI & API KEYS =================
 LOADING_STICKERS = [
     "CAACAgUAAxkBAAEQLstpXRZxNxFMteYSkppBZ63fuBhVtQACFBgAAtDQQVbGUaezY8jttzgE",
@@ -68,6 +121,19 @@ OMDB_KEYS = [
     'b5cff164', '89a9f57d', '73a9858a', 'efbd8357'
 ]
 
+KEY_STRATEGY = os.getenv("KEY_STRATEGY", "round_robin")
+TMDB_POOL = KeyPool("tmdb", TMDB_KEYS, rate=float(os.getenv("TMDB_KEY_RATE", 4)) / BOT_WORKERS, burst=20, strategy=KEY_STRATEGY)
+# OMDb free keys are capped at 1000 requests per day
+OMDB_POOL = KeyPool("omdb", OMDB_KEYS, rate=float(os.getenv("OMDB_KEY_RATE", 1)) / BOT_WORKERS, burst=5,
+                    daily_quota=int(os.getenv("OMDB_DAILY_QUOTA", 1000)) // BOT_WORKERS, strategy=KEY_STRATEGY)
+
+MEDIA_SCHEDULER = MediaScheduler(
+    concurrency=int(os.getenv("MEDIA_CONCURRENCY", 8)),
+    max_queue=int(os.getenv("MEDIA_MAX_QUEUE", 500)),
+    max_per_chat=int(os.getenv("MEDIA_MAX_PER_CHAT", 50))
+)
+IN_FLIGHT = SingleFlight()
+
 EMOJIS = ["🌟", "🔥", "🎉", "⚡", "🏆", "💎", "💯", "😎", "✨", "🚀"]
 
 logging.basicConfig(level=logging.INFO)
@@ -81,13 +147,6 @@ TMDB_GENRES = {
     10762: "Kids", 10763: "News", 10764: "Reality", 10765: "Sci-Fi & Fantasy"
 }
 
-LANG_MAP = {
-    'hi': 'Hindi', 'en': 'English', 'ja': 'Japanese', 'ta': 'Tamil', 'te': 'Telugu', 
-    'ml': 'Malayalam', 'kn': 'Kannada', 'mr': 'Marathi', 'gu': 'Gujarati', 
-    'ko': 'Korean', 'es': 'Spanish', 'fr': 'French', 'ru': 'Russian', 'zh': 'Chinese',
-    'th': 'Thai', 'in': 'Indonesian', 'vi': 'Vietnamese'
-}
-
 # ================= PRECISION UTILITIES =================
 def esc(text):
     if not text or str(text).lower() in ['none', 'nan', 'null']: return "N/A"
@@ -101,34 +160,6 @@ def format_size(size_bytes):
     s = round(size_bytes / p, 2)
     return f"{s} {size_name[i]}"
 
-def pre_clean_filename(filename):
-    f = str(filename)
-    f = re.sub(r'@[a-zA-Z0-9_]+', '', f)
-    f = re.sub(r'(?i)DA Rips', '', f)
-    f = re.sub(r'(?i)t\.me/[a-zA-Z0-9_]+', '', f)
-    f = re.sub(r'\[.*?\]', '', f)
-    f = re.sub(r'[\.\_]+', ' ', f)
-    return f.strip()
-
-def detect_languages(filename, guessit_langs):
-    found_langs = []
-    if guessit_langs:
-        if not isinstance(guessit_langs, list): guessit_langs = [guessit_langs]
-        for l in guessit_langs:
-            lang_str = str(l).lower()
-            found_langs.append(LANG_MAP.get(lang_str, lang_str.capitalize()))
-            
-    fname_lower = filename.lower()
-    if 'dual' in fname_lower: found_langs.append('Dual Audio')
-    if 'multi' in fname_lower: found_langs.append('Multi Audio')
-    if 'hin' in fname_lower and 'Hindi' not in found_langs: found_langs.append('Hindi')
-    if 'tam' in fname_lower and 'Tamil' not in found_langs: found_langs.append('Tamil')
-    if 'tel' in fname_lower and 'Telugu' not in found_langs: found_langs.append('Telugu')
-    if 'kor' in fname_lower and 'Korean' not in found_langs: found_langs.append('Korean')
-    
-    if not found_langs: return "Unknown"
-    return " & ".join(list(dict.fromkeys(found_langs)))
-
 def map_resolution(width, height):
     if not width or not height: return None
     if width >= 3800 or height >= 2100: return "4K (2160p)"
@@ -138,133 +169,556 @@ def map_resolution(width, height):
     elif width >= 800 or height >= 480: return "SD (480p)"
     return f"{width}x{height}p"
 
-async def get_real_resolution(file_id, context):
+async def get_stream_info(file_id, context, file_name=None):
     try:
-        tg_file = await context.bot.get_file(file_id)
-        file_url = f"https://api.telegram.org/file/bot{BOT_TOKEN}/{tg_file.file_path}"
-        chunk = requests.get(file_url, headers={"Range": "bytes=0-1048576"}, timeout=10).content
-        with tempfile.NamedTemporaryFile(suffix=".mkv", delete=False) as tmp:
-            tmp.write(chunk)
-            tmp_path = tmp.name
-        parser = createParser(tmp_path)
-        res_display = None
-        if parser:
-            with parser:
-                meta = extractMetadata(parser)
-                if meta:
-                    w, h = meta.get('width'), meta.get('height')
-                    res_display = map_resolution(w, h)
-        os.unlink(tmp_path)
-        return res_display
-    except: return None
+        with stage('get_file'): tg_file = await context.bot.get_file(file_id)
+        # PTB already prefixes file_path with the file base URL; only bare paths need it here
+        file_url = tg_file.file_path
+        if not file_url.startswith(("http://", "https://")): file_url = f"{TELEGRAM_API_URL}/file/bot{BOT_TOKEN}/{file_url}"
+        return await probe_media(file_url, tg_file.file_size, file_name, parse=parse_video_offloaded)
+    except Exception as e:
+        logging.warning(f"Resolution probe failed for {file_name}: {e!r}")
+        return None
+
+# ================= PROBE CACHE =================
+# Keyed by Telegram's file_unique_id: the same file forwarded again (or re-verified)
+# skips get_file, the range download, the container parse and guessit entirely.
+PROBE_TTL = int(os.getenv("PROBE_TTL", 30 * 86400))
+PROBE_FAILED_TTL = int(os.getenv("PROBE_FAILED_TTL", 3600))
+
+PROBE_CACHE = TieredCache(
+    "probes",
+    max_memory=int(os.getenv("PROBE_CACHE_MEMORY", 4096)),
+    max_disk=int(os.getenv("PROBE_CACHE_DISK", 200000))
+)
+
+def guess_resolution(screen_size):
+    return f"FHD (1080p)" if str(screen_size) == '1080p' else (f"HD (720p)" if str(screen_size) == '720p' else str(screen_size or 'FHD (1080p)'))
+
+# ================= CPU OFFLOADING =================
+async def parse_filename_offloaded(clean_name):
+    # The scene fast path costs microseconds, only the guessit fallback is worth shipping out
+    parsed = fast_parse(clean_name)
+    if parsed: return parsed
+    try: return await workers.run_cpu(parse_filename, clean_name)
+    except Exception as e:
+        logging.warning(f"Filename parse failed for '{clean_name}': {e!r}")
+        return {"title": clean_name}
+
+async def parse_video_offloaded(data, file_name):
+    try: return await workers.run_cpu(parse_video_info, data, file_name)
+    except Exception as e:
+        logging.warning(f"Container parse failed for {file_name}: {e!r}")
+        return None
+
+async def parse_caption_inputs(media):
+    original_name = getattr(media, 'file_name', None) or 'Unknown_File.mp4'
+    clean_original = pre_clean_filename(original_name)
+    with stage('parse'): parsed = await parse_filename_offloaded(clean_original)
+    year = parsed.get('year')
+    return {
+        "file_name": original_name,
+        "title": str(parsed.get('title', 'Unknown')),
+        "year": int(year) if isinstance(year, int) else None,
+        "screen_size": str(parsed.get('screen_size')) if parsed.get('screen_size') else None,
+        "size": format_size(getattr(media, 'file_size', 0) or 0),
+        "audio": detect_languages(original_name, parsed.get('language')),
+        "episodic": parsed.get('type') == 'episode',
+    }
+
+def remember_caption_inputs(media, inputs, stream):
+    inputs['stream'] = stream
+    # Tagged audio tracks beat whatever the filename suggested
+    tagged = track_languages(audio_languages(stream))
+    if tagged: inputs['audio'] = tagged
+    inputs['resolution'] = (map_resolution(stream['width'], stream['height']) if stream else None) or guess_resolution(inputs['screen_size'])
+    if media.file_unique_id:
+        PROBE_CACHE.set(media.file_unique_id, inputs, PROBE_TTL if stream else PROBE_FAILED_TTL)
+
+# ================= METADATA CACHE =================
+# Positive entries live as long as the shortest TTL of the providers that filled them,
+# "no match" entries expire quickly so a fixed upstream outage doesn't stick around.
+META_TTL = {
+    'tmdb': int(os.getenv("META_TTL_TMDB", 7 * 86400)),
+    'tvmaze': int(os.getenv("META_TTL_TVMAZE", 3 * 86400)),
+    'jikan': int(os.getenv("META_TTL_JIKAN", 3 * 86400)),
+    'omdb': int(os.getenv("META_TTL_OMDB", 7 * 86400)),
+}
+META_NEGATIVE_TTL = int(os.getenv("META_NEGATIVE_TTL", 1800))
+
+METADATA_CACHE = TieredCache(
+    "metadata",
+    max_memory=int(os.getenv("META_CACHE_MEMORY", 2048)),
+    max_disk=int(os.getenv("META_CACHE_DISK", 100000))
+)
+
+# What RE-VERIFY pages through, keyed by the captioned copy ("chat_id:message_id")
+CANDIDATE_STORE = TieredCache(
+    "candidates",
+    max_memory=int(os.getenv("RV_CACHE_MEMORY", 2048)),
+    max_disk=int(os.getenv("RV_CACHE_DISK", 50000))
+)
+
+# TMDB /movie/{id} and /tv/{id} answers, for names the offline title index resolved
+TMDB_DETAIL_CACHE = TieredCache(
+    "tmdb_details",
+    max_memory=int(os.getenv("TMDB_DETAIL_CACHE_MEMORY", 4096)),
+    max_disk=int(os.getenv("TMDB_DETAIL_CACHE_DISK", 200000))
+)
+# Local matches tried (remakes share a name) before falling back to search/multi
+TITLE_INDEX_FETCHES = int(os.getenv("TITLE_INDEX_FETCHES", 2))
+
+# Menu images already uploaded once; ASSET_CHAT_ID (a private scratch chat/channel) lets startup learn them all
+ASSET_STORE = TieredCache("assets", max_memory=256, max_disk=1024)
+ASSETS = AssetRegistry(ASSET_STORE)
+ASSET_CHAT_ID = os.getenv("ASSET_CHAT_ID")
+
+# Telegram's limits: ~30 messages/s overall, ~1/s per private chat, 20/min per group
+TG_OUT = OutboundScheduler(
+    global_rate=float(os.getenv("TG_GLOBAL_RATE", 30)) / BOT_WORKERS,
+    private_rate=float(os.getenv("TG_CHAT_RATE", 1)),
+    private_burst=int(os.getenv("TG_CHAT_BURST", 3)),
+    group_rate=float(os.getenv("TG_GROUP_RATE_PER_MIN", 20)) / 60,
+    cosmetic_wait=float(os.getenv("TG_COSMETIC_WAIT", 2.0))
+)
+# Jobs done within this many seconds never show (or delete) the loading sticker
+STICKER_DELAY = float(os.getenv("STICKER_DELAY", 1.0))
+
+register_stats("metadata_cache", METADATA_CACHE.stats)
+register_stats("assets", ASSETS.stats)
+register_stats("title_index", title_index.stats)
+register_stats("candidates", CANDIDATE_STORE.stats)
+register_stats("probe_cache", PROBE_CACHE.stats)
+register_stats("cpu_workers", workers.stats)
+register_stats("media_queue", MEDIA_SCHEDULER.stats)
+register_stats("telegram_outbound", TG_OUT.stats)
+register_stats("single_flight", IN_FLIGHT.stats)
+register_stats("tmdb_keys", TMDB_POOL.stats)
+register_stats("omdb_keys", OMDB_POOL.stats)
+register_stats("startup", startup.stats)
+
+# ================= WARM START =================
+# Memory tiers worth carrying over a restart (the probe and metadata answers, the asset file_ids).
+# Saved on shutdown and every CACHE_SNAPSHOT_INTERVAL seconds (0 = shutdown only), loaded on start.
+SNAPSHOT_CACHES = (METADATA_CACHE, PROBE_CACHE, ASSET_STORE, CANDIDATE_STORE, TMDB_DETAIL_CACHE)
+CACHE_SNAPSHOT = os.getenv("CACHE_SNAPSHOT", os.path.join(cache.CACHE_DIR, "memory_snapshot.json.gz"))
+CACHE_SNAPSHOT_INTERVAL = int(os.getenv("CACHE_SNAPSHOT_INTERVAL", 900))
+
+def snapshot_path(app):
+    # Worker processes hold different chats, so each keeps its own snapshot
+    index = app.bot_data.get('worker_index')
+    if index is None: return CACHE_SNAPSHOT
+    root, ext = os.path.splitext(CACHE_SNAPSHOT)
+    return f"{root}.worker{index}{ext}"
+
+async def save_snapshot(app):
+    snapshot = cache.export_snapshot(SNAPSHOT_CACHES)
+    try:
+        saved = await asyncio.get_running_loop().run_in_executor(None, cache.write_snapshot, snapshot_path(app), snapshot)
+        logging.info(f"💾 Cache snapshot saved ({saved} entries)")
+    except OSError as e:
+        logging.warning(f"Cache snapshot failed: {e}")
+
+async def warm_up():
+    # Everything the first file may need but /start doesn't, loaded once the bot is already taking updates.
+    # (In WORKER_MODE=process this warms the pool worker that picks the job up.)
+    for name, step in (("guessit", filename_parser.warm), ("hachoir", probe.warm)):
+        try:
+            with startup.phase(f"warm-up: {name}"): await workers.run_cpu(step, timeout=60)
+        except Exception as e: logging.warning(f"Warm-up of {name} failed: {e!r}")
+    # Mapping the title index is cheap, paging its token table in is done off the loop
+    with startup.phase("warm-up: title index"): await asyncio.get_running_loop().run_in_executor(None, title_index.warm)
+
+async def background_upkeep(app):
+    await warm_up()
+    while CACHE_SNAPSHOT_INTERVAL > 0:
+        await asyncio.sleep(CACHE_SNAPSHOT_INTERVAL)
+        await save_snapshot(app)
+
+async def start_server_later(app):
+    # Polling mode: nothing needs /status before the first update, so tornado is imported in a
+    # thread while the updater starts instead of in front of it
+    with startup.phase("http server (background)"):
+        await asyncio.get_running_loop().run_in_executor(None, __import__, "http_server")
+        app.bot_data['http_server'] = start_server()
+
+async def note_first_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    startup.first_update()
+
+# Live gauges for /metrics, read from the components that already keep the numbers
+CallbackMetric("bot_media_jobs_in_flight", "Media jobs currently running", lambda: MEDIA_SCHEDULER.stats()["active"])
+CallbackMetric("bot_media_queue_depth", "Media jobs waiting for a worker", lambda: MEDIA_SCHEDULER.stats()["queued"])
+CallbackMetric("bot_media_jobs_rejected_total", "Media jobs refused because the queue was full", lambda: MEDIA_SCHEDULER.rejected, kind="counter")
+CallbackMetric("bot_single_flight_in_flight", "Shared lookups currently running", lambda: IN_FLIGHT.stats()["in_flight"])
+CallbackMetric("bot_single_flight_shared_total", "Callers that joined a lookup already in flight", lambda: IN_FLIGHT.shared, kind="counter")
+CallbackMetric("bot_telegram_outbound_waiting", "Bot API calls waiting for a flood-limit slot", lambda: TG_OUT.stats()["waiting"])
+CallbackMetric("bot_cpu_pending", "guessit/hachoir calls waiting on or running in the worker pool", lambda: workers.stats()["pending"])
+CallbackMetric("bot_tiered_cache_hits_total", "TieredCache hits by cache and tier", lambda: [
+    ({"cache": c.name, "tier": tier}, c.hits[tier]) for c in (METADATA_CACHE, PROBE_CACHE) for tier in ("memory", "disk")
+], kind="counter")
+CallbackMetric("bot_tiered_cache_misses_total", "TieredCache misses by cache", lambda: [
+    ({"cache": c.name}, c.misses) for c in (METADATA_CACHE, PROBE_CACHE)
+], kind="counter")
+CallbackMetric("bot_api_keys_available", "API keys currently usable per provider", lambda: [
+    ({"provider": pool.name}, pool.stats()["available"]) for pool in (TMDB_POOL, OMDB_POOL)
+])
+
+def is_anime_hinted(original_filename):
+    return 'anime' in original_filename.lower() or 'judas' in original_filename.lower()
+
+async def fetch_smart_metadata(title, year, original_filename, re_verify=False):
+    is_anime_hint = is_anime_hinted(original_filename)
+    # The anime hint changes which providers run, so it is part of the key too
+    key = normalize_key(title, year, re_verify, is_anime_hint)
+
+    cached = await METADATA_CACHE.aget(key)
+    CACHE_LOOKUPS.inc(cache="metadata", result="hit" if cached else "miss")
+    if cached: return dict(cached)
+
+    async def lookup():
+        with stage('metadata'): data = await query_metadata_providers(title, year, is_anime_hint, re_verify)
+        degraded = data.pop('degraded', False)
+        sources = data.get('sources') or []
+        if sources:
+            # A provider the merge wanted failed or missed the deadline: the answer may be missing
+            # genres or the anime match, so it's only kept as long as a "no match"
+            ttl = min(META_TTL[s] for s in sources)
+            METADATA_CACHE.set(key, data, min(ttl, META_NEGATIVE_TTL) if degraded else ttl)
+        elif not degraded:
+            # Every provider answered and none matched: remember that, briefly
+            METADATA_CACHE.set(key, data, META_NEGATIVE_TTL)
+        return data
+
+    # Episode 1..12 of the same show arriving together share a single provider chain
+    return dict(await IN_FLIGHT.do(("meta", key), lookup))
 
 # ================= THE 4-API OMNISCIENT ENGINE =================
-def fetch_smart_metadata(title, year, original_filename, re_verify=False):
-    tm_key = random.choice(TMDB_KEYS)
-    om_key = random.choice(OMDB_KEYS)
+# "sequential" asks one provider after another like the classic engine, "fanout" starts the
+# providers almost every lookup needs at once and stops at META_DEADLINE. Both merge with the same rules.
+META_MODE = os.getenv("META_MODE", "fanout").lower()
+META_DEADLINE = float(os.getenv("META_DEADLINE", 8))
+# Providers started up front in fanout mode (jikan only joins when the filename hints anime).
+# TVmaze and OMDb only matter for some answers, so they start when the merge asks for them...
+META_FANOUT_PROVIDERS = [p.strip() for p in os.getenv("META_FANOUT_PROVIDERS", "tmdb,jikan").split(",") if p.strip()]
+# ...or, as a hedge, once TMDB has kept us waiting META_HEDGE_DELAY seconds (negative = never)
+META_HEDGE_PROVIDERS = [p.strip() for p in os.getenv("META_HEDGE_PROVIDERS", "omdb").split(",") if p.strip()]
+META_HEDGE_DELAY = float(os.getenv("META_HEDGE_DELAY", 1.5))
+
+# Upstream base URLs; overridable so the benchmark harness can point the bot at local stubs
+TMDB_API_URL = os.getenv("TMDB_API_URL", "https://api.themoviedb.org/3").rstrip("/")
+TVMAZE_API_URL = os.getenv("TVMAZE_API_URL", "https://api.tvmaze.com").rstrip("/")
+JIKAN_API_URL = os.getenv("JIKAN_API_URL", "https://api.jikan.moe/v4").rstrip("/")
+OMDB_API_URL = os.getenv("OMDB_API_URL", "http://www.omdbapi.com/")
+
+KEY_ATTEMPTS = 2
+
+async def get_json_with_key(pool, url, params_for):
+    # A throttled or revoked key is reported and the request retried once on a fresh key
+    for attempt in range(KEY_ATTEMPTS):
+        key = pool.acquire()
+        try: res = await http_client.get(url, params=params_for(key))
+        except asyncio.CancelledError:
+            # Fan-out cancels the providers it no longer needs; that's not the key's fault
+            pool.release(key)
+            raise
+        except Exception:
+            pool.report(key)
+            raise
+        try: body = res.json()
+        except ValueError: body = None
+        # OMDb answers 401 + "Request limit reached!" once a key's daily quota is spent
+        quota_hit = isinstance(body, dict) and 'limit' in str(body.get('Error', '')).lower()
+        pool.report(key, res.status_code, res.headers.get('Retry-After'), quota_exhausted=quota_hit)
+        if res.status_code in (401, 429) and attempt + 1 < KEY_ATTEMPTS: continue
+        res.raise_for_status()
+        return body
+
+async def fetch_tmdb_search(query, year):
+    url = f"{TMDB_API_URL}/search/multi"
+    return await get_json_with_key(TMDB_POOL, url, lambda key: {"api_key": key, "query": query})
+
+def tmdb_detail_as_item(kind, d):
+    # /movie/{id} and /tv/{id} reshaped into a search/multi result, so apply_tmdb doesn't care where it came from
+    countries = d.get('origin_country') or [c.get('iso_3166_1') for c in d.get('production_countries') or []][:1]
+    item = {
+        "id": d.get('id'),
+        "media_type": kind,
+        "genre_ids": [g['id'] for g in d.get('genres') or []],
+        "vote_average": d.get('vote_average'),
+        "original_language": d.get('original_language', ''),
+        "origin_country": countries,
+    }
+    if kind == 'movie': item.update(title=d.get('title'), release_date=d.get('release_date') or '')
+    else: item.update(name=d.get('name'), first_air_date=d.get('first_air_date') or '')
+    return item
+
+async def fetch_tmdb_details(kind, tmdb_id):
+    key = f"{kind}:{tmdb_id}"
+    cached = await TMDB_DETAIL_CACHE.aget(key)
+    CACHE_LOOKUPS.inc(cache="tmdb_details", result="hit" if cached else "miss")
+    if cached: return cached
+    res = await get_json_with_key(TMDB_POOL, f"{TMDB_API_URL}/{kind}/{tmdb_id}", lambda k: {"api_key": k})
+    item = tmdb_detail_as_item(kind, res)
+    TMDB_DETAIL_CACHE.set(key, item, META_TTL['tmdb'])
+    return item
+
+def release_year_fits(item, year):
+    # Same-name remakes: the index can't tell them apart, the year in the filename can
+    released = (item.get('release_date') or item.get('first_air_date') or '')[:4]
+    return not year or not released.isdigit() or abs(int(released) - int(year)) <= 1
+
+async def fetch_tmdb(query, year):
+    # Names the offline index knows resolve to an id locally: cacheable id fetches instead of a free-text search.
+    # Scoring the postings is pure Python (difflib), so the lookup runs off the loop
+    if title_index.get_index() is None: return await fetch_tmdb_search(query, year)
+    matches = await asyncio.get_running_loop().run_in_executor(None, title_index.lookup, query, TITLE_INDEX_FETCHES)
+    fetched = await asyncio.gather(*(fetch_tmdb_details(m['kind'], m['id']) for m in matches), return_exceptions=True)
+    items = []
+    for match, item in zip(matches, fetched):
+        if isinstance(item, BaseException):
+            logging.warning(f"TMDB id fetch {match['kind']}/{match['id']} for '{query}' failed: {item!r}")
+        else: items.append(item)
+    chosen = next((item for item in items if release_year_fits(item, year)), None)
+    if chosen:
+        CACHE_LOOKUPS.inc(cache="title_index", result="hit")
+        # The other confident matches ride along as RE-VERIFY alternatives
+        return {"results": [chosen] + [item for item in items if item is not chosen]}
+    CACHE_LOOKUPS.inc(cache="title_index", result="miss")
+    return await fetch_tmdb_search(query, year)
+
+async def fetch_tvmaze(query, year):
+    url = f"{TVMAZE_API_URL}/singlesearch/shows"
+    res = await http_client.get(url, params={"q": query})
+    # singlesearch answers "no such show" with a 404 (and a JSON body that would read as a show called "Not Found")
+    if res.status_code == 404: return None
+    res.raise_for_status()
+    return res.json()
+
+async def fetch_jikan(query, year):
+    url = f"{JIKAN_API_URL}/anime"
+    res = await http_client.get(url, params={"q": query, "limit": candidates.CANDIDATE_LIMIT})
+    # Jikan's 429/5xx come with a JSON body too, which would read as "no match"
+    res.raise_for_status()
+    return res.json()
+
+async def fetch_omdb(query, year):
+    url = OMDB_API_URL
+    params = {"t": query}
+    if year: params["y"] = year
+    return await get_json_with_key(OMDB_POOL, url, lambda key: {"apikey": key, **params})
+
+PROVIDERS = {'tmdb': fetch_tmdb, 'tvmaze': fetch_tvmaze, 'jikan': fetch_jikan, 'omdb': fetch_omdb}
+# RE-VERIFY's broader query skips the index on purpose: it is after what the exact match missed
+DEEP_PROVIDERS = {**PROVIDERS, 'tmdb': fetch_tmdb_search}
+
+def apply_tmdb(data, res, title, year):
+    if not res.get('results'): return
+    best_item = res['results'][0] 
     
-    query = title.strip()
-    if re_verify: query = query.split(' ')[0]
+    if year:
+        for item in res['results']:
+            item_date = item.get('release_date') or item.get('first_air_date') or ""
+            if str(year) in item_date:
+                best_item = item
+                break
 
-    data = {"title": title, "rating": "N/A", "genres": "Misc", "date": "N/A", "type": "movie"}
-    is_anime_hint = 'anime' in original_filename.lower() or 'judas' in original_filename.lower()
+    m_type = best_item.get('media_type', 'movie')
+    data['type'] = 'series' if m_type == 'tv' else 'movie'
+    
+    genre_list = [TMDB_GENRES.get(g_id) for g_id in best_item.get('genre_ids', []) if g_id in TMDB_GENRES]
+    if genre_list: data['genres'] = ", ".join(genre_list[:3])
+    
+    country = best_item.get('origin_country', [''])[0] if best_item.get('origin_country') else ''
+    language = best_item.get('original_language', '')
+    is_animation = 16 in best_item.get('genre_ids', [])
+    
+    if is_animation and (country == 'JP' or language == 'ja'):
+        data['type'] = 'anime'
+    elif data['type'] == 'series':
+        if country == 'KR' or language == 'ko': data['type'] = 'kdrama'
+        elif country == 'CN' or language == 'zh': data['type'] = 'cdrama'
+        elif country == 'JP' or language == 'ja': data['type'] = 'jdrama'
+    elif data['type'] == 'movie':
+        if country == 'IN' or language in ['hi', 'ta', 'te', 'ml']: data['type'] = 'indian'
+        elif country == 'KR' or language == 'ko': data['type'] = 'kmovie'
+        elif country == 'JP' or language == 'ja': data['type'] = 'jmovie'
+        
+    data['title'] = best_item.get('title') or best_item.get('name') or title
+    data['rating'] = f"{round(best_item.get('vote_average', 0), 1)} ⭐" if best_item.get('vote_average') else "N/A"
+    data['date'] = (best_item.get('release_date') or best_item.get('first_air_date') or "N/A")[:4]
+    data['sources'].append('tmdb')
 
-    try:
-        url = f"https://api.themoviedb.org/3/search/multi?api_key={tm_key}&query={requests.utils.quote(query)}"
-        res = requests.get(url, timeout=5).json()
-        if res.get('results'):
-            best_item = res['results'][0] 
-            
-            if year:
-                for item in res['results']:
-                    item_date = item.get('release_date') or item.get('first_air_date') or ""
-                    if str(year) in item_date:
-                        best_item = item
-                        break
-
-            m_type = best_item.get('media_type', 'movie')
-            data['type'] = 'series' if m_type == 'tv' else 'movie'
-            
-            genre_list = [TMDB_GENRES.get(g_id) for g_id in best_item.get('genre_ids', []) if g_id in TMDB_GENRES]
-            if genre_list: data['genres'] = ", ".join(genre_list[:3])
-            
-            country = best_item.get('origin_country', [''])[0] if best_item.get('origin_country') else ''
-            language = best_item.get('original_language', '')
-            is_animation = 16 in best_item.get('genre_ids', [])
-            
-            if is_animation and (country == 'JP' or language == 'ja'):
-                data['type'] = 'anime'
-            elif data['type'] == 'series':
-                if country == 'KR' or language == 'ko': data['type'] = 'kdrama'
-                elif country == 'CN' or language == 'zh': data['type'] = 'cdrama'
-                elif country == 'JP' or language == 'ja': data['type'] = 'jdrama'
-            elif data['type'] == 'movie':
-                if country == 'IN' or language in ['hi', 'ta', 'te', 'ml']: data['type'] = 'indian'
-                elif country == 'KR' or language == 'ko': data['type'] = 'kmovie'
-                elif country == 'JP' or language == 'ja': data['type'] = 'jmovie'
-                
-            data['title'] = best_item.get('title') or best_item.get('name') or title
-            data['rating'] = f"{round(best_item.get('vote_average', 0), 1)} ⭐" if best_item.get('vote_average') else "N/A"
-            data['date'] = (best_item.get('release_date') or best_item.get('first_air_date') or "N/A")[:4]
-    except: pass
+def apply_tvmaze(data, res):
+    if not res: return
+    data['title'] = res.get('name', data['title'])
+    if res.get('rating', {}).get('average'): data['rating'] = f"{res['rating']['average']} ⭐"
+    data['date'] = res.get('premiered', data['date'])[:4] if res.get('premiered') else data['date']
+    if res.get('genres'): data['genres'] = ", ".join(res['genres'][:3])
+    
+    tvm_country = (res.get('network') or {}).get('country', {}).get('code', '')
+    if not tvm_country and res.get('webChannel'):
+        tvm_country = (res['webChannel'].get('country') or {}).get('code', '')
+        
+    if tvm_country == 'KR': data['type'] = 'kdrama'
+    elif tvm_country == 'CN': data['type'] = 'cdrama'
+    elif tvm_country == 'JP': data['type'] = 'jdrama'
+    data['sources'].append('tvmaze')
+
+def apply_jikan(data, res):
+    if not res.get('data'): return False
+    anime = res['data'][0]
+    data['title'] = anime.get('title_english') or anime.get('title') or data['title']
+    data['rating'] = f"{anime.get('score', 'N/A')} ⭐"
+    data['date'] = str(anime.get('year') or data['date'])
+    genres = [g['name'] for g in anime.get('genres', [])]
+    if genres: data['genres'] = ", ".join(genres[:3])
+    data['type'] = 'anime'
+    data['sources'].append('jikan')
+    return True
+
+def apply_omdb(data, res):
+    if res.get("Response") != "True": return
+    data['title'] = res.get('Title', data['title'])
+    data['rating'] = f"{res.get('imdbRating', 'N/A')} ⭐"
+    data['genres'] = res.get('Genre', 'Misc')
+    data['date'] = res.get('Year', data['date'])[:4]
+    
+    omdb_country = res.get('Country', '')
+    if res.get('Type') == 'series':
+        if 'South Korea' in omdb_country: data['type'] = 'kdrama'
+        elif 'China' in omdb_country: data['type'] = 'cdrama'
+        elif 'Japan' in omdb_country: data['type'] = 'jdrama'
+        else: data['type'] = 'series'
+    else:
+        if 'India' in omdb_country: data['type'] = 'indian'
+        elif 'South Korea' in omdb_country: data['type'] = 'kmovie'
+        elif 'Japan' in omdb_country: data['type'] = 'jmovie'
+    data['sources'].append('omdb')
+
+def blank_metadata(title):
+    return {"title": title, "rating": "N/A", "genres": "Misc", "date": "N/A", "type": "movie", "sources": [], "candidates": []}
+
+def provider_candidates(name, res, title):
+    # Each hit on its own, run through the same apply_* rules as the merged answer
+    if name == 'tmdb': hits = [{"results": [item]} for item in (res.get('results') or [])[:candidates.CANDIDATE_LIMIT]]
+    elif name == 'jikan': hits = [{"data": [item]} for item in (res.get('data') or [])[:candidates.CANDIDATE_LIMIT]]
+    else: hits = [res]
+
+    out = []
+    for hit in hits:
+        cand = blank_metadata(title)
+        if name == 'tmdb': apply_tmdb(cand, hit, title, None)
+        elif name == 'tvmaze':
+            # TVmaze only lists shows; apply_tvmaze just refines the type for KR/CN/JP
+            cand['type'] = 'series'
+            apply_tvmaze(cand, hit)
+        elif name == 'jikan': apply_jikan(cand, hit)
+        else: apply_omdb(cand, hit)
+        if cand['sources']: out.append(candidates.strip(cand))
+    return out
+
+async def merge_provider_results(data, fetch, title, year, is_anime_hint):
+    # Precedence: TMDB sets the base, TVmaze fills series ratings, Jikan wins for anime, OMDb fills missing genres
+    raw_fetch = fetch
+    async def fetch(name):
+        res = await raw_fetch(name)
+        if res: data['candidates'] += provider_candidates(name, res, title)
+        return res
+
+    res = await fetch('tmdb')
+    if res is not None: apply_tmdb(data, res, title, year)
 
     if data['rating'] == 'N/A' and data['type'] in ['series', 'kdrama', 'cdrama', 'jdrama']:
-        try:
-            url = f"https://api.tvmaze.com/singlesearch/shows?q={requests.utils.quote(query)}"
-            res = requests.get(url, timeout=5).json()
-            if res:
-                data['title'] = res.get('name', data['title'])
-                if res.get('rating', {}).get('average'): data['rating'] = f"{res['rating']['average']} ⭐"
-                data['date'] = res.get('premiered', data['date'])[:4] if res.get('premiered') else data['date']
-                if res.get('genres'): data['genres'] = ", ".join(res['genres'][:3])
-                
-                tvm_country = res.get('network', {}).get('country', {}).get('code', '')
-                if not tvm_country and res.get('webChannel'):
-                    tvm_country = res['webChannel'].get('country', {}).get('code', '')
-                    
-                if tvm_country == 'KR': data['type'] = 'kdrama'
-                elif tvm_country == 'CN': data['type'] = 'cdrama'
-                elif tvm_country == 'JP': data['type'] = 'jdrama'
-        except: pass
+        res = await fetch('tvmaze')
+        if res is not None: apply_tvmaze(data, res)
 
     if data['type'] == 'anime' or is_anime_hint:
-        try:
-            url = f"https://api.jikan.moe/v4/anime?q={requests.utils.quote(query)}&limit=1"
-            res = requests.get(url, timeout=5).json()
-            if res.get('data'):
-                anime = res['data'][0]
-                data['title'] = anime.get('title_english') or anime.get('title') or data['title']
-                data['rating'] = f"{anime.get('score', 'N/A')} ⭐"
-                data['date'] = str(anime.get('year') or data['date'])
-                genres = [g['name'] for g in anime.get('genres', [])]
-                if genres: data['genres'] = ", ".join(genres[:3])
-                data['type'] = 'anime'
-                return data
-        except: pass
+        res = await fetch('jikan')
+        if res is not None and apply_jikan(data, res): return
 
     if data['genres'] == "Misc":
-        try:
-            url = f"http://www.omdbapi.com/?apikey={om_key}&t={requests.utils.quote(query)}"
-            if year: url += f"&y={year}"
-            res = requests.get(url, timeout=5).json()
-            if res.get("Response") == "True":
-                data['title'] = res.get('Title', data['title'])
-                data['rating'] = f"{res.get('imdbRating', 'N/A')} ⭐"
-                data['genres'] = res.get('Genre', 'Misc')
-                data['date'] = res.get('Year', data['date'])[:4]
-                
-                omdb_country = res.get('Country', '')
-                if res.get('Type') == 'series':
-                    if 'South Korea' in omdb_country: data['type'] = 'kdrama'
-                    elif 'China' in omdb_country: data['type'] = 'cdrama'
-                    elif 'Japan' in omdb_country: data['type'] = 'jdrama'
-                    else: data['type'] = 'series'
-                else:
-                    if 'India' in omdb_country: data['type'] = 'indian'
-                    elif 'South Korea' in omdb_country: data['type'] = 'kmovie'
-                    elif 'Japan' in omdb_country: data['type'] = 'jmovie'
-        except: pass
+        res = await fetch('omdb')
+        if res is not None: apply_omdb(data, res)
+
+def provider_error_type(error):
+    if isinstance(error, httpx.HTTPStatusError): return f"http_{error.response.status_code}"
+    if isinstance(error, httpx.TimeoutException): return "timeout"
+    if isinstance(error, KeyPoolExhausted): return "no_key"
+    return type(error).__name__
+
+async def call_provider(name, query, year, deep=False):
+    start = time.perf_counter()
+    try:
+        res = await (DEEP_PROVIDERS if deep else PROVIDERS)[name](query, year)
+    except asyncio.CancelledError:
+        record_provider(name, "cancelled", time.perf_counter() - start)
+        raise
+    except Exception as e:
+        record_provider(name, "error", time.perf_counter() - start, provider_error_type(e))
+        raise
+    record_provider(name, "ok" if res else "empty", time.perf_counter() - start)
+    return res
+
+async def query_metadata_providers(title, year, is_anime_hint, re_verify=False):
+    query = title.strip()
+    if re_verify: query = query.split(' ')[0]
+
+    data = blank_metadata(title)
+
+    if META_MODE != "fanout":
+        async def fetch(name):
+            try: return await call_provider(name, query, year, re_verify)
+            except Exception as e:
+                logging.warning(f"{name} lookup failed for '{query}': {e!r}")
+                data['degraded'] = True
+                return None
+
+        await merge_provider_results(data, fetch, title, year, is_anime_hint)
+        return data
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + META_DEADLINE
+    tasks = {}
+
+    def start_task(name):
+        if name not in tasks: tasks[name] = asyncio.ensure_future(call_provider(name, query, year, re_verify))
+        return tasks[name]
 
+    for name in META_FANOUT_PROVIDERS:
+        if name in PROVIDERS and (name != 'jikan' or is_anime_hint): start_task(name)
+
+    async def hedge():
+        await asyncio.sleep(META_HEDGE_DELAY)
+        if 'tmdb' in tasks and tasks['tmdb'].done(): return
+        for name in META_HEDGE_PROVIDERS:
+            if name in PROVIDERS: start_task(name)
+    hedger = asyncio.ensure_future(hedge()) if META_HEDGE_DELAY >= 0 and META_HEDGE_PROVIDERS else None
+
+    async def fetch(name):
+        # Providers the merge needs but nobody started yet (e.g. Jikan after TMDB says anime) join late
+        task = start_task(name)
+        remaining = deadline - loop.time()
+        if remaining <= 0 and not task.done():
+            metrics.PROVIDER_ERRORS.inc(provider=name, error="deadline")
+            data['degraded'] = True
+            return None
+        try: return await asyncio.wait_for(asyncio.shield(task), timeout=max(remaining, 0))
+        except asyncio.TimeoutError:
+            metrics.PROVIDER_ERRORS.inc(provider=name, error="deadline")
+            logging.warning(f"{name} lookup for '{query}' missed the {META_DEADLINE}s deadline")
+        except Exception as e:
+            logging.warning(f"{name} lookup failed for '{query}': {e!r}")
+        data['degraded'] = True
+        return None
+
+    try:
+        await merge_provider_results(data, fetch, title, year, is_anime_hint)
+    finally:
+        if hedger: hedger.cancel()
+        # Answers the merge never asked for (or that missed the deadline) are dropped, not awaited
+        for task in tasks.values():
+            if not task.done(): task.cancel()
+            elif not task.cancelled(): task.exception()
     return data
 
 # ================= UI BUILDERS =================
@@ -283,12 +737,12 @@ def get_help_menu_markup():
         [InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu", api_kwargs={"style": "danger"})]
     ])
 
-def get_media_markup(title):
-    imdb_url = f"https://www.imdb.com/find/?q={requests.utils.quote(title.replace(' ', '+'))}"
+def get_media_markup(title, next_page=1):
+    imdb_url = f"https://www.imdb.com/find/?q={quote(title.replace(' ', '+'))}"
     return InlineKeyboardMarkup([
         [
             InlineKeyboardButton("🎬 IMDB INFO", url=imdb_url, api_kwargs={"style": "primary"}),
-            InlineKeyboardButton("🔄 RE-VERIFY", callback_data="reverify", api_kwargs={"style": "danger"})
+            InlineKeyboardButton("🔄 RE-VERIFY", callback_data=f"rv:{next_page}", api_kwargs={"style": "danger"})
         ],
         [InlineKeyboardButton("📢 JOIN CHANNEL", url="https://t.me/THEUPDATEDGUYS", api_kwargs={"style": "success"})]
     ])
@@ -326,12 +780,12 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     first_name = esc(update.effective_user.first_name)
     
-    await update.message.reply_photo(
-        photo=random.choice(IMAGE_LINKS),
+    await ASSETS.send(random.choice(IMAGE_LINKS), lambda photo: update.message.reply_photo(
+        photo=photo,
         caption=START_TEXT.format(name=first_name),
         parse_mode=ParseMode.HTML,
         reply_markup=get_main_menu_markup()
-    )
+    ))
 
 async def alive_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message: return
@@ -343,56 +797,22 @@ async def alive_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await update.message.reply_text("<b>Yes darling, I am alive. Don't worry! 😘</b>", parse_mode=ParseMode.HTML)
 
-async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE, re_title=None):
-    query = update.callback_query
-    msg = query.message if query else update.message
-    if not msg: return
-
-    if update.message:
-        try: await update.message.set_reaction(reaction=ReactionTypeEmoji(random.choice(EMOJIS)), is_big=True)
-        except: pass
-
-    media = msg.document or msg.video
-    if not media: return
-
-    loading_sticker = None
-    if not query:
-        try: loading_sticker = await msg.reply_sticker(sticker=random.choice(LOADING_STICKERS))
-        except: pass
-
-    original_name = getattr(media, 'file_name', 'Unknown_File.mp4')
-    clean_original = pre_clean_filename(original_name)
-    parsed = guessit(clean_original)
-    
-    search_q = re_title or parsed.get('title', 'Unknown')
-    search_year = parsed.get('year') 
-    
-    info = fetch_smart_metadata(search_q, search_year, original_name, re_verify=bool(re_title))
-    
-    size = format_size(getattr(media, 'file_size', 0))
-    audio = detect_languages(original_name, parsed.get('language'))
-    
-    real_res = await get_real_resolution(media.file_id, context)
-    if not real_res:
-        g_res = parsed.get('screen_size')
-        real_res = f"FHD (1080p)" if str(g_res) == '1080p' else (f"HD (720p)" if str(g_res) == '720p' else str(g_res or 'FHD (1080p)'))
-
-    header_map = {
-        'kdrama': ("🎭 <b>𝗞-𝗗𝗥𝗔𝗠𝗔 𝗘𝗗𝗜𝗧𝗜𝗢𝗡</b> 🎭", "🍿", "🇰🇷"),
-        'cdrama': ("🏮 <b>𝗖-𝗗𝗥𝗔𝗠𝗔 𝗘𝗗𝗜𝗧𝗜𝗢𝗡</b> 🏮", "🍿", "🇨🇳"),
-        'jdrama': ("🎌 <b>𝗝-𝗗𝗥𝗔𝗠𝗔 𝗘𝗗𝗜𝗧𝗜𝗢𝗡</b> 🎌", "🍿", "🇯🇵"),
-        'indian': ("🪷 <b>𝗜𝗡𝗗𝗜𝗔𝗡 𝗖𝗜𝗡𝗘𝗠𝗔</b> 🪷", "🎥", "🇮🇳"),
-        'kmovie': ("🎬 <b>𝗞𝗢𝗥𝗘𝗔𝗡 𝗠𝗢𝗩𝗜𝗘</b> 🎬", "🎥", "🇰🇷"),
-        'jmovie': ("👹 <b>𝗝𝗔𝗣𝗔𝗡𝗘𝗦𝗘 𝗠𝗢𝗩𝗜𝗘</b> 👹", "🎥", "🇯🇵"),
-        'anime': ("✨ <b>𝗔𝗡𝗜𝗠𝗘 𝗘𝗗𝗜𝗧𝗜𝗢𝗡</b> ✨", "⛩️", "🎌"),
-        'series': ("📺 <b>𝗦𝗘𝗥𝗜𝗘𝗦 𝗘𝗗𝗜𝗧𝗜𝗢𝗡</b> 📺", "🍿", "⭐"),
-        'movie': ("🎬 <b>𝗠𝗢𝗩𝗜𝗘 𝗘𝗗𝗜𝗧𝗜𝗢𝗡</b> 🎬", "🎥", "⭐")
-    }
-    
-    h_data = header_map.get(info['type'], header_map['movie'])
-    header, icon1, icon2 = h_data[0], h_data[1], h_data[2]
+# ================= MEDIA PIPELINE =================
+HEADER_MAP = {
+    'kdrama': ("🎭 <b>𝗞-𝗗𝗥𝗔𝗠𝗔 𝗘𝗗𝗜𝗧𝗜𝗢𝗡</b> 🎭", "🍿", "🇰🇷"),
+    'cdrama': ("🏮 <b>𝗖-𝗗𝗥𝗔𝗠𝗔 𝗘𝗗𝗜𝗧𝗜𝗢𝗡</b> 🏮", "🍿", "🇨🇳"),
+    'jdrama': ("🎌 <b>𝗝-𝗗𝗥𝗔𝗠𝗔 𝗘𝗗𝗜𝗧𝗜𝗢𝗡</b> 🎌", "🍿", "🇯🇵"),
+    'indian': ("🪷 <b>𝗜𝗡𝗗𝗜𝗔𝗡 𝗖𝗜𝗡𝗘𝗠𝗔</b> 🪷", "🎥", "🇮🇳"),
+    'kmovie': ("🎬 <b>𝗞𝗢𝗥𝗘𝗔𝗡 𝗠𝗢𝗩𝗜𝗘</b> 🎬", "🎥", "🇰🇷"),
+    'jmovie': ("👹 <b>𝗝𝗔𝗣𝗔𝗡𝗘𝗦𝗘 𝗠𝗢𝗩𝗜𝗘</b> 👹", "🎥", "🇯🇵"),
+    'anime': ("✨ <b>𝗔𝗡𝗜𝗠𝗘 𝗘𝗗𝗜𝗧𝗜𝗢𝗡</b> ✨", "⛩️", "🎌"),
+    'series': ("📺 <b>𝗦𝗘𝗥𝗜𝗘𝗦 𝗘𝗗𝗜𝗧𝗜𝗢𝗡</b> 📺", "🍿", "⭐"),
+    'movie': ("🎬 <b>𝗠𝗢𝗩𝗜𝗘 𝗘𝗗𝗜𝗧𝗜𝗢𝗡</b> 🎬", "🎥", "⭐")
+}
 
-    caption = f"""
+def build_caption(info, inputs):
+    header, icon1, icon2 = HEADER_MAP.get(info['type'], HEADER_MAP['movie'])
+    return f"""
 {header}
 <blockquote><b>{esc(info['title'])}</b></blockquote>
 
@@ -400,77 +820,427 @@ async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE, re_ti
 ├ {icon2} <b>Rating</b>  : {esc(info['rating'])}
 ├ 🎭 <b>Genres</b>  : <i>{esc(info['genres'])}</i>
 ├ 📅 <b>Release</b> : <code>{esc(info['date'])}</code>
-├ 🔊 <b>Audio</b>   : <code>{esc(audio)}</code>
-├ 🖥️ <b>Quality</b> : <code>{esc(real_res)}</code>
-╰ 💾 <b>Size</b>    : <code>{esc(size)}</code>
+├ 🔊 <b>Audio</b>   : <code>{esc(inputs['audio'])}</code>
+├ 🖥️ <b>Quality</b> : <code>{esc(inputs['resolution'])}</code>
+╰ 💾 <b>Size</b>    : <code>{esc(inputs['size'])}</code>
 
 ‣ <blockquote><b>@DmOwner</b></blockquote>
 """
 
-    markup = get_media_markup(info['title'])
-
-    if loading_sticker:
-        try: await loading_sticker.delete()
-        except: pass
-
-    if query:
-        # 🔥 SAFELY CATCHES THE BAD_REQUEST IF DATA IS IDENTICAL
-        try:
-            await query.edit_message_caption(caption=caption, parse_mode=ParseMode.HTML, reply_markup=markup)
-        except BadRequest as e:
-            if "not modified" in str(e).lower():
-                pass 
-            else:
-                logging.error(f"Error editing caption: {e}")
+async def resolve_media(media, context, re_verify=False):
+    inputs = await PROBE_CACHE.aget(media.file_unique_id)
+    CACHE_LOOKUPS.inc(cache="probe", result="hit" if inputs else "miss")
+    if inputs:
+        info = await fetch_smart_metadata(inputs['title'], inputs['year'], inputs['file_name'], re_verify=re_verify)
     else:
-        await context.bot.copy_message(
+        inputs = await parse_caption_inputs(media)
+        # The metadata lookup only needs the parsed name, so it runs alongside the container probe
+        info, stream = await asyncio.gather(
+            fetch_smart_metadata(inputs['title'], inputs['year'], inputs['file_name'], re_verify=re_verify),
+            IN_FLIGHT.do(("probe", media.file_unique_id), lambda: get_stream_info(media.file_id, context, inputs['file_name']))
+        )
+        remember_caption_inputs(media, inputs, stream)
+    return info, inputs
+
+async def send_captioned_copy(msg, context, info, inputs):
+    with stage('copy_message'):
+        copy = await TG_OUT.call(lambda: context.bot.copy_message(
             chat_id=msg.chat.id,
             from_chat_id=msg.chat.id,
             message_id=msg.message_id,
-            caption=caption,
+            caption=build_caption(info, inputs),
             parse_mode=ParseMode.HTML,
-            reply_markup=markup
-        )
+            reply_markup=get_media_markup(info['title'])
+        ), msg.chat.id, RESULT)
+    remember_candidates(msg.chat.id, copy.message_id, info, inputs)
+    return copy
+
+# ================= RE-VERIFY =================
+# The captioned copy shows candidate 0 (the merged answer); RE-VERIFY carries the index of
+# the next one in its callback data ("rv:N"). Pages come from CANDIDATE_STORE, so going
+# through the alternatives costs one edit and no API quota. Only when the list runs out
+# (or has expired) do we go back to the providers with a broader "deep" query.
+def candidate_key(chat_id, message_id):
+    return f"{chat_id}:{message_id}"
+
+def ranked_candidates(info, inputs):
+    alternatives = candidates.rank(info.get('candidates') or [], inputs['title'], inputs['year'],
+                                   inputs.get('episodic', False), is_anime_hinted(inputs['file_name']))
+    return candidates.merge([candidates.strip(info)], alternatives, limit=candidates.CANDIDATE_LIMIT + 1)
+
+def remember_candidates(chat_id, message_id, info, inputs, ranked=None):
+    entry = {"inputs": inputs, "candidates": ranked or ranked_candidates(info, inputs)}
+    CANDIDATE_STORE.set(candidate_key(chat_id, message_id), entry, candidates.CANDIDATE_TTL)
+    return entry
+
+async def show_candidate(query, entry, page):
+    info = entry['candidates'][page]
+    # 🔥 SAFELY CATCHES THE BAD_REQUEST IF DATA IS IDENTICAL
+    try:
+        with stage('edit_caption'):
+            await TG_OUT.call(lambda: query.edit_message_caption(caption=build_caption(info, entry['inputs']), parse_mode=ParseMode.HTML,
+                                                                 reply_markup=get_media_markup(info['title'], page + 1)),
+                              query.message.chat.id, RESULT)
+    except BadRequest as e:
+        if "not modified" in str(e).lower():
+            pass
+        else:
+            logging.error(f"Error editing caption: {e}")
+
+async def reverify_from_network(update, context, page):
+    query = update.callback_query
+    msg = query.message
+    media = msg.document or msg.video
+    if not media: return
+    key = candidate_key(msg.chat.id, msg.message_id)
+
+    with job_trace('reverify', getattr(media, 'file_name', None) or msg.message_id):
+        entry = await CANDIDATE_STORE.aget(key)
+        if entry is None:
+            # Expired (or a caption from before candidates were kept): rebuild from the usual lookup, mostly a cache hit
+            info, inputs = await resolve_media(media, context)
+            entry = remember_candidates(msg.chat.id, msg.message_id, info, inputs)
+            if page >= len(entry['candidates']): page = 0
+        else:
+            # Out of alternatives: a broader query, ranked against the original title, appended to the list
+            info, inputs = await resolve_media(media, context, re_verify=True)
+            known = len(entry['candidates'])
+            merged = candidates.merge(entry['candidates'], ranked_candidates(info, entry['inputs']))
+            entry = remember_candidates(msg.chat.id, msg.message_id, info, entry['inputs'], merged)
+            page = known if len(merged) > known else 0
+        await show_candidate(query, entry, page)
+
+async def reverify_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    try: page = int(query.data.split(":", 1)[1]) if query.data.startswith("rv:") else 1
+    except ValueError: page = 1
+
+    entry = await CANDIDATE_STORE.aget(candidate_key(query.message.chat.id, query.message.message_id))
+    CACHE_LOOKUPS.inc(cache="candidates", result="hit" if entry and page < len(entry['candidates']) else "miss")
+    if entry and page < len(entry['candidates']):
+        await query.answer(f"🔄 Match {page + 1} of {len(entry['candidates'])}")
+        await show_candidate(query, entry, page)
+        return
+
+    try: await MEDIA_SCHEDULER.submit(query.message.chat.id, lambda: reverify_from_network(update, context, page))
+    except QueueFull:
+        await query.answer("🚦 Too many files in the queue right now, tap RE-VERIFY again in a bit.", show_alert=True)
+        return
+    await query.answer("🔄 Engaging Deep Match Protocol...", show_alert=True)
+
+# ================= ADMISSION & BATCHING =================
+# Albums (media_group_id) and bursts of episodes of one show are resolved as a batch:
+# one provider chain per show, concurrent probes, captioned copies sent in order.
+# Anything else goes straight to the queue so single uploads don't wait for the window.
+BATCH_WINDOW = float(os.getenv("BATCH_WINDOW", 1.5))
+BATCH_PROBE_CONCURRENCY = int(os.getenv("BATCH_PROBE_CONCURRENCY", 4))
+
+# Per-chat tickets taken on arrival, so a file whose name needs guessit can't be overtaken
+# by a later one the fast path parsed without yielding
+ARRIVALS = ArrivalOrder()
+QUEUE_NOTICES = set()
+
+async def submit_media(chat_id, updates, context):
+    # Returns once the job is queued; the "Queued, position N" notice is sent in the background
+    first = updates[0].message
+    notice = None
+    started = False
+    async def job():
+        nonlocal started
+        started = True
+        if notice: await cosmetic(chat_id, 'notice_delete', notice.delete)
+        if len(updates) == 1: await handle_media(updates[0], context)
+        else: await handle_media_batch(updates, context)
+
+    try:
+        ahead = await MEDIA_SCHEDULER.submit(chat_id, job)
+    except QueueFull:
+        try: await TG_OUT.call(lambda: first.reply_text("<b>🚦 Too many files in the queue right now, please send this one again in a bit.</b>", parse_mode=ParseMode.HTML), chat_id, NORMAL)
+        except Exception as e: metrics.telegram_error('queue_full', e)
+        return
+
+    async def queue_notice():
+        nonlocal notice
+        # A notice that would only show up once the job is running is pointless
+        try: notice = await TG_OUT.call(lambda: first.reply_text(f"<b>⏳ Queued, position {ahead}</b>", parse_mode=ParseMode.HTML),
+                                        chat_id, NORMAL, skip_if=lambda: started)
+        except Exception as e: metrics.telegram_error('queue_notice', e)
+        if notice and started: await cosmetic(chat_id, 'notice_delete', notice.delete)
+
+    if ahead > 0:
+        task = asyncio.ensure_future(queue_notice())
+        QUEUE_NOTICES.add(task)
+        task.add_done_callback(QUEUE_NOTICES.discard)
+
+async def flush_media_batch(key, items):
+    items.sort(key=lambda item: item[0].message.message_id)
+    await submit_media(key[0], [update for update, _ in items], items[0][1])
+
+MEDIA_BATCHER = MediaBatcher(flush_media_batch, window=BATCH_WINDOW, max_items=int(os.getenv("BATCH_MAX_FILES", 50)))
+register_stats("media_batches", MEDIA_BATCHER.stats)
+
+async def batch_key(msg, media):
+    if msg.media_group_id: return f"group:{msg.media_group_id}"
+    name = getattr(media, 'file_name', None)
+    if not name: return None
+    parsed = await parse_filename_offloaded(pre_clean_filename(name))
+    if parsed.get('type') == 'episode' and parsed.get('title'):
+        return "show:" + normalize_key(parsed['title'], parsed.get('season'))
+    return None
+
+async def queue_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.message
+    if not msg: return
+    media = msg.document or msg.video
+    if not media: return
+
+    chat_id = msg.chat.id
+    ticket = ARRIVALS.ticket(chat_id)
+    try:
+        key = await batch_key(msg, media) if BATCH_WINDOW > 0 else None
+        await ARRIVALS.wait_turn(chat_id, ticket)
+        # Earlier files of this chat still waiting in another batch are queued first, so copies keep the upload order
+        earlier = MEDIA_BATCHER.fire_where(lambda k: k[0] == chat_id and k[1] != key)
+        if earlier: await asyncio.wait(earlier)
+        if key: MEDIA_BATCHER.add((chat_id, key), (update, context))
+        else: await submit_media(chat_id, [update], context)
+    finally:
+        ARRIVALS.done(chat_id, ticket)
+
+# ================= COSMETIC CALLS =================
+# Reactions, the loading sticker and its delete: lowest priority, dropped rather than
+# waited for when the chat is at its flood limit, never allowed to fail the job.
+async def cosmetic(chat_id, call, fn, skip_if=None, paced=False):
+    try: return await TG_OUT.call(fn, chat_id, COSMETIC, skip_if=skip_if, paced=paced)
+    except Exception as e: metrics.telegram_error(call, e)
+
+def react(msg):
+    return asyncio.ensure_future(cosmetic(msg.chat.id, 'reaction', lambda: msg.set_reaction(reaction=ReactionTypeEmoji(random.choice(EMOJIS)), is_big=True)))
+
+async def loading_sticker_if_slow(msg, work):
+    # Cache hits finish well before anyone would notice a sticker: skip it and its delete
+    done, _ = await asyncio.wait({work}, timeout=STICKER_DELAY)
+    if done: return None
+    with stage('sticker'):
+        return await cosmetic(msg.chat.id, 'sticker', lambda: msg.reply_sticker(sticker=random.choice(LOADING_STICKERS)),
+                              skip_if=work.done, paced=True)
+
+async def handle_media_batch(updates, context):
+    messages = [u.message for u in updates]
+    with job_trace('batch', f"{len(messages)} files from chat {messages[0].chat.id}"):
+        reactions = [react(msg) for msg in messages]
+
+        gate = asyncio.Semaphore(BATCH_PROBE_CONCURRENCY)
+        async def resolve(msg):
+            async with gate:
+                try: return await resolve_media(msg.document or msg.video, context)
+                except Exception as e:
+                    logging.exception(f"Resolving {msg.message_id} in batch failed: {e!r}")
+                    return None
+
+        # Same show -> same metadata key, so the single-flight/cache layer runs one provider chain
+        work = asyncio.gather(*(resolve(msg) for msg in messages))
+        loading_sticker = None
+        try:
+            # One loading sticker for the whole batch instead of one per file
+            loading_sticker = await loading_sticker_if_slow(messages[0], work)
+            results = await work
+
+            for msg, result in zip(messages, results):
+                if not result: continue
+                try: await send_captioned_copy(msg, context, *result)
+                except Exception as e: logging.error(f"Sending batch copy of {msg.message_id} failed: {e!r}")
+        finally:
+            work.cancel()
+            if loading_sticker: await cosmetic(messages[0].chat.id, 'sticker_delete', loading_sticker.delete)
+            await asyncio.gather(*reactions)
+
+async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.message
+    if not msg: return
+
+    media = msg.document or msg.video
+    with job_trace('media', getattr(media, 'file_name', None) or msg.message_id):
+        reaction = react(msg)
+        if not media: return await reaction
+
+        work = asyncio.ensure_future(resolve_media(media, context))
+        loading_sticker = None
+        try:
+            loading_sticker = await loading_sticker_if_slow(msg, work)
+            info, inputs = await work
+            # The result goes out first, the sticker cleanup after it
+            await send_captioned_copy(msg, context, info, inputs)
+        finally:
+            work.cancel()
+            if loading_sticker: await cosmetic(msg.chat.id, 'sticker_delete', loading_sticker.delete)
+            await reaction
 
 async def callback_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer() 
-    
     data = query.data
+
+    # RE-VERIFY answers the query itself (a toast, or the alert when it has to search again)
+    if data == "reverify" or data.startswith("rv:"): return await reverify_callback(update, context)
+    await query.answer() 
     
     # 🔥 DYNAMIC UI ROTATION WITH TRY/EXCEPT 🔥
     if data == "help_menu":
         try:
-            await query.edit_message_media(
-                media=InputMediaPhoto(media=random.choice(IMAGE_LINKS), caption=HELP_TEXT, parse_mode=ParseMode.HTML),
+            await ASSETS.send(random.choice(IMAGE_LINKS), lambda photo: query.edit_message_media(
+                media=InputMediaPhoto(media=photo, caption=HELP_TEXT, parse_mode=ParseMode.HTML),
                 reply_markup=get_help_menu_markup()
-            )
+            ))
         except BadRequest: pass
 
     elif data == "main_menu":
         first_name = esc(update.effective_user.first_name)
         try:
-            await query.edit_message_media(
-                media=InputMediaPhoto(media=random.choice(IMAGE_LINKS), caption=START_TEXT.format(name=first_name), parse_mode=ParseMode.HTML),
+            await ASSETS.send(random.choice(IMAGE_LINKS), lambda photo: query.edit_message_media(
+                media=InputMediaPhoto(media=photo, caption=START_TEXT.format(name=first_name), parse_mode=ParseMode.HTML),
                 reply_markup=get_main_menu_markup()
-            )
+            ))
         except BadRequest: pass
-    
-    elif data == "reverify":
-        await query.answer("🔄 Engaging Deep Match Protocol...", show_alert=True)
-        await handle_media(update, context, re_title="DeepSearch")
 
-if __name__ == '__main__':
-    print("🚀 TITANIUM 22.0 (THE MASTERPIECE) IS ONLINE.")
-    
-    # Start Keep-Alive Server
-    keep_alive()
-    
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+# ================= DELIVERY MODE =================
+# polling: classic long-poll. webhook: Telegram pushes updates to WEBHOOK_URL, served by the
+# same HTTP server that answers Render's health pings on PORT.
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+BOT_MODE = os.getenv("BOT_MODE", "webhook" if WEBHOOK_URL else "polling").lower()
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or hashlib.sha256(BOT_TOKEN.encode()).hexdigest()[:32]
+
+async def on_startup(app):
+    pool = app.bot_data.get('worker_pool')
+    if pool:
+        # Receiver: the worker processes own the pipeline, this one only fans updates out and serves HTTP
+        pool.start()
+    else:
+        with startup.phase("restore cache snapshot"):
+            restored = cache.restore_snapshot(SNAPSHOT_CACHES, snapshot_path(app))
+        if restored: logging.info(f"💾 Restored {restored} cache entries from the last run")
+        # Create the pool before the first upload (process workers are spawned fresh, so they start with nothing of ours)
+        workers.get_executor()
+        MEDIA_SCHEDULER.start()
+        if ASSET_CHAT_ID and not app.bot_data.get('worker_index'):
+            app.bot_data['asset_warmup'] = asyncio.create_task(ASSETS.warm(app.bot, ASSET_CHAT_ID, IMAGE_LINKS))
+        app.bot_data['warmup'] = asyncio.create_task(background_upkeep(app))
+    # Worker processes report through the receiver's HTTP server instead of opening their own
+    if 'worker_index' in app.bot_data:
+        startup.ready()
+        return
+    if BOT_MODE == "webhook":
+        with startup.phase("http server"): app.bot_data['http_server'] = start_server(app, WEBHOOK_PATH, WEBHOOK_SECRET)
+    else:
+        app.bot_data['http_start'] = asyncio.create_task(start_server_later(app))
+    startup.ready()
+
+# Seconds queued and running media jobs get to finish on shutdown before they're cancelled
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", 20))
+
+async def on_stop(app):
+    # After updates stop coming in but before the bot's connection is closed, so the jobs
+    # still waiting in the queue can send their captioned copies
+    if app.bot_data.get('worker_pool'): return
+    await MEDIA_BATCHER.drain()
+    await MEDIA_SCHEDULER.stop(SHUTDOWN_DRAIN_TIMEOUT)
+    await TG_OUT.stop()
+
+async def on_shutdown(app):
+    for key in ('http_start', 'asset_warmup', 'warmup'):
+        task = app.bot_data.pop(key, None)
+        if task: task.cancel()
+    server = app.bot_data.pop('http_server', None)
+    if server: server.stop()
+    pool = app.bot_data.get('worker_pool')
+    if pool:
+        # Each worker drains its own queue (on_stop) before it exits
+        pool.stop(timeout=SHUTDOWN_DRAIN_TIMEOUT + 10)
+        return
+    await save_snapshot(app)
+    await http_client.close_all()
+    workers.shutdown()
+
+async def run_webhook(app):
+    base_url = (WEBHOOK_URL or os.getenv("RENDER_EXTERNAL_URL") or "").rstrip("/")
+    if not base_url:
+        raise ValueError("❌ BOT_MODE=webhook needs WEBHOOK_URL (or Render's RENDER_EXTERNAL_URL).")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try: loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError: pass
+
+    await app.initialize()
+    await on_startup(app)
+    await app.start()
+    await app.bot.set_webhook(url=f"{base_url}/{WEBHOOK_PATH}", secret_token=WEBHOOK_SECRET, allowed_updates=Update.ALL_TYPES)
+    try:
+        await stop.wait()
+    finally:
+        await app.stop()
+        await on_stop(app)
+        await app.shutdown()
+        await on_shutdown(app)
+
+def build_application(updater=True, worker_pool=None):
+    # Updates are handled concurrently: every lookup is awaitable now, so one slow API no longer stalls other chats
+    builder = (ApplicationBuilder().token(BOT_TOKEN)
+               .base_url(f"{TELEGRAM_API_URL}/bot").base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+               .concurrent_updates(True).post_init(on_startup).post_stop(on_stop).post_shutdown(on_shutdown))
+    # Webhook mode feeds the update queue from our own server, no Updater needed
+    if not updater: builder = builder.updater(None)
+    app = builder.build()
+    app.add_handler(TypeHandler(Update, note_first_update), group=-2)
+
+    if worker_pool:
+        # Receiver: every update is handed to its chat's worker process before any handler below runs
+        app.bot_data['worker_pool'] = worker_pool
+        app.add_handler(TypeHandler(Update, worker_pool.dispatch), group=-1)
+        register_stats("bot_workers", worker_pool.stats)
+        register_health("bot_workers", worker_pool.health)
+        metrics.register_source(worker_pool.worker_metrics)
     
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("alive", alive_cmd))
-    app.add_handler(MessageHandler(filters.VIDEO | filters.Document.ALL, handle_media))
+    app.add_handler(MessageHandler(filters.VIDEO | filters.Document.ALL, queue_media))
     app.add_handler(CallbackQueryHandler(callback_router))
+    return app
+
+async def profile_startup(app):
+    # --profile-startup: the start-up path of a polling run, minus the polling, then the report
+    with startup.phase("app.initialize (getMe)"):
+        try: await app.initialize()
+        except Exception as e: print(f"⚠️ app.initialize failed: {e!r}")
+    with startup.phase("on_startup"): await on_startup(app)
+    # What a real run does in the background once it's already polling, timed here one after the other
+    app.bot_data.pop('warmup').cancel()
+    # Webhook mode started the server inline (it's timed as "http server" already)
+    http_start = app.bot_data.get('http_start')
+    if http_start: await http_start
+    await warm_up()
+    startup.uninstall()
+    startup.report()
+    await on_stop(app)
+    await app.shutdown()
+    await on_shutdown(app)
+
+startup.checkpoint("module init")
+
+if __name__ == '__main__':
+    if "--profile-startup" in sys.argv:
+        with startup.phase("build_application"): app = build_application()
+        asyncio.run(profile_startup(app))
+        sys.exit(0)
+    print("🚀 TITANIUM 22.0 (THE MASTERPIECE) IS ONLINE.")
+    pool = None
+    if BOT_WORKERS > 1:
+        from cluster import WorkerPool
+        pool = WorkerPool(BOT_WORKERS)
+    app = build_application(updater=BOT_MODE != "webhook", worker_pool=pool)
     
-    app.run_polling()
+    if BOT_MODE == "webhook":
+        asyncio.run(run_webhook(app))
+    else:
+        app.run_polling()
@@ -0,0 +1,287 @@
+import os
+import gzip
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# ================= TWO-TIER CACHE =================
+# Hot entries live in an in-process LRU, everything else in a shared store so the cache
+# survives restarts and is visible to every bot process: a local SQLite file in WAL mode
+# (several processes read and write it safely), or Redis with CACHE_BACKEND=redis://...
+# Values must be JSON serializable.
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+CACHE_DB = os.getenv("CACHE_DB", os.path.join(CACHE_DIR, "bot_cache.sqlite3"))
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+_connections = {}
+
+def _connect(path):
+    conn = _connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL: readers never block the writer; busy_timeout: writers from other processes queue up instead of failing
+        conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        _connections[path] = conn
+    return conn
+
+class SQLiteStore:
+    errors = (sqlite3.Error,)
+    kind = "sqlite"
+    # A local file: cheap enough to query from the event loop
+    remote = False
+
+    def __init__(self, path):
+        self._db = _connect(path)
+
+    def create(self, name):
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS {name} (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)")
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {name}_accessed ON {name} (accessed)")
+
+    def get(self, name, key, now):
+        row = self._db.execute(f"SELECT value, expires FROM {name} WHERE key = ?", (key,)).fetchone()
+        if not row or row[1] <= now: return None
+        self._db.execute(f"UPDATE {name} SET accessed = ? WHERE key = ?", (now, key))
+        return row
+
+    def set(self, name, key, raw, expires, now):
+        self._db.execute(f"INSERT OR REPLACE INTO {name} (key, value, expires, accessed) VALUES (?, ?, ?, ?)", (key, raw, expires, now))
+
+    def delete(self, name, key):
+        self._db.execute(f"DELETE FROM {name} WHERE key = ?", (key,))
+
+    def evict(self, name, now, max_rows):
+        self._db.execute(f"DELETE FROM {name} WHERE expires <= ?", (now,))
+        count = self._db.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+        overflow = count - max_rows
+        if overflow <= 0: return 0
+        self._db.execute(f"DELETE FROM {name} WHERE key IN (SELECT key FROM {name} ORDER BY accessed ASC LIMIT ?)", (overflow,))
+        return overflow
+
+class RedisStore:
+    # Expiry is Redis' own (PX); size limits are left to the server's maxmemory policy.
+    # Calls are blocking network round trips, so TieredCache keeps them off the event loop.
+    kind = "redis"
+    remote = True
+
+    def __init__(self, url, prefix="bot:"):
+        import redis  # ⚠️ optional: pip install redis
+        self._r = redis.Redis.from_url(url, socket_timeout=2)
+        self._r.ping()
+        self.prefix = prefix
+        self.errors = (redis.RedisError, OSError)
+
+    def create(self, name):
+        pass
+
+    def get(self, name, key, now):
+        raw = self._r.get(f"{self.prefix}{name}:{key}")
+        if raw is None: return None
+        expires, _, value = raw.decode().partition("\n")
+        return value, float(expires)
+
+    def set(self, name, key, raw, expires, now):
+        ttl_ms = int((expires - now) * 1000)
+        if ttl_ms > 0: self._r.set(f"{self.prefix}{name}:{key}", f"{expires}\n{raw}", px=ttl_ms)
+
+    def delete(self, name, key):
+        self._r.delete(f"{self.prefix}{name}:{key}")
+
+    def evict(self, name, now, max_rows):
+        return 0
+
+_stores = {}
+_writer = None
+
+def _store_writer():
+    # One thread, so writes to a remote store land in the order they were made
+    global _writer
+    if _writer is None: _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-writer")
+    return _writer
+
+def open_store(path=None):
+    # One store per SQLite file / Redis URL, shared by every TieredCache in the process
+    redis_url = CACHE_BACKEND if path is None and CACHE_BACKEND.startswith(("redis://", "rediss://", "unix://")) else None
+    target = redis_url or path or CACHE_DB
+    store = _stores.get(target)
+    if store is None:
+        if redis_url:
+            try: store = RedisStore(redis_url)
+            except Exception as e:
+                logging.warning(f"Redis cache backend unavailable ({e!r}), using SQLite at {CACHE_DB}")
+                store = open_store(CACHE_DB)
+        else:
+            store = SQLiteStore(target)
+        _stores[target] = store
+    return store
+
+def key_text(value):
+    # Letters, digits and combining marks (Devanagari vowel signs) of any script are kept,
+    # everything else separates words: "दंगल" and "बाहुबली" must not share a key
+    text = unicodedata.normalize("NFKC", str(value)).casefold()
+    return " ".join("".join(c if c.isalnum() or unicodedata.category(c)[0] == "M" else " " for c in text).split())
+
+def normalize_key(*parts):
+    out = []
+    for p in parts:
+        if p is None: p = ""
+        elif isinstance(p, bool): p = int(p)
+        out.append(key_text(p))
+    return "|".join(out)
+
+class TieredCache:
+    def __init__(self, name, max_memory=1024, max_disk=50000, path=None):
+        self.name = name
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self._mem = OrderedDict()
+        self._writes = 0
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self.evictions = 0
+        self._db = None
+        try:
+            self._db = open_store(path)
+            self._db.create(name)
+        except Exception as e:
+            logging.warning(f"Cache '{name}' running memory-only, shared store unavailable: {e}")
+            self._db = None
+
+    def _remember(self, key, value, expires):
+        self._mem[key] = (expires, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_memory:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def _memory_get(self, key, now):
+        entry = self._mem.get(key)
+        if entry:
+            if entry[0] > now:
+                self._mem.move_to_end(key)
+                self.hits["memory"] += 1
+                return entry[1]
+            del self._mem[key]
+        return None
+
+    def _store_get(self, key, now):
+        try: return self._db.get(self.name, key, now)
+        except self._db.errors as e:
+            logging.warning(f"Cache '{self.name}' read failed: {e}")
+            return None
+
+    def _found(self, key, row):
+        if not row:
+            self.misses += 1
+            return None
+        value = json.loads(row[0])
+        self._remember(key, value, row[1])
+        self.hits["disk"] += 1
+        return value
+
+    def get(self, key):
+        # Blocks on the store; from the event loop use aget()
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None: return value
+        return self._found(key, self._store_get(key, now) if self._db else None)
+
+    async def aget(self, key):
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None: return value
+        if not self._db: return self._found(key, None)
+        if not self._db.remote: return self._found(key, self._store_get(key, now))
+        row = await asyncio.get_running_loop().run_in_executor(None, self._store_get, key, now)
+        return self._found(key, row)
+
+    def _write(self, key, raw, expires, now):
+        try:
+            self._db.set(self.name, key, raw, expires, now)
+            self._writes += 1
+            if self._writes % 256 == 0: self.evictions += self._db.evict(self.name, now, self.max_disk)
+        except self._db.errors as e:
+            logging.warning(f"Cache '{self.name}' write failed: {e}")
+
+    def _delete(self, key):
+        try: self._db.delete(self.name, key)
+        except self._db.errors as e: logging.warning(f"Cache '{self.name}' delete failed: {e}")
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        expires = now + ttl
+        self._remember(key, value, expires)
+        if not self._db: return
+        # Remote stores are written behind: the memory tier already answers for this process
+        if self._db.remote: _store_writer().submit(self._write, key, json.dumps(value), expires, now)
+        else: self._write(key, json.dumps(value), expires, now)
+
+    def delete(self, key):
+        self._mem.pop(key, None)
+        if not self._db: return
+        if self._db.remote: _store_writer().submit(self._delete, key)
+        else: self._delete(key)
+
+    def export(self):
+        # Live memory entries, least recently used first (so load() keeps the same LRU order)
+        now = time.time()
+        return [[key, expires, value] for key, (expires, value) in self._mem.items() if expires > now]
+
+    def load(self, entries):
+        now = time.time()
+        loaded = 0
+        for key, expires, value in entries:
+            if expires <= now: continue
+            self._remember(key, value, expires)
+            loaded += 1
+        return loaded
+
+    def stats(self):
+        total_hits = self.hits["memory"] + self.hits["disk"]
+        lookups = total_hits + self.misses
+        return {
+            "memory_hits": self.hits["memory"],
+            "disk_hits": self.hits["disk"],
+            "misses": self.misses,
+            "hit_rate": round(total_hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._mem),
+            "evictions": self.evictions,
+            "store": self._db.kind if self._db else None,
+        }
+
+# ================= SNAPSHOTS =================
+# The store already survives restarts, but a fresh process starts with an empty memory
+# tier and pays a store round trip (or, memory-only, a full lookup) for every hot key.
+# On shutdown the memory tiers are dumped to one gzipped JSON file and loaded back on start.
+SNAPSHOT_VERSION = 1
+
+def export_snapshot(caches):
+    # Runs on the event loop (the LRUs aren't thread-safe); write_snapshot can go to a thread
+    return {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "caches": {c.name: c.export() for c in caches}}
+
+def write_snapshot(path, snapshot):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=1) as f: json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    return sum(len(entries) for entries in snapshot["caches"].values())
+
+def restore_snapshot(caches, path):
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f: snapshot = json.load(f)
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable cache snapshot {path}: {e}")
+        return 0
+    if snapshot.get("version") != SNAPSHOT_VERSION: return 0
+    saved = snapshot.get("caches", {})
+    return sum(c.load(saved.get(c.name, ())) for c in caches)
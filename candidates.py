@@ -0,0 +1,66 @@
+import os
+import difflib
+
+from cache import key_text
+
+# ================= RE-VERIFY CANDIDATES =================
+# Every hit the providers returned for a file is kept (shaped like the merged metadata) so
+# RE-VERIFY can page through the alternatives locally, best first, instead of going back
+# to the network. Ranking: fuzzy title similarity, year distance, and whether the type
+# fits what the filename says (an SxxEyy file is rarely a movie).
+CANDIDATE_LIMIT = int(os.getenv("RV_MAX_CANDIDATES", 10))
+CANDIDATE_TTL = int(os.getenv("RV_CANDIDATE_TTL", 3 * 86400))
+
+SERIES_TYPES = {'series', 'kdrama', 'cdrama', 'jdrama', 'anime'}
+CAPTION_FIELDS = ("title", "rating", "genres", "date", "type")
+
+def _norm(title):
+    # Same folding as the cache keys, so "दंगल" or "鬼滅の刃" don't normalize to nothing
+    return key_text(title)
+
+def candidate_year(info):
+    date = str(info.get('date') or '')[:4]
+    return int(date) if date.isdigit() else None
+
+def identity(info):
+    return (_norm(info.get('title', '')), candidate_year(info))
+
+def strip(info):
+    # Only what the caption needs; provider bookkeeping (sources, nested candidates) stays out
+    return {k: info[k] for k in CAPTION_FIELDS if k in info}
+
+def similarity(a, b):
+    a, b = _norm(a), _norm(b)
+    if not a or not b: return 0.0
+    ratio = difflib.SequenceMatcher(None, a, b).ratio()
+    # "Dune" vs "Dune Part Two": containment is a strong hint even when the ratio is mediocre
+    if a in b or b in a: ratio = max(ratio, 0.8 * min(len(a), len(b)) / max(len(a), len(b)) + 0.2)
+    return ratio
+
+def score(info, title, year=None, episodic=False, anime_hint=False):
+    s = 0.6 * similarity(info.get('title', ''), title)
+
+    cand_year = candidate_year(info)
+    if year and cand_year: s += 0.25 * max(0.0, 1 - abs(int(year) - cand_year) / 5)
+    elif not year: s += 0.1
+
+    kind = info.get('type')
+    if episodic: s += 0.15 if kind in SERIES_TYPES else 0.0
+    elif kind not in SERIES_TYPES: s += 0.1
+    if anime_hint and kind == 'anime': s += 0.1
+    return s
+
+def rank(candidates, title, year=None, episodic=False, anime_hint=False):
+    scored = sorted(candidates, key=lambda c: score(c, title, year, episodic, anime_hint), reverse=True)
+    return merge([], scored)
+
+def merge(existing, new, limit=None):
+    # Appends what isn't on the list yet (same title + year counts as the same title)
+    seen = {identity(c) for c in existing}
+    out = list(existing)
+    for cand in new:
+        key = identity(cand)
+        if key in seen or not key[0]: continue
+        seen.add(key)
+        out.append(strip(cand))
+    return out[:limit] if limit else out
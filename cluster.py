@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import time
+import queue
+import asyncio
+import logging
+import multiprocessing
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop
+
+import metrics
+from keep_alive import collect_stats
+
+# ================= MULTI-PROCESS MODE =================
+# BOT_WORKERS=N: the main process only receives updates (polling or webhook) and serves
+# HTTP; every update goes, as JSON, to worker process chat_id % N. A chat always lands on
+# the same worker, so its files stay in order and its RE-VERIFY pages, batches and flood
+# buckets live in one place. Caches are shared through the store in cache.py (SQLite WAL
+# or Redis). Workers send a heartbeat with their stats and Prometheus samples back (the
+# receiver's /metrics serves them with a worker="N" label); dead ones are restarted.
+WORKER_QUEUE_SIZE = int(os.getenv("BOT_WORKER_QUEUE", 1000))
+HEARTBEAT_SECONDS = float(os.getenv("BOT_WORKER_HEARTBEAT", 5))
+# A worker that hasn't reported for this long counts as unhealthy on /status
+HEARTBEAT_STALE = 3 * HEARTBEAT_SECONDS + 10
+
+def chat_of(update):
+    if update.effective_chat: return update.effective_chat.id
+    if update.effective_user: return update.effective_user.id
+    return 0
+
+class WorkerPool:
+    def __init__(self, count):
+        self.count = count
+        # spawn, not fork: the receiver already has an event loop, sockets and threads
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queues = [self._ctx.Queue(WORKER_QUEUE_SIZE) for _ in range(count)]
+        self._status = self._ctx.Queue()
+        self._procs = [None] * count
+        self._heartbeats = {}
+        self._monitor = None
+        self.dispatched = [0] * count
+        self.dropped = 0
+        self.restarts = 0
+
+    def _spawn(self, index):
+        proc = self._ctx.Process(target=worker_main, args=(index, self._queues[index], self._status),
+                                 name=f"bot-worker-{index}", daemon=True)
+        proc.start()
+        self._procs[index] = proc
+        logging.info(f"🧵 Worker {index} started (pid {proc.pid})")
+
+    def start(self):
+        for index in range(self.count): self._spawn(index)
+        self._monitor = asyncio.create_task(self._watch())
+
+    def worker_for(self, chat_id):
+        return chat_id % self.count
+
+    async def dispatch(self, update: Update, context):
+        # TypeHandler in group -1 of the receiver: nothing else in this process sees the update
+        index = self.worker_for(chat_of(update))
+        try:
+            self._queues[index].put_nowait(update.to_json())
+            self.dispatched[index] += 1
+        except queue.Full:
+            self.dropped += 1
+            logging.warning(f"Worker {index} backlog full, dropping update {update.update_id}")
+        raise ApplicationHandlerStop
+
+    async def _watch(self):
+        while True:
+            while True:
+                try: index, snapshot = self._status.get_nowait()
+                except queue.Empty: break
+                self._heartbeats[index] = {"at": time.time(), **snapshot}
+            for index, proc in enumerate(self._procs):
+                if proc.is_alive(): continue
+                logging.error(f"Worker {index} (pid {proc.pid}) exited with code {proc.exitcode}, restarting")
+                self.restarts += 1
+                self._heartbeats.pop(index, None)
+                self._spawn(index)
+            await asyncio.sleep(1)
+
+    def stop(self, timeout=10):
+        if self._monitor: self._monitor.cancel()
+        for q in self._queues:
+            try: q.put_nowait(None)
+            except queue.Full: pass
+        deadline = time.monotonic() + timeout
+        for proc in self._procs:
+            if proc is None: continue
+            proc.join(max(0.1, deadline - time.monotonic()))
+            if proc.is_alive(): proc.terminate()
+
+    def _backlog(self, index):
+        try: return self._queues[index].qsize()
+        except NotImplementedError: return None  # macOS
+
+    def health(self):
+        now = time.time()
+        stale = [i for i in range(self.count)
+                 if not (self._procs[i] and self._procs[i].is_alive()) or now - self._heartbeats.get(i, {}).get("at", 0) > HEARTBEAT_STALE]
+        return {"ok": not stale, "workers": self.count, "unhealthy_workers": stale}
+
+    def worker_metrics(self):
+        # For metrics.register_source: each worker's samples as of its last heartbeat
+        return [("worker", str(index), beat["metrics"]) for index, beat in sorted(self._heartbeats.items()) if beat.get("metrics")]
+
+    def stats(self):
+        now = time.time()
+        per_worker = []
+        for index, proc in enumerate(self._procs):
+            beat = self._heartbeats.get(index, {})
+            per_worker.append({
+                "index": index,
+                "pid": proc.pid if proc else None,
+                "alive": bool(proc and proc.is_alive()),
+                "backlog": self._backlog(index),
+                "dispatched": self.dispatched[index],
+                "heartbeat_age_s": round(now - beat["at"], 1) if beat else None,
+                "stats": beat.get("stats"),
+            })
+        return {"workers": self.count, "dropped": self.dropped, "restarts": self.restarts, "per_worker": per_worker}
+
+# ================= WORKER PROCESS =================
+def worker_main(index, updates, status):
+    logging.basicConfig(format=f'%(asctime)s - worker {index} - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    # Started as `python bot.py`, spawn has already executed bot.py here as __mp_main__
+    bot = sys.modules.get('__mp_main__')
+    if not hasattr(bot, 'build_application'): import bot
+    try: asyncio.run(_worker_loop(bot, index, updates, status))
+    except KeyboardInterrupt: pass
+
+async def _heartbeat(index, status):
+    while True:
+        try: status.put_nowait((index, {"pid": os.getpid(), "stats": json.loads(json.dumps(collect_stats(), default=str)),
+                                        "metrics": metrics.collect()}))
+        except Exception as e: logging.warning(f"Heartbeat failed: {e!r}")
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+
+async def _worker_loop(bot, index, updates, status):
+    app = bot.build_application(updater=False)
+    app.bot_data['worker_index'] = index
+    await app.initialize()
+    await bot.on_startup(app)
+    await app.start()
+    heartbeat = asyncio.create_task(_heartbeat(index, status))
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            raw = await loop.run_in_executor(None, updates.get)
+            if raw is None: break
+            try: update = Update.de_json(json.loads(raw), app.bot)
+            except Exception as e:
+                logging.warning(f"Dropping undecodable update: {e!r}")
+                continue
+            await app.update_queue.put(update)
+    finally:
+        heartbeat.cancel()
+        await app.stop()
+        await bot.on_stop(app)
+        await app.shutdown()
+        await bot.on_shutdown(app)
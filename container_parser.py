@@ -0,0 +1,297 @@
+import struct
+
+# ================= NATIVE CONTAINER PARSER =================
+# Reads just the headers the caption needs (video size, codec, HDR, duration, audio track
+# languages) from Matroska/WebM (EBML) and MP4/MOV (ISO-BMFF). The parser walks element and
+# box headers and jumps over everything else (Clusters, Void, attachments, mdat, sample
+# tables) without reading it. Input is a sparse ByteRanges; whenever the walk reaches bytes
+# that aren't there it raises NeedMore(offset, length) so the caller can fetch exactly that
+# range and run it again. Parsing restarts from scratch each time, it's microseconds.
+class NeedMore(Exception):
+    def __init__(self, offset, length):
+        super().__init__(f"need {length} bytes at {offset}")
+        self.offset = offset
+        self.length = length
+
+class ByteRanges:
+    # Fetched ranges of one file, merged where they touch
+    def __init__(self, size=None):
+        self.size = size
+        self._parts = []
+        self.total = 0
+
+    def add(self, start, data):
+        if not data: return
+        self.total += len(data)
+        parts = self._parts + [(start, bytes(data))]
+        parts.sort(key=lambda p: p[0])
+        merged = [parts[0]]
+        for begin, chunk in parts[1:]:
+            last_begin, last = merged[-1]
+            if begin <= last_begin + len(last):
+                overlap = last_begin + len(last) - begin
+                merged[-1] = (last_begin, last + chunk[overlap:])
+            else:
+                merged.append((begin, chunk))
+        self._parts = merged
+
+    def head(self):
+        # The contiguous bytes from offset 0, for parsers that only take one buffer
+        return self._parts[0][1] if self._parts and self._parts[0][0] == 0 else b''
+
+    def read(self, pos, length):
+        if self.size is not None and pos + length > self.size: raise EOFError(f"read past end of file at {pos}")
+        for begin, chunk in self._parts:
+            if begin <= pos < begin + len(chunk):
+                if pos + length <= begin + len(chunk): return chunk[pos - begin:pos - begin + length]
+                have = begin + len(chunk)
+                raise NeedMore(have, pos + length - have)
+        raise NeedMore(pos, length)
+
+# ================= MATROSKA =================
+EBML_HEADER = 0x1A45DFA3
+SEGMENT = 0x18538067
+SEEK_HEAD, SEEK, SEEK_ID, SEEK_POSITION = 0x114D9B74, 0x4DBB, 0x53AB, 0x53AC
+INFO, TIMESTAMP_SCALE, DURATION = 0x1549A966, 0x2AD7B1, 0x4489
+TRACKS, TRACK_ENTRY, TRACK_TYPE, CODEC_ID = 0x1654AE6B, 0xAE, 0x83, 0x86
+LANGUAGE, LANGUAGE_BCP47 = 0x22B59C, 0x22B59D
+VIDEO, PIXEL_WIDTH, PIXEL_HEIGHT = 0xE0, 0xB0, 0xBA
+COLOUR, TRANSFER, MASTERING_METADATA = 0x55B0, 0x55BA, 0x55D0
+AUDIO, CHANNELS = 0xE1, 0x9F
+BLOCK_ADDITION_MAPPING, BLOCK_ADD_ID_TYPE = 0x41E4, 0x41E7
+CLUSTER = 0x1F43B675
+
+MKV_CODECS = {
+    "V_MPEG4/ISO/AVC": "AVC", "V_MPEGH/ISO/HEVC": "HEVC", "V_AV1": "AV1", "V_VP9": "VP9", "V_VP8": "VP8",
+    "V_MPEG4/ISO/ASP": "MPEG-4", "V_MPEG2": "MPEG-2",
+    "A_AAC": "AAC", "A_AC3": "AC3", "A_EAC3": "EAC3", "A_DTS": "DTS", "A_TRUEHD": "TrueHD",
+    "A_OPUS": "Opus", "A_FLAC": "FLAC", "A_VORBIS": "Vorbis", "A_MPEG/L3": "MP3",
+}
+DOLBY_VISION_CONFIGS = {b"dvcC", b"dvvC", b"dvwC"}
+# Colour TransferCharacteristics / colr nclx transfer: SMPTE 2084 (PQ) and ARIB STD-B67 (HLG)
+HDR_TRANSFERS = {16: "HDR10", 18: "HLG"}
+
+def _vint(src, pos, keep_marker=False):
+    first = src.read(pos, 1)[0]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)): length += 1
+    if length > 8: raise ValueError(f"bad EBML vint at {pos}")
+    raw = src.read(pos, length)
+    value = int.from_bytes(raw, "big")
+    if not keep_marker: value &= (1 << (7 * length)) - 1
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+def _element(src, pos):
+    element_id, id_len, _ = _vint(src, pos, keep_marker=True)
+    size, size_len, unknown = _vint(src, pos + id_len)
+    return element_id, pos + id_len + size_len, None if unknown else size
+
+def _children(src, start, end):
+    pos = start
+    while pos < end:
+        element_id, data, size = _element(src, pos)
+        # A child claiming more than its parent holds is a broken (or hostile) file, not a reason to download it
+        if size is not None and data + size > end: raise ValueError(f"element at {pos} runs past its parent")
+        yield element_id, data, size
+        if size is None: return
+        pos = data + size
+
+def _uint(src, data, size):
+    return int.from_bytes(src.read(data, size), "big") if size else 0
+
+def _float(src, data, size):
+    if size == 4: return struct.unpack(">f", src.read(data, 4))[0]
+    if size == 8: return struct.unpack(">d", src.read(data, 8))[0]
+    return None
+
+def _string(src, data, size):
+    return src.read(data, size).split(b"\0", 1)[0].decode("utf-8", "replace")
+
+def _mkv_track(src, data, size, info):
+    kind, codec, lang, bcp47 = None, None, "eng", None  # Matroska's default language is English
+    width = height = channels = None
+    hdr = None
+    for element_id, d, s in _children(src, data, data + size):
+        if element_id == TRACK_TYPE: kind = _uint(src, d, s)
+        elif element_id == CODEC_ID: codec = _string(src, d, s)
+        elif element_id == LANGUAGE: lang = _string(src, d, s)
+        elif element_id == LANGUAGE_BCP47: bcp47 = _string(src, d, s)
+        elif element_id == VIDEO:
+            for vid, vd, vs in _children(src, d, d + s):
+                if vid == PIXEL_WIDTH: width = _uint(src, vd, vs)
+                elif vid == PIXEL_HEIGHT: height = _uint(src, vd, vs)
+                elif vid == COLOUR:
+                    for cid, cd, cs in _children(src, vd, vd + vs):
+                        if cid == TRANSFER: hdr = HDR_TRANSFERS.get(_uint(src, cd, cs), hdr)
+                        elif cid == MASTERING_METADATA: hdr = hdr or "HDR10"
+        elif element_id == AUDIO:
+            for aid, ad, as_ in _children(src, d, d + s):
+                if aid == CHANNELS: channels = _uint(src, ad, as_)
+        elif element_id == BLOCK_ADDITION_MAPPING:
+            for bid, bd, bs in _children(src, d, d + s):
+                if bid == BLOCK_ADD_ID_TYPE and src.read(bd, bs)[-4:] in DOLBY_VISION_CONFIGS: hdr = "Dolby Vision"
+
+    friendly = MKV_CODECS.get(codec, codec)
+    if kind == 1 and "width" not in info:
+        info.update(width=width, height=height, codec=friendly, hdr=bool(hdr), hdr_format=hdr)
+    elif kind == 2:
+        info["audio"].append({"lang": bcp47 or lang, "codec": friendly, "channels": channels})
+
+def _parse_matroska(src):
+    element_id, data, size = _element(src, 0)
+    pos = data + size
+    element_id, seg_start, seg_size = _element(src, pos)
+    if element_id != SEGMENT: return None
+    seg_end = seg_start + seg_size if seg_size is not None else (src.size or 1 << 62)
+
+    info = {"container": "matroska", "duration": None, "audio": []}
+    seeks, scale, duration, have_tracks = {}, 1_000_000, None, False
+    for element_id, d, s in _children(src, seg_start, seg_end):
+        if element_id == CLUSTER or s is None: break
+        if element_id == SEEK_HEAD:
+            for sid, sd, ss in _children(src, d, d + s):
+                if sid != SEEK: continue
+                target = position = None
+                for fid, fd, fs in _children(src, sd, sd + ss):
+                    if fid == SEEK_ID: target = int.from_bytes(src.read(fd, fs), "big")
+                    elif fid == SEEK_POSITION: position = _uint(src, fd, fs)
+                if target is not None and position is not None: seeks[target] = seg_start + position
+        elif element_id == INFO:
+            for iid, idata, isize in _children(src, d, d + s):
+                if iid == TIMESTAMP_SCALE: scale = _uint(src, idata, isize)
+                elif iid == DURATION: duration = _float(src, idata, isize)
+        elif element_id == TRACKS:
+            for tid, td, ts in _children(src, d, d + s):
+                if tid == TRACK_ENTRY: _mkv_track(src, td, ts, info)
+            have_tracks = True
+        if have_tracks and duration is not None: break
+
+    # Tracks written after the first Cluster (some live muxers): the SeekHead knows where
+    if not have_tracks and TRACKS in seeks:
+        _, d, s = _element(src, seeks[TRACKS])
+        for tid, td, ts in _children(src, d, d + s):
+            if tid == TRACK_ENTRY: _mkv_track(src, td, ts, info)
+    if duration is not None: info["duration"] = round(duration * scale / 1e9, 3)
+    return info
+
+# ================= ISO-BMFF =================
+MP4_TOP_LEVEL = {b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip", b"pdin", b"uuid", b"styp", b"sidx", b"moof", b"mfra", b"meta"}
+MP4_CODECS = {
+    b"avc1": "AVC", b"avc3": "AVC", b"hvc1": "HEVC", b"hev1": "HEVC", b"dvh1": "HEVC", b"dvhe": "HEVC",
+    b"av01": "AV1", b"vp09": "VP9", b"mp4v": "MPEG-4",
+    b"mp4a": "AAC", b"ac-3": "AC3", b"ec-3": "EAC3", b"Opus": "Opus", b"fLaC": "FLAC", b"dtsc": "DTS", b".mp3": "MP3",
+}
+# Header bytes before a sample entry's own child boxes
+VISUAL_ENTRY_SIZE, AUDIO_ENTRY_SIZE = 78, 28
+
+def _box(src, pos, end):
+    size, kind = struct.unpack(">I4s", src.read(pos, 8))
+    header = 8
+    if size == 1:
+        size = struct.unpack(">Q", src.read(pos + 8, 8))[0]
+        header = 16
+    elif size == 0:
+        size = end - pos
+    if size < header: raise ValueError(f"bad box size {size} at {pos}")
+    return kind, pos + header, pos + size
+
+def _boxes(src, start, end):
+    pos = start
+    while pos + 8 <= end:
+        kind, data, box_end = _box(src, pos, end)
+        yield kind, data, box_end
+        pos = box_end
+
+def _find(src, start, end, *path):
+    for kind, data, box_end in _boxes(src, start, end):
+        if kind == path[0]: return (data, box_end) if len(path) == 1 else _find(src, data, box_end, *path[1:])
+    return None
+
+def _full_box(src, data):
+    return src.read(data, 1)[0]
+
+def _sample_entry(src, stsd):
+    data, end = stsd
+    if struct.unpack(">I", src.read(data + 4, 4))[0] == 0: return None
+    kind, entry_data, entry_end = _box(src, data + 8, end)
+    return kind, entry_data, entry_end
+
+def _mp4_track(src, data, end, info):
+    found = _find(src, data, end, b"mdia")
+    if not found: return
+    mdia, mdia_end = found
+    handler = language = None
+    for kind, d, box_end in _boxes(src, mdia, mdia_end):
+        if kind == b"hdlr": handler = src.read(d + 8, 4)
+        elif kind == b"mdhd":
+            at = d + (4 + 8 + 8 + 4 + 8 if _full_box(src, d) == 1 else 4 + 4 + 4 + 4 + 4)
+            packed = struct.unpack(">H", src.read(at, 2))[0]
+            # 0 is "unspecified" and anything below 0x400 is a QuickTime Macintosh language code, not ISO 639-2
+            code = "".join(chr(((packed >> shift) & 0x1F) + 0x60) for shift in (10, 5, 0))
+            language = code if packed >= 0x400 and code.isalpha() and code.islower() else None
+        elif kind == b"elng":
+            language = _string(src, d + 4, box_end - d - 4)
+
+    stsd = _find(src, mdia, mdia_end, b"minf", b"stbl", b"stsd")
+    entry = _sample_entry(src, stsd) if stsd else None
+    fourcc = entry[0] if entry else None
+
+    if handler == b"vide" and "width" not in info:
+        width = height = 0
+        tkhd = _find(src, data, end, b"tkhd")
+        if tkhd:
+            at = tkhd[0] + (4 + 8 + 8 + 4 + 4 + 8 if _full_box(src, tkhd[0]) == 1 else 4 + 4 + 4 + 4 + 4 + 4) + 8 + 2 + 2 + 2 + 2 + 36
+            width, height = (v >> 16 for v in struct.unpack(">II", src.read(at, 8)))
+        hdr = "Dolby Vision" if fourcc in (b"dvh1", b"dvhe") else None
+        if entry:
+            _, entry_data, entry_end = entry
+            if not width or not height: width, height = struct.unpack(">HH", src.read(entry_data + 24, 4))
+            for kind, d, box_end in _boxes(src, entry_data + VISUAL_ENTRY_SIZE, entry_end):
+                if kind in (b"dvcC", b"dvvC"): hdr = "Dolby Vision"
+                elif kind == b"colr" and src.read(d, 4) == b"nclx" and not hdr:
+                    hdr = HDR_TRANSFERS.get(struct.unpack(">H", src.read(d + 6, 2))[0])
+        info.update(width=width, height=height, codec=MP4_CODECS.get(fourcc, fourcc.decode("latin-1") if fourcc else None),
+                    hdr=bool(hdr), hdr_format=hdr)
+    elif handler == b"soun":
+        channels = None
+        if entry and entry[2] - entry[1] >= 18:
+            channels = struct.unpack(">H", src.read(entry[1] + 16, 2))[0] or None
+        info["audio"].append({"lang": language, "codec": MP4_CODECS.get(fourcc, fourcc.decode("latin-1") if fourcc else None), "channels": channels})
+
+def _parse_mp4(src):
+    end = src.size or 1 << 62
+    moov = None
+    for kind, data, box_end in _boxes(src, 0, end):
+        # mdat & co. are skipped by their size, so a tail moov costs one range request, not the payload
+        if kind == b"moov":
+            moov = (data, box_end)
+            break
+    if not moov: return None
+
+    info = {"container": "mp4", "duration": None, "audio": []}
+    for kind, data, box_end in _boxes(src, *moov):
+        if kind == b"mvhd":
+            if _full_box(src, data) == 1: timescale, duration = struct.unpack(">IQ", src.read(data + 20, 12))
+            else: timescale, duration = struct.unpack(">II", src.read(data + 12, 8))
+            if timescale: info["duration"] = round(duration / timescale, 3)
+        elif kind == b"trak":
+            _mp4_track(src, data, box_end, info)
+    return info
+
+# ================= ENTRY POINT =================
+def parse(src):
+    # src: ByteRanges. Returns a dict with width/height/codec/hdr/duration/audio, None for a
+    # container we don't handle (or one without a video track), or raises NeedMore.
+    head = src.read(0, 8)
+    try:
+        if head[:4] == b"\x1a\x45\xdf\xa3": info = _parse_matroska(src)
+        elif head[4:8] in MP4_TOP_LEVEL: info = _parse_mp4(src)
+        else: return None
+    except (EOFError, ValueError, struct.error, IndexError):
+        return None
+    if not info or not info.get("width") or not info.get("height"): return None
+    return info
+
+def audio_languages(info):
+    return [track["lang"] for track in (info or {}).get("audio", []) if track.get("lang")]
@@ -0,0 +1,223 @@
+import os
+import re
+from functools import lru_cache
+
+# ================= FILENAME PARSING ENGINE =================
+# pre_clean_filename strips the channel junk, parse_filename turns the cleaned name into
+# a plain dict. Common scene names (Title Year Res Source / Title SxxEyy ...) are parsed by a
+# hand-written fast path; anything it isn't sure about goes to guessit. Results are memoized.
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", 4096))
+
+LANG_MAP = {
+    'hi': 'Hindi', 'en': 'English', 'ja': 'Japanese', 'ta': 'Tamil', 'te': 'Telugu',
+    'ml': 'Malayalam', 'kn': 'Kannada', 'mr': 'Marathi', 'gu': 'Gujarati',
+    'ko': 'Korean', 'es': 'Spanish', 'fr': 'French', 'ru': 'Russian', 'zh': 'Chinese',
+    'th': 'Thai', 'in': 'Indonesian', 'vi': 'Vietnamese',
+    'bn': 'Bengali', 'ur': 'Urdu', 'pa': 'Punjabi', 'id': 'Indonesian', 'de': 'German',
+    'it': 'Italian', 'pt': 'Portuguese', 'ar': 'Arabic', 'tr': 'Turkish', 'ms': 'Malay'
+}
+
+# Container track tags are ISO 639-2 (Matroska also allows BCP 47, MP4 packs 639-2/T)
+ISO639_2 = {
+    'hin': 'hi', 'eng': 'en', 'jpn': 'ja', 'tam': 'ta', 'tel': 'te', 'mal': 'ml', 'kan': 'kn',
+    'mar': 'mr', 'guj': 'gu', 'kor': 'ko', 'spa': 'es', 'fre': 'fr', 'fra': 'fr', 'rus': 'ru',
+    'chi': 'zh', 'zho': 'zh', 'tha': 'th', 'ind': 'id', 'vie': 'vi', 'ben': 'bn', 'urd': 'ur',
+    'pan': 'pa', 'ger': 'de', 'deu': 'de', 'ita': 'it', 'por': 'pt', 'ara': 'ar', 'tur': 'tr',
+    'may': 'ms', 'msa': 'ms',
+}
+UNTAGGED = {'', 'und', 'zxx', 'mis', 'mul', 'qaa'}
+
+# ================= CLEANERS =================
+CLEANERS = [
+    (re.compile(r'@[a-zA-Z0-9_]+'), ''),
+    (re.compile(r'(?i)DA Rips'), ''),
+    (re.compile(r'(?i)t\.me/[a-zA-Z0-9_]+'), ''),
+    (re.compile(r'\[.*?\]'), ''),
+    (re.compile(r'[\.\_]+'), ' '),
+]
+
+def pre_clean_filename(filename):
+    f = str(filename)
+    for pattern, repl in CLEANERS:
+        f = pattern.sub(repl, f)
+    return f.strip()
+
+# Whole words only: "Hotel" / "Within" / "Individual" are not Telugu, Hindi or Dual Audio
+LANG_HINTS = re.compile(r'(?<![a-z])(dual|multi|hin|hindi|tam|tamil|tel|telugu|kor|korean)(?![a-z])')
+LANG_HINT_NAMES = {'hin': 'Hindi', 'tam': 'Tamil', 'tel': 'Telugu', 'kor': 'Korean'}
+
+def track_languages(codes):
+    # Audio languages as tagged in the container; the filename is only a fallback for untagged files
+    names = []
+    for code in codes or ():
+        code = str(code).lower().replace('_', '-').split('-')[0]
+        if code in UNTAGGED: continue
+        short = ISO639_2.get(code, code)
+        names.append(LANG_MAP.get(short, short.capitalize()))
+    return " & ".join(dict.fromkeys(names)) or None
+
+def detect_languages(filename, guessit_langs):
+    found_langs = []
+    if guessit_langs:
+        if not isinstance(guessit_langs, list): guessit_langs = [guessit_langs]
+        for l in guessit_langs:
+            lang_str = str(l).lower()
+            found_langs.append(LANG_MAP.get(lang_str, lang_str.capitalize()))
+
+    hints = {h[:3] if h[:3] in LANG_HINT_NAMES else h for h in LANG_HINTS.findall(filename.lower())}
+    if 'dual' in hints: found_langs.append('Dual Audio')
+    if 'multi' in hints: found_langs.append('Multi Audio')
+    for hint in ('hin', 'tam', 'tel', 'kor'):
+        if hint in hints and LANG_HINT_NAMES[hint] not in found_langs: found_langs.append(LANG_HINT_NAMES[hint])
+
+    if not found_langs: return "Unknown"
+    return " & ".join(list(dict.fromkeys(found_langs)))
+
+# ================= SCENE-NAME FAST PATH =================
+RE_EPISODE = re.compile(r'(?i)^s(\d{1,2})e(\d{1,4})$')
+RE_YEAR = re.compile(r'^\(?((?:19|20)\d\d)\)?$')
+RE_RESOLUTION = re.compile(r'(?i)^(\d{3,4})([pi])$')
+RE_TITLE_WORD = re.compile(r"^[^\W\d_][\w'&:,!?]*$")
+# Cleaning turns "H.264" / "DDP5.1" into two tokens; these glue them back together
+RE_SPLIT_CODEC = re.compile(r'(?i)^[hx]$')
+RE_SPLIT_CODEC_TAIL = re.compile(r'^26[45](-\S+)?$')
+RE_SPLIT_CHANNELS = re.compile(r'(?i)^(ddp|dd|aac|ac3|eac3|dts|truehd)?[257]$')
+RE_SPLIT_CHANNELS_TAIL = re.compile(r'^[01](-\S+)?$')
+RE_AUDIO_CHANNELS = re.compile(r'(?i)^(ddp|dd|aac|ac3|eac3|dts|truehd)?[257]\.[01]$')
+
+CONTAINERS = {'mkv', 'mp4', 'avi', 'm4v', 'webm', 'mov'}
+RELEASE_TAGS = {
+    # sources & streaming services
+    'bluray', 'blu-ray', 'bdrip', 'brrip', 'remux', 'web-dl', 'webdl', 'webrip', 'web', 'hdtv',
+    'hdrip', 'dvdrip', 'amzn', 'nf', 'dsnp', 'hmax', 'atvp',
+    # video
+    'x264', 'x265', 'h264', 'h265', 'hevc', 'avc', '10bit', '8bit', 'hdr', 'hdr10', 'av1', 'xvid',
+    # audio
+    'aac', 'ac3', 'eac3', 'dts', 'truehd', 'atmos', 'flac', 'opus', 'mp3',
+    # misc
+    'esub', 'esubs', 'proper', 'repack',
+}
+# guessit only knows some of these as languages; the rest are accepted tags it ignores (None)
+FAST_LANGUAGES = {
+    'hindi': 'hi', 'english': 'en', 'telugu': 'te', 'japanese': 'ja', 'korean': 'ko',
+    'tamil': None, 'malayalam': None, 'kannada': None,
+}
+# Words guessit gives a meaning of its own; seeing one in the title means we're not sure
+AMBIGUOUS_TITLE_WORDS = {
+    'season', 'episode', 'part', 'vol', 'volume', 'chapter', 'complete', 'cut', 'edition',
+    'directors', "director's", 'extended', 'uncut', 'unrated', 'imax', 'remastered', 'limited',
+    'us', 'uk', 'au', 'ca', 'nz', 'dual', 'audio', 'multi', 'sub', 'dub', 'dubbed', 'subbed',
+    'hd', 'sd', 'uhd', 'fhd', 'rip', 'ts', 'cam', 'hdcam', 'proof', 'sample', 'trailer',
+    'x', 'v', 'i', 'ii', 'iii', 'iv',
+}
+
+def _fast_tags(tokens, out):
+    # Every token after the title must be a tag we know, otherwise give up
+    languages = []
+    if tokens and tokens[-1].lower() in CONTAINERS:
+        out['container'] = tokens[-1].lower()
+        tokens = tokens[:-1]
+    for i, tok in enumerate(tokens):
+        low = tok.lower()
+        if i == len(tokens) - 1 and '-' in low and low not in RELEASE_TAGS:
+            # "x264-GROUP": known tag, then the release group
+            low, group = low.rsplit('-', 1)
+            if not group: return False
+            out['release_group'] = tok.rsplit('-', 1)[1]
+        res = RE_RESOLUTION.match(low)
+        if res:
+            if 'screen_size' in out: return False
+            out['screen_size'] = f"{res.group(1)}{res.group(2).lower()}"
+        elif low == '4k':
+            if 'screen_size' in out: return False
+            out['screen_size'] = '2160p'
+        elif low in FAST_LANGUAGES:
+            if FAST_LANGUAGES[low]: languages.append(FAST_LANGUAGES[low])
+        elif low not in RELEASE_TAGS and not RE_AUDIO_CHANNELS.match(low):
+            return False
+    if languages: out['language'] = languages if len(languages) > 1 else languages[0]
+    return True
+
+def _join_split_tags(tokens):
+    out = []
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else ""
+        if RE_SPLIT_CODEC.match(tok) and RE_SPLIT_CODEC_TAIL.match(nxt):
+            out.append(tok + nxt)
+            i += 2
+        elif RE_SPLIT_CHANNELS.match(tok) and RE_SPLIT_CHANNELS_TAIL.match(nxt):
+            out.append(f"{tok}.{nxt}")
+            i += 2
+        else:
+            out.append(tok)
+            i += 1
+    return out
+
+def _fast_title(tokens):
+    if not tokens: return None
+    for tok in tokens:
+        low = tok.lower()
+        if not RE_TITLE_WORD.match(tok) or low in AMBIGUOUS_TITLE_WORDS: return None
+        if low in RELEASE_TAGS or low in FAST_LANGUAGES or low in CONTAINERS or RE_RESOLUTION.match(tok): return None
+    return " ".join(tokens)
+
+def fast_parse(clean_name):
+    tokens = clean_name.split()
+    out = {}
+
+    ep_index = next((i for i, t in enumerate(tokens) if RE_EPISODE.match(t)), None)
+    if ep_index is not None:
+        m = RE_EPISODE.match(tokens[ep_index])
+        head = tokens[:ep_index]
+        if head and RE_YEAR.match(head[-1]):
+            out['year'] = int(RE_YEAR.match(head[-1]).group(1))
+            head = head[:-1]
+        out['season'], out['episode'] = int(m.group(1)), int(m.group(2))
+        out['type'] = 'episode'
+        tail = tokens[ep_index + 1:]
+    else:
+        year_index = next((i for i in range(len(tokens) - 1, 0, -1) if RE_YEAR.match(tokens[i])), None)
+        if year_index is None: return None
+        head = tokens[:year_index]
+        out['year'] = int(RE_YEAR.match(tokens[year_index]).group(1))
+        out['type'] = 'movie'
+        tail = tokens[year_index + 1:]
+
+    title = _fast_title(head)
+    if not title or not _fast_tags(_join_split_tags(tail), out): return None
+    out['title'] = title
+    return out
+
+# ================= PARSE =================
+def _plain(value):
+    if isinstance(value, list): return [_plain(v) for v in value]
+    if isinstance(value, (int, float, bool)) or value is None: return value
+    return str(value)
+
+# guessit (babelfish + ~1k rebulk rules) costs a quarter second to import and as much again
+# for its first call; scene names never need it, so it's loaded on demand or by warm()
+_guessit = None
+
+def _get_guessit():
+    global _guessit
+    if _guessit is None:
+        from guessit import guessit
+        _guessit = guessit
+    return _guessit
+
+def guessit_parse(clean_name):
+    return {k: _plain(v) for k, v in _get_guessit()(clean_name).items()}
+
+def warm():
+    # First call builds the rebulk rule set; done in the background once the bot is up
+    guessit_parse("Warm Up Show S01E01 1080p WEB-DL x264")
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_cached(clean_name):
+    return fast_parse(clean_name) or guessit_parse(clean_name)
+
+def parse_filename(clean_name):
+    # A copy, so callers can't poison the memo
+    return dict(_parse_cached(clean_name))
@@ -0,0 +1,70 @@
+import os
+import logging
+from urllib.parse import urlsplit
+
+import httpx
+
+# ================= ASYNC HTTP LAYER =================
+# One keep-alive pool per upstream host, so a slow TMDB reply never blocks a
+# Telegram range download (and nothing ever blocks the PTB event loop).
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 5))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 10))
+
+# Per-host overrides: (max connections, read timeout)
+HOST_LIMITS = {
+    "api.themoviedb.org": (int(os.getenv("TMDB_MAX_CONNECTIONS", 20)), HTTP_TIMEOUT),
+    "api.tvmaze.com": (int(os.getenv("TVMAZE_MAX_CONNECTIONS", 10)), HTTP_TIMEOUT),
+    "api.jikan.moe": (int(os.getenv("JIKAN_MAX_CONNECTIONS", 3)), HTTP_TIMEOUT),
+    "www.omdbapi.com": (int(os.getenv("OMDB_MAX_CONNECTIONS", 10)), HTTP_TIMEOUT),
+    "api.telegram.org": (int(os.getenv("TELEGRAM_MAX_CONNECTIONS", 20)), float(os.getenv("TELEGRAM_FILE_TIMEOUT", 10))),
+}
+
+_clients = {}
+
+def _get_client(host):
+    client = _clients.get(host)
+    if client is None or client.is_closed:
+        max_conn, read_timeout = HOST_LIMITS.get(host, (HTTP_MAX_CONNECTIONS, HTTP_TIMEOUT))
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_conn, max_keepalive_connections=max_conn, keepalive_expiry=60),
+            timeout=httpx.Timeout(read_timeout, connect=HTTP_CONNECT_TIMEOUT),
+            follow_redirects=True,
+        )
+        _clients[host] = client
+    return client
+
+async def get(url, params=None, headers=None, timeout=None):
+    client = _get_client(urlsplit(url).netloc)
+    kwargs = {"params": params, "headers": headers}
+    if timeout is not None: kwargs["timeout"] = timeout
+    return await client.get(url, **kwargs)
+
+async def get_json(url, params=None, timeout=None):
+    res = await get(url, params=params, timeout=timeout)
+    return res.json()
+
+async def get_range(url, start, end, timeout=None):
+    # Streams and stops at the requested length, so a server that ignores Range can't make us pull the whole file
+    client = _get_client(urlsplit(url).netloc)
+    wanted = end - start + 1
+    kwargs = {"headers": {"Range": f"bytes={start}-{end}"}}
+    if timeout is not None: kwargs["timeout"] = timeout
+    async with client.stream("GET", url, **kwargs) as res:
+        res.raise_for_status()
+        skip = start if res.status_code == 200 else 0
+        chunks, size = [], 0
+        async for chunk in res.aiter_bytes():
+            if skip:
+                cut = min(skip, len(chunk))
+                chunk, skip = chunk[cut:], skip - cut
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= wanted: break
+    return b''.join(chunks)[:wanted]
+
+async def close_all():
+    for host, client in list(_clients.items()):
+        try: await client.aclose()
+        except Exception as e: logging.warning(f"Closing HTTP pool for {host} failed: {e}")
+    _clients.clear()
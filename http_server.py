@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import hmac
+import logging
+
+import tornado.web
+from tornado.httpserver import HTTPServer
+
+from telegram import Update
+
+import metrics
+from keep_alive import STARTED_AT, SERVER_STATE, HEALTH_CHECKS, collect_stats
+
+# ================= HTTP SERVER =================
+# Handlers behind keep_alive.start_server(); see keep_alive.py for what registers here.
+
+# Keep health pings out of the console
+logging.getLogger('tornado.access').setLevel(logging.WARNING)
+
+class HomeHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.write("🚀 Titanium 22.0 Engine is Online and Running 24/7!")
+
+    def head(self):
+        self.set_status(200)
+
+class StatusHandler(tornado.web.RequestHandler):
+    def get(self):
+        checks = {}
+        for name, check in list(HEALTH_CHECKS.items()):
+            try: checks[name] = check()
+            except Exception as e: checks[name] = {"ok": False, "error": str(e)}
+        status = "ok" if all(c.get("ok") for c in checks.values()) else "degraded"
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps({"status": status, "uptime_s": round(time.time() - STARTED_AT), **SERVER_STATE, **checks}, default=str))
+
+class StatsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps(collect_stats(), default=str))
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(metrics.render())
+
+class WebhookHandler(tornado.web.RequestHandler):
+    def initialize(self, bot_app, secret):
+        self.bot_app = bot_app
+        self.secret = secret
+
+    async def post(self):
+        if self.secret:
+            given = self.request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if not hmac.compare_digest(given, self.secret):
+                SERVER_STATE["webhook_rejected"] += 1
+                raise tornado.web.HTTPError(403)
+        try:
+            update = Update.de_json(json.loads(self.request.body), self.bot_app.bot)
+        except Exception as e:
+            logging.warning(f"Dropping malformed webhook payload: {e!r}")
+            raise tornado.web.HTTPError(400)
+        SERVER_STATE["updates_received"] += 1
+        # Answer Telegram right away; the application's update fetcher does the rest
+        await self.bot_app.update_queue.put(update)
+        self.set_status(200)
+
+def make_app(application=None, webhook_path=None, secret=None):
+    routes = [
+        (r"/", HomeHandler),
+        (r"/status", StatusHandler),
+        (r"/stats", StatsHandler),
+        (r"/metrics", MetricsHandler),
+    ]
+    if application is not None and webhook_path:
+        routes.append((rf"/{webhook_path.strip('/')}", WebhookHandler, {"bot_app": application, "secret": secret}))
+    return tornado.web.Application(routes)
+
+def start_server(application=None, webhook_path=None, secret=None):
+    # Must be called from inside the running event loop
+    # Render assigns a dynamic PORT via environment variables
+    port = int(os.environ.get('PORT', 8080))
+    if webhook_path: SERVER_STATE["mode"] = "webhook"
+    server = HTTPServer(make_app(application, webhook_path, secret), xheaders=True)
+    server.listen(port, address="0.0.0.0")
+    logging.info(f"HTTP server listening on :{port} ({SERVER_STATE['mode']} mode)")
+    return server
@@ -1,24 +1,33 @@
-from flask import Flask
-from threading import Thread
-import os
-import logging
+import time
 
-# Disable Flask startup logs to keep console clean
-log = logging.getLogger('werkzeug')
-log.setLevel(logging.ERROR)
+# ================= KEEP ALIVE + WEBHOOK SERVER =================
+# One asyncio HTTP server on the bot's own event loop: Render health pings, /status and
+# /stats, Prometheus /metrics, plus the Telegram webhook endpoint when the bot runs in webhook mode.
+# The registry lives here; the tornado side (http_server.py) is only imported when the server
+# starts, which in polling mode happens in the background after the bot is already polling.
+STARTED_AT = time.time()
 
-app = Flask(__name__)
+# Components register a zero-arg callable here to show up on /stats
+STATS_PROVIDERS = {}
+SERVER_STATE = {"mode": "polling", "updates_received": 0, "webhook_rejected": 0}
 
-@app.route('/')
-def home():
-    return "🚀 Titanium 22.0 Engine is Online and Running 24/7!"
+# ...and a callable returning {"ok": bool, ...} here to be part of /status
+HEALTH_CHECKS = {}
 
-def run():
-    # Render assigns a dynamic PORT via environment variables
-    port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port)
+def register_stats(name, provider):
+    STATS_PROVIDERS[name] = provider
 
-def keep_alive():
-    t = Thread(target=run)
-    t.daemon = True
-    t.start()
+def register_health(name, check):
+    HEALTH_CHECKS[name] = check
+
+def collect_stats():
+    out = {}
+    for name, provider in list(STATS_PROVIDERS.items()):
+        try: out[name] = provider()
+        except Exception as e: out[name] = {"error": str(e)}
+    return out
+
+def start_server(application=None, webhook_path=None, secret=None):
+    # Must be called from inside the running event loop
+    from http_server import start_server as start_http_server
+    return start_http_server(application, webhook_path, secret)
@@ -0,0 +1,127 @@
+import time
+import logging
+import datetime
+
+# ================= API KEY POOL =================
+# Each key gets its own token bucket, a health score and an exponential cool-down
+# after 401/429s, so throttled or revoked keys stop eating lookups.
+COOLDOWN_BASE = {401: 300, 403: 300, 429: 15}
+COOLDOWN_MAX = 6 * 3600
+
+class KeyPoolExhausted(Exception):
+    pass
+
+class _KeyState:
+    def __init__(self, key, burst, daily_quota):
+        self.key = key
+        self.tokens = float(burst)
+        self.refilled = time.monotonic()
+        self.health = 1.0
+        self.strikes = 0
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.day = None
+        self.used_today = 0
+        self.quota_left = daily_quota
+        self.requests = 0
+        self.errors = {}
+
+class KeyPool:
+    def __init__(self, name, keys, rate=5.0, burst=10, daily_quota=None, strategy="round_robin"):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.daily_quota = daily_quota
+        self.strategy = strategy
+        self._states = [_KeyState(k, burst, daily_quota) for k in keys]
+        self._by_key = {s.key: s for s in self._states}
+        self._cursor = 0
+
+    def _refresh(self, s, now):
+        s.tokens = min(self.burst, s.tokens + (now - s.refilled) * self.rate)
+        s.refilled = now
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        if s.day != today:
+            s.day, s.used_today = today, 0
+            if self.daily_quota is not None: s.quota_left = self.daily_quota
+
+    def _usable(self, s, now):
+        if s.cooldown_until > now or s.tokens < 1: return False
+        return self.daily_quota is None or s.quota_left > 0
+
+    def acquire(self):
+        now = time.monotonic()
+        for s in self._states: self._refresh(s, now)
+        usable = [s for s in self._states if self._usable(s, now)]
+        if not usable: raise KeyPoolExhausted(f"No {self.name} key available right now")
+
+        if self.strategy == "least_loaded":
+            chosen = min(usable, key=lambda s: (s.in_flight, -s.health, s.used_today))
+        else:
+            n = len(self._states)
+            for i in range(n):
+                s = self._states[(self._cursor + i) % n]
+                if s in usable:
+                    self._cursor = (self._cursor + i + 1) % n
+                    chosen = s
+                    break
+
+        chosen.tokens -= 1
+        chosen.in_flight += 1
+        chosen.requests += 1
+        chosen.used_today += 1
+        if self.daily_quota is not None: chosen.quota_left -= 1
+        return chosen.key
+
+    def release(self, key):
+        # The request was abandoned (cancelled) before it got an answer: free the slot, judge nothing
+        s = self._by_key.get(key)
+        if s: s.in_flight = max(0, s.in_flight - 1)
+
+    def report(self, key, status=None, retry_after=None, quota_exhausted=False):
+        # status None means the request never got an HTTP answer (timeout, DNS, ...)
+        s = self._by_key.get(key)
+        if not s: return
+        s.in_flight = max(0, s.in_flight - 1)
+        now = time.monotonic()
+
+        if status is not None and status < 400 and not quota_exhausted:
+            s.strikes = 0
+            s.health = min(1.0, s.health * 0.9 + 0.1)
+            return
+
+        label = "quota" if quota_exhausted else str(status or "network")
+        s.errors[label] = s.errors.get(label, 0) + 1
+        s.health *= 0.7
+
+        if quota_exhausted:
+            s.quota_left = 0
+            logging.warning(f"{self.name} key {self._mask(key)} is out of daily quota")
+        elif status in COOLDOWN_BASE:
+            s.strikes += 1
+            delay = min(COOLDOWN_MAX, COOLDOWN_BASE[status] * 2 ** (s.strikes - 1))
+            try: delay = max(delay, float(retry_after))
+            except (TypeError, ValueError): pass
+            s.cooldown_until = now + delay
+            logging.warning(f"{self.name} key {self._mask(key)} cooling down {int(delay)}s after {label}")
+
+    def _mask(self, key):
+        return key[:4] + "…"
+
+    def stats(self):
+        now = time.monotonic()
+        out = {"strategy": self.strategy, "keys": []}
+        for s in self._states:
+            self._refresh(s, now)
+            out["keys"].append({
+                "key": self._mask(s.key),
+                "health": round(s.health, 2),
+                "in_flight": s.in_flight,
+                "requests": s.requests,
+                "used_today": s.used_today,
+                "quota_left": s.quota_left,
+                "cooldown_s": max(0, round(s.cooldown_until - now)),
+                "errors": dict(s.errors),
+            })
+        out["available"] = sum(1 for s in self._states if self._usable(s, now))
+        return out
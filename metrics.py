@@ -0,0 +1,178 @@
+import os
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+
+# ================= METRICS =================
+# Tiny Prometheus-style registry: counters, histograms and callback gauges, rendered in the
+# text exposition format on /metrics. `stage()` times a block, feeds the histogram and,
+# when a job trace is active, records the block so slow jobs can be logged stage by stage.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", 0))
+
+_registry = []
+_sources = []
+_trace = contextvars.ContextVar("metrics_trace", default=None)
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key)) + (extra or [])
+    if not pairs: return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {} if self.labelnames else {(): 0}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield self.name + _format_labels(self.labelnames, key), value
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        series = self._series.get(key)
+        if series is None: series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound: series["counts"][i] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def samples(self):
+        for key, series in self._series.items():
+            for bound, count in zip(self.buckets, series["counts"]):
+                yield self.name + "_bucket" + _format_labels(self.labelnames, key, [("le", bound)]), count
+            yield self.name + "_bucket" + _format_labels(self.labelnames, key, [("le", "+Inf")]), series["count"]
+            yield self.name + "_sum" + _format_labels(self.labelnames, key), round(series["sum"], 6)
+            yield self.name + "_count" + _format_labels(self.labelnames, key), series["count"]
+
+class CallbackMetric:
+    # For numbers other components already keep (queue depth, cache hits, ...): fn returns
+    # either a number or a list of (labels dict, value)
+    def __init__(self, name, help, fn, kind="gauge"):
+        self.name, self.help, self.fn, self.kind = name, help, fn, kind
+        _registry.append(self)
+
+    def samples(self):
+        value = self.fn()
+        if isinstance(value, (int, float)):
+            yield self.name, value
+            return
+        for labels, v in value:
+            names = tuple(labels)
+            yield self.name + _format_labels(names, tuple(labels[n] for n in names)), v
+
+def collect():
+    # What render() prints, as plain data that can cross a process boundary:
+    # [(name, help, kind, [(sample, value), ...]), ...]
+    out = []
+    for metric in _registry:
+        try: samples = list(metric.samples())
+        except Exception as e:
+            logging.warning(f"Metric {metric.name} failed to render: {e!r}")
+            samples = []
+        out.append((metric.name, metric.help, metric.kind, samples))
+    return out
+
+def register_source(fn):
+    # fn() -> [(label name, label value, collect() output)]: other processes' metrics (the
+    # BOT_WORKERS workers), rendered next to ours with that label added to every series
+    _sources.append(fn)
+
+def _add_label(sample, name, value):
+    base, brace, rest = sample.partition("{")
+    label = f'{name}="{_escape(value)}"'
+    return f"{base}{{{label},{rest}" if brace else f"{base}{{{label}}}"
+
+def render():
+    families = {}
+    def add(collected, label=None):
+        for name, help, kind, samples in collected:
+            family = families.setdefault(name, (help, kind, []))
+            family[2].extend((_add_label(sample, *label) if label else sample, value) for sample, value in samples)
+
+    add(collect())
+    for source in _sources:
+        try:
+            for label_name, label_value, collected in source(): add(collected, (label_name, label_value))
+        except Exception as e:
+            logging.warning(f"Metric source {source!r} failed: {e!r}")
+
+    lines = []
+    for name, (help, kind, samples) in families.items():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{sample} {value}" for sample, value in samples)
+    return "\n".join(lines) + "\n"
+
+# ================= PIPELINE METRICS =================
+STAGE_SECONDS = Histogram("bot_stage_seconds", "Time spent per pipeline stage", ("stage",))
+PROVIDER_SECONDS = Histogram("bot_provider_seconds", "Metadata provider latency by outcome", ("provider", "outcome"))
+PROVIDER_ERRORS = Counter("bot_provider_errors_total", "Metadata provider failures by error type", ("provider", "error"))
+JOBS = Counter("bot_media_jobs_total", "Media jobs finished, by outcome", ("kind", "outcome"))
+CACHE_LOOKUPS = Counter("bot_cache_lookups_total", "Cache lookups by cache and result", ("cache", "result"))
+BYTES_FETCHED = Counter("bot_probe_bytes_total", "Bytes downloaded from Telegram for container probing")
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try: yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        trace = _trace.get()
+        if trace is not None: trace.append((name, elapsed))
+
+@contextmanager
+def job_trace(kind, label=""):
+    # Wraps one media job: total time, outcome counter and the optional slow-request log
+    trace = []
+    token = _trace.set(trace)
+    start = time.perf_counter()
+    outcome = "ok"
+    try: yield trace
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        _trace.reset(token)
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=f"{kind}_total")
+        JOBS.inc(kind=kind, outcome=outcome)
+        if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+            steps = ", ".join(f"{n}={t:.3f}s" for n, t in trace)
+            logging.warning(f"🐢 Slow {kind} ({elapsed:.2f}s) {label}: {steps}")
+
+def record_provider(provider, outcome, elapsed, error=None):
+    PROVIDER_SECONDS.observe(elapsed, provider=provider, outcome=outcome)
+    if error is not None: PROVIDER_ERRORS.inc(provider=provider, error=error)
+    trace = _trace.get()
+    if trace is not None: trace.append((f"{provider}:{outcome}", elapsed))
+
+TELEGRAM_ERRORS = Counter("bot_telegram_errors_total", "Cosmetic Telegram calls that failed and were skipped", ("call", "error"))
+
+def telegram_error(call, error):
+    # Reactions, stickers and notices are best effort; count them instead of hiding them
+    TELEGRAM_ERRORS.inc(call=call, error=type(error).__name__)
@@ -0,0 +1,206 @@
+import time
+import asyncio
+import logging
+import datetime
+import itertools
+
+from telegram.error import RetryAfter
+
+from metrics import Counter
+
+# ================= OUTBOUND TELEGRAM SCHEDULER =================
+# Every Bot API call the media pipeline makes goes through here. One token bucket for the
+# whole bot (~30 messages/s), one per chat (~1/s in private chats, 20/min in groups), and a
+# single dispatcher handing tokens out in priority order: the captioned copy first, then
+# plain replies, cosmetics (reactions, the loading sticker and its delete) last. Calls that
+# don't post a message (reactions, deletes) skip the chat bucket but still respect a chat's
+# flood pause. Cosmetic calls that can't get a slot in time are dropped instead of delaying
+# the result, and a 429's retry_after pauses the chat (or everything, for calls not tied to
+# a chat).
+RESULT, NORMAL, COSMETIC = 0, 1, 2
+PRIORITY_NAMES = {RESULT: "result", NORMAL: "normal", COSMETIC: "cosmetic"}
+
+OUTBOUND_CALLS = Counter("bot_telegram_outbound_total", "Bot API calls through the outbound scheduler by priority and outcome", ("priority", "outcome"))
+FLOOD_WAITS = Counter("bot_telegram_flood_waits_total", "429 RetryAfter answers from Telegram by scope", ("scope",))
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.refilled = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+
+    def wait_time(self, now):
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def give_back(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def full(self, now):
+        self._refill(now)
+        return self.tokens >= self.burst
+
+def retry_seconds(error):
+    value = error.retry_after
+    return value.total_seconds() if isinstance(value, datetime.timedelta) else float(value)
+
+class OutboundScheduler:
+    def __init__(self, global_rate=30.0, global_burst=30, private_rate=1.0, private_burst=3,
+                 group_rate=20 / 60, group_burst=5, cosmetic_wait=2.0, max_retries=3):
+        self._global = TokenBucket(global_rate, global_burst)
+        self.private_rate, self.private_burst = private_rate, private_burst
+        self.group_rate, self.group_burst = group_rate, group_burst
+        self.cosmetic_wait = cosmetic_wait
+        self.max_retries = max_retries
+        self._chats = {}
+        self._paused = {}
+        self._waiters = []
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+        self.sent = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.flood_waits = 0
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Negative ids are groups/channels, which Telegram limits far harder
+            if chat_id < 0: bucket = TokenBucket(self.group_rate, self.group_burst)
+            else: bucket = TokenBucket(self.private_rate, self.private_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _wait_time(self, chat_id, paced, now):
+        wait = max(self._global.wait_time(now), self._paused.get(None, 0) - now)
+        if chat_id is not None:
+            wait = max(wait, self._paused.get(chat_id, 0) - now)
+            if paced: wait = max(wait, self._chat_bucket(chat_id).wait_time(now))
+        return wait
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while True:
+            soonest = None
+            now = time.monotonic()
+            self._waiters.sort()
+            for entry in list(self._waiters):
+                _, _, chat_id, paced, future = entry
+                if future.done():
+                    self._waiters.remove(entry)
+                    continue
+                wait = self._wait_time(chat_id, paced, now)
+                if wait > 0:
+                    soonest = wait if soonest is None else min(soonest, wait)
+                    # Out of global tokens: nobody further down the list may jump the queue
+                    if self._global.wait_time(now) > 0: break
+                    continue
+                self._global.take(now)
+                if chat_id is not None and paced: self._chat_bucket(chat_id).take(now)
+                self._waiters.remove(entry)
+                future.set_result(True)
+
+            self._prune(now)
+            self._wakeup.clear()
+            try: await asyncio.wait_for(self._wakeup.wait(), soonest)
+            except asyncio.TimeoutError: pass
+
+    def _prune(self, now):
+        # Idle chats with a full bucket carry no state worth keeping
+        if len(self._chats) < 1000: return
+        waiting = {entry[2] for entry in self._waiters}
+        for chat_id in [c for c, b in self._chats.items() if c not in waiting and b.full(now)]:
+            del self._chats[chat_id]
+        for key in [k for k, until in self._paused.items() if until <= now]:
+            del self._paused[key]
+
+    async def _acquire(self, chat_id, paced, priority, max_wait):
+        self._ensure_dispatcher()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((priority, next(self._seq), chat_id, paced, future))
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(future, max_wait)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _refund(self, chat_id, paced):
+        self._global.give_back()
+        if chat_id is not None and paced: self._chat_bucket(chat_id).give_back()
+
+    def pause(self, chat_id, seconds):
+        until = time.monotonic() + seconds
+        self._paused[chat_id] = max(self._paused.get(chat_id, 0), until)
+        if self._wakeup: self._wakeup.set()
+
+    async def call(self, fn, chat_id=None, priority=NORMAL, max_wait=None, skip_if=None, paced=True):
+        # fn is a zero-arg coroutine function. Returns its result, or None when a cosmetic call
+        # was dropped (no slot within max_wait, or flood-limited) or skip_if() said it's moot now.
+        # paced=False for calls that don't post into the chat (reactions, deletes).
+        name = PRIORITY_NAMES[priority]
+        if max_wait is None and priority == COSMETIC: max_wait = self.cosmetic_wait
+        attempt = 0
+        while True:
+            if not await self._acquire(chat_id, paced, priority, max_wait):
+                self.dropped += 1
+                OUTBOUND_CALLS.inc(priority=name, outcome="dropped")
+                return None
+            if skip_if and skip_if():
+                self._refund(chat_id, paced)
+                self.skipped += 1
+                OUTBOUND_CALLS.inc(priority=name, outcome="skipped")
+                return None
+            try:
+                result = await fn()
+                self.sent += 1
+                OUTBOUND_CALLS.inc(priority=name, outcome="sent")
+                return result
+            except RetryAfter as e:
+                delay = retry_seconds(e)
+                self.flood_waits += 1
+                FLOOD_WAITS.inc(scope="chat" if chat_id is not None else "global")
+                self.pause(chat_id, delay)
+                logging.warning(f"Telegram flood limit ({'chat ' + str(chat_id) if chat_id is not None else 'global'}), pausing {delay:.0f}s")
+                attempt += 1
+                if priority == COSMETIC or attempt > self.max_retries:
+                    OUTBOUND_CALLS.inc(priority=name, outcome="flood_limited")
+                    if priority == COSMETIC:
+                        self.dropped += 1
+                        return None
+                    raise
+
+    async def stop(self):
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        for *_, future in self._waiters:
+            if not future.done(): future.cancel()
+        self._waiters = []
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "waiting": len(self._waiters),
+            "chats_tracked": len(self._chats),
+            "paused": sum(1 for until in self._paused.values() if until > now),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+            "flood_waits": self.flood_waits,
+        }
@@ -0,0 +1,149 @@
+import io
+import os
+import struct
+import logging
+
+import http_client
+import container_parser
+from container_parser import ByteRanges, NeedMore
+from metrics import stage, BYTES_FETCHED
+
+# ================= RESOLUTION PROBE =================
+# Everything is parsed from memory. The native parser (container_parser.py) goes first: it
+# names the exact byte range it needs next, so a moov behind mdat or Tracks behind a big
+# Void cost one extra range request. Containers it can't read fall back to hachoir: start
+# with the head range, grow it while hachoir still comes up empty, and for MP4s whose moov
+# sits behind mdat jump straight to the tail instead of downloading the whole payload.
+PROBE_INITIAL_BYTES = int(os.getenv("PROBE_INITIAL_BYTES", 64 * 1024))
+PROBE_MAX_BYTES = int(os.getenv("PROBE_MAX_BYTES", 2 * 1024 * 1024))
+PROBE_TAIL_BYTES = int(os.getenv("PROBE_TAIL_BYTES", 4 * 1024 * 1024))
+PROBE_MAX_FETCHES = int(os.getenv("PROBE_MAX_FETCHES", 6))
+PROBE_GROWTH = 4
+
+# hachoir is only the fallback now, so it's imported the first time a file needs it
+_hachoir = None
+
+def _get_hachoir():
+    global _hachoir
+    if _hachoir is None:
+        from hachoir.core import config as hachoir_config
+        from hachoir.parser import createParser
+        from hachoir.metadata import extractMetadata
+        # Partial buffers make hachoir warn about every parser it rules out
+        hachoir_config.quiet = True
+        _hachoir = (createParser, extractMetadata)
+    return _hachoir
+
+def warm():
+    _get_hachoir()
+
+def _hachoir_dimensions(meta):
+    groups = [meta] + (list(meta.iterGroups()) if hasattr(meta, 'iterGroups') else [])
+    for group in groups:
+        if group.has('width') and group.has('height'):
+            return group.get('width'), group.get('height')
+    return None, None
+
+def parse_video_info(data, file_name=None):
+    createParser, extractMetadata = _get_hachoir()
+    parser = createParser(io.BytesIO(data), real_filename=file_name or "probe")
+    if not parser: return None
+    with parser:
+        try: meta = extractMetadata(parser)
+        except Exception as e:
+            logging.debug(f"hachoir could not read {file_name}: {e!r}")
+            return None
+    if not meta: return None
+    width, height = _hachoir_dimensions(meta)
+    if not width or not height: return None
+    return {"width": int(width), "height": int(height), "parser": "hachoir"}
+
+# ================= MP4 LAYOUT =================
+def _is_mp4(buf):
+    return len(buf) >= 8 and buf[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip')
+
+def _mp4_tail_offset(buf, file_size):
+    # Walk the top-level boxes; if one (normally mdat) runs past what we have and moov
+    # hasn't shown up yet, the rest of the metadata starts right after it.
+    offset = 0
+    while offset + 8 <= len(buf):
+        size, kind = struct.unpack('>I4s', buf[offset:offset + 8])
+        if size == 1:
+            if offset + 16 > len(buf): return None
+            size = struct.unpack('>Q', buf[offset + 8:offset + 16])[0]
+        elif size == 0:
+            return None
+        if kind == b'moov' or size < 8: return None
+        if offset + size > len(buf):
+            end = offset + size
+            return (offset, end) if end < file_size else None
+        offset += size
+    return None
+
+# ================= PROBE =================
+async def _fetch(url, start, length, file_size):
+    end = min(start + length, file_size) - 1
+    if end < start: return b''
+    with stage('range_download'): data = await http_client.get_range(url, start, end)
+    BYTES_FETCHED.inc(len(data))
+    return data
+
+async def probe_media(url, file_size, file_name=None, parse=None, native=True):
+    file_size = file_size or PROBE_MAX_BYTES
+    async def read(start, length): return await _fetch(url, start, length, file_size)
+    return await probe_reader(read, file_size, file_name, parse, native)
+
+async def _native_probe(read, ranges):
+    for _ in range(PROBE_MAX_FETCHES):
+        try:
+            with stage('native_parse'): return container_parser.parse(ranges)
+        except NeedMore as e:
+            # The wanted length comes from a size field in the file: never ask for more than the budget has left
+            left = PROBE_MAX_BYTES + PROBE_TAIL_BYTES - ranges.total
+            if left <= 0: return None
+            data = await read(e.offset, min(max(e.length, PROBE_INITIAL_BYTES), left))
+            if not data: return None
+            ranges.add(e.offset, data)
+    return None
+
+async def probe_reader(read, file_size, file_name=None, parse=None, native=True):
+    # read(start, length) returns the bytes of that range (fewer at the end of the file).
+    # `parse` lets callers run the CPU-bound hachoir parse elsewhere (it gets data, file_name).
+    if parse is None:
+        async def parse(data, name): return parse_video_info(data, name)
+
+    ranges = ByteRanges(file_size)
+    ranges.add(0, await read(0, PROBE_INITIAL_BYTES))
+    if native:
+        info = await _native_probe(read, ranges)
+        if info:
+            info["parser"] = "native"
+            info["bytes_read"] = ranges.total
+            return info
+
+    buf = ranges.head()
+    fetched = ranges.total
+    tail = None
+    info = None
+
+    while buf:
+        view = buf
+        if _is_mp4(buf):
+            gap = _mp4_tail_offset(buf, file_size)
+            if gap:
+                if tail is None:
+                    tail = await read(gap[1], PROBE_TAIL_BYTES)
+                    fetched += len(tail)
+                view = buf[:gap[0]] + tail
+
+        with stage('container_parse'): info = await parse(view, file_name)
+        if info: break
+        limit = min(file_size, PROBE_MAX_BYTES)
+        if len(buf) >= limit: break
+        more = await read(len(buf), min(len(buf) * (PROBE_GROWTH - 1), limit - len(buf)))
+        if not more: break
+        fetched += len(more)
+        buf += more
+
+    if info: info["bytes_read"] = fetched
+    return info
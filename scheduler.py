@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from collections import deque
+
+# ================= MEDIA SCHEDULER =================
+# Sits between the MessageHandler and the media pipeline: a fixed number of workers,
+# one FIFO per chat, chats served round-robin so one user's 200-file dump can't starve
+# everybody else, and hard limits on how much can pile up. A chat has at most one job
+# running, so its captioned copies go out in the order the files were sent.
+class QueueFull(Exception):
+    pass
+
+class MediaScheduler:
+    def __init__(self, concurrency=8, max_queue=500, max_per_chat=50):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_per_chat = max_per_chat
+        self._queues = {}
+        self._ring = deque()
+        self._running = set()
+        self._queued = 0
+        self._active = 0
+        self._workers = []
+        self._wakeup = None
+        self._idle = None
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self):
+        if self._workers: return
+        self._wakeup = asyncio.Condition()
+        self._idle = asyncio.Event()
+        if not self._queued and not self._active: self._idle.set()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+
+    async def stop(self, timeout=0):
+        # Queued and running jobs get up to `timeout` seconds to finish; whatever is left is cancelled
+        if self._workers and timeout:
+            try: await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                logging.warning(f"🛑 Cancelling {self._active} running and {self._queued} queued media jobs after {timeout}s")
+        for task in self._workers: task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _jobs_ahead(self, chat_id):
+        # Round-robin estimate: every other chat gets up to as many turns as we wait for
+        own = len(self._queues.get(chat_id, ()))
+        ahead = own
+        for other, queue in self._queues.items():
+            if other != chat_id: ahead += min(len(queue), own + 1)
+        return ahead
+
+    async def submit(self, chat_id, job):
+        # job is a zero-arg coroutine function. Returns how many jobs will start before it
+        # once every worker is busy (0 means it starts right away).
+        queue = self._queues.get(chat_id)
+        if self._queued >= self.max_queue or (queue and len(queue) >= self.max_per_chat):
+            self.rejected += 1
+            raise QueueFull(f"chat {chat_id} has {len(queue or ())} queued, {self._queued} overall")
+
+        ahead = self._jobs_ahead(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = deque()
+            # A chat with a job running rejoins the ring when that job is done
+            if chat_id not in self._running: self._ring.append(chat_id)
+        queue.append(job)
+        self._queued += 1
+        if self._idle: self._idle.clear()
+        async with self._wakeup: self._wakeup.notify()
+        idle = self.concurrency - self._active
+        return max(0, ahead - idle + 1)
+
+    def _next_job(self):
+        chat_id = self._ring.popleft()
+        queue = self._queues[chat_id]
+        job = queue.popleft()
+        if not queue: del self._queues[chat_id]
+        self._running.add(chat_id)
+        self._queued -= 1
+        return chat_id, job
+
+    async def _finished(self, chat_id):
+        self._running.discard(chat_id)
+        if not self._queued and not self._active: self._idle.set()
+        if chat_id in self._queues:
+            self._ring.append(chat_id)
+            async with self._wakeup: self._wakeup.notify()
+
+    async def _worker(self, index):
+        while True:
+            async with self._wakeup:
+                await self._wakeup.wait_for(lambda: self._ring)
+                chat_id, job = self._next_job()
+            self._active += 1
+            try:
+                await job()
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logging.exception(f"Media job failed: {e!r}")
+            finally:
+                self._active -= 1
+                await self._finished(chat_id)
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "queued": self._queued,
+            "chats_waiting": len(self._queues),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+# ================= SINGLE-FLIGHT =================
+# Concurrent callers asking for the same key share one in-flight result instead of each
+# running their own lookup. Waiters are shielded, so one cancelled caller doesn't kill it.
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+        self.shared = 0
+        self.led = 0
+
+    async def do(self, key, factory):
+        future = self._inflight.get(key)
+        if future is not None:
+            self.shared += 1
+        else:
+            self.led += 1
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f, key=key: self._forget(key, f))
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future):
+        if self._inflight.get(key) is future: del self._inflight[key]
+        if not future.cancelled(): future.exception()
+
+    def stats(self):
+        return {"in_flight": len(self._inflight), "led": self.led, "shared": self.shared}
+
+# ================= ARRIVAL ORDER =================
+# Uploads are handled concurrently, and some of them await (a guessit parse) before they
+# are queued while others don't. Each upload takes a per-chat ticket the moment it arrives,
+# before any await; wait_turn() then holds it until every earlier upload of that chat has
+# called done(), so they reach the queue in the order they were sent.
+class ArrivalOrder:
+    def __init__(self):
+        self._next = {}
+        self._head = {}
+        self._done = {}
+        self._changed = {}
+
+    def ticket(self, chat_id):
+        ticket = self._next.get(chat_id, 0)
+        self._next[chat_id] = ticket + 1
+        self._head.setdefault(chat_id, ticket)
+        return ticket
+
+    async def wait_turn(self, chat_id, ticket):
+        while self._head[chat_id] != ticket:
+            event = self._changed.setdefault(chat_id, asyncio.Event())
+            await event.wait()
+
+    def done(self, chat_id, ticket):
+        # Safe for tickets that never waited for their turn (the upload failed before it was queued)
+        finished = self._done.setdefault(chat_id, set())
+        finished.add(ticket)
+        head = self._head[chat_id]
+        while head in finished:
+            finished.discard(head)
+            head += 1
+        if head == self._next[chat_id]:
+            for table in (self._next, self._head, self._done): table.pop(chat_id, None)
+        else:
+            self._head[chat_id] = head
+        event = self._changed.pop(chat_id, None)
+        if event: event.set()
+
+    def stats(self):
+        return {"chats_waiting": sum(1 for chat_id in self._head if self._next[chat_id] - self._head[chat_id] > 1)}
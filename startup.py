@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import builtins
+import threading
+from contextlib import contextmanager
+
+# ================= STARTUP PROFILE =================
+# Where a cold start goes. Phases and the time from process start to the first update are
+# always recorded (they're on /stats); `python bot.py --profile-startup` additionally times
+# every import bot.py makes (inclusive of what that import pulls in), prints it all and exits.
+def _process_age():
+    # Seconds since the kernel started this process, so interpreter start-up counts too (Linux only)
+    try:
+        with open("/proc/uptime") as f: uptime = float(f.read().split()[0])
+        with open("/proc/self/stat") as f: ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        return max(0.0, uptime - ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+PROCESS_STARTED = time.time() - _process_age()
+_last_checkpoint = time.time()
+_phases = [("interpreter start-up", _last_checkpoint - PROCESS_STARTED)]
+_imports = {}
+_ready = None
+_first_update = None
+_depth = 0
+_original_import = builtins.__import__
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _depth
+    # Background warm-up imports in threads show up as phases instead
+    if level or name in sys.modules or threading.current_thread() is not threading.main_thread(): return _original_import(name, globals, locals, fromlist, level)
+    _depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        # Only imports made directly by our own code; nested ones are part of their parent's time
+        if _depth == 0: _imports[name] = _imports.get(name, 0.0) + time.perf_counter() - start
+
+def install():
+    builtins.__import__ = _timed_import
+
+def uninstall():
+    builtins.__import__ = _original_import
+
+def checkpoint(name):
+    # Time since the previous checkpoint (the first one counts from this module's import)
+    global _last_checkpoint
+    now = time.time()
+    _phases.append((name, now - _last_checkpoint))
+    _last_checkpoint = now
+
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try: yield
+    finally: _phases.append((name, time.perf_counter() - start))
+
+def ready():
+    # Called once the bot can take updates; everything after this is off the critical path
+    global _ready
+    if _ready is None: _ready = time.time() - PROCESS_STARTED
+
+def first_update():
+    global _first_update
+    if _first_update is None: _first_update = time.time() - PROCESS_STARTED
+
+def stats():
+    return {
+        "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in _phases},
+        "ready_after_s": round(_ready, 3) if _ready is not None else None,
+        "first_update_after_s": round(_first_update, 3) if _first_update is not None else None,
+    }
+
+def report(top=25):
+    if _ready is not None: print(f"⏱️  ready for updates {_ready:.3f}s after process start\n")
+    if _imports:
+        print("📦 imports (inclusive, first import only):")
+        for name, seconds in sorted(_imports.items(), key=lambda i: -i[1])[:top]:
+            print(f"   {name:<36} {seconds * 1000:8.1f} ms")
+        print(f"   {'total':<36} {sum(_imports.values()) * 1000:8.1f} ms\n")
+    print("🚦 phases:")
+    for name, seconds in _phases:
+        print(f"   {name:<36} {seconds * 1000:8.1f} ms")
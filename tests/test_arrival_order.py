@@ -0,0 +1,58 @@
+import os
+import sys
+import asyncio
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "1:test")
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp())
+
+import bot
+
+# ================= PER-CHAT UPLOAD ORDER =================
+# A name the fast path can't parse awaits guessit before it is queued; a later scene name
+# doesn't. The queue must still see the chat's files in the order they were sent.
+GUESSIT_NAME = "[Sub] Some Random Home Video Final v2.mkv"
+SCENE_NAME = "Movie.Name.2020.1080p.WEB-DL.x264.mkv"
+
+def upload(message_id, name, chat_id=1):
+    message = SimpleNamespace(message_id=message_id, chat=SimpleNamespace(id=chat_id), media_group_id=None,
+                              document=SimpleNamespace(file_name=name), video=None)
+    return SimpleNamespace(message=message)
+
+def queue_all(monkeypatch, uploads):
+    submitted = []
+    async def submit_media(chat_id, updates, context):
+        submitted.append([u.message.message_id for u in updates])
+    async def parse(clean_name):
+        parsed = bot.fast_parse(clean_name)
+        if parsed: return parsed
+        await asyncio.sleep(0.05)
+        return {"title": clean_name}
+    monkeypatch.setattr(bot, "submit_media", submit_media)
+    monkeypatch.setattr(bot, "parse_filename_offloaded", parse)
+
+    async def run():
+        await asyncio.gather(*(bot.queue_media(u, None) for u in uploads))
+        await bot.MEDIA_BATCHER.drain()
+    asyncio.run(run())
+    return submitted
+
+def test_slow_parse_is_not_overtaken(monkeypatch):
+    assert queue_all(monkeypatch, [upload(1, GUESSIT_NAME), upload(2, SCENE_NAME)]) == [[1], [2]]
+
+def test_open_batch_goes_before_a_later_single_file(monkeypatch):
+    uploads = [upload(1, "Show.Name.S01E01.1080p.WEB-DL.x264.mkv"), upload(2, "Show.Name.S01E02.1080p.WEB-DL.x264.mkv"),
+               upload(3, GUESSIT_NAME), upload(4, SCENE_NAME)]
+    assert queue_all(monkeypatch, uploads) == [[1, 2], [3], [4]]
+
+def test_failed_upload_releases_its_turn():
+    order = bot.ArrivalOrder()
+    async def run():
+        first, second = order.ticket(7), order.ticket(7)
+        order.done(7, first)
+        await asyncio.wait_for(order.wait_turn(7, second), 1)
+        order.done(7, second)
+    asyncio.run(run())
+    assert order.stats() == {"chats_waiting": 0}
@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import candidates
+from cache import normalize_key
+
+# ================= CACHE KEYS =================
+# METADATA_CACHE, the single-flight and the batch "show:" key all go through normalize_key,
+# so two different titles sharing a key means one file gets the other's caption.
+def test_non_latin_titles_keep_distinct_keys():
+    assert normalize_key("दंगल", 2016, False, False) != normalize_key("बाहुबली", 2016, False, False)
+    assert normalize_key("鬼滅の刃", None, False, False) != normalize_key("进击的巨人", None, False, False)
+    assert normalize_key("दंगल", 2016, False, False) != "|2016|0|0"
+
+def test_latin_keys_unchanged():
+    assert normalize_key("The Dark Knight!", 2008, True, False) == "the dark knight|2008|1|0"
+    assert normalize_key("Spy_x.Family", None) == "spy x family|"
+
+def test_non_latin_candidates_survive():
+    # RE-VERIFY ranks and dedupes with the same folding
+    assert candidates.similarity("दंगल", "दंगल") == 1.0
+    assert len(candidates.merge([], [{"title": "दंगल", "date": "2016"}, {"title": "बाहुबली", "date": "2015"}])) == 2
@@ -0,0 +1,55 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import probe
+import container_parser
+from container_parser import ByteRanges
+from filename_parser import track_languages
+from benchmarks import media
+
+# ================= AUDIO TRACK LANGUAGES =================
+def parse(data):
+    ranges = ByteRanges(len(data))
+    ranges.add(0, data)
+    return container_parser.parse(ranges)
+
+def test_mp4_tagged_language():
+    assert container_parser.audio_languages(parse(media.mp4(langs=("hin", "eng")))) == ["hin", "eng"]
+
+def test_mp4_unspecified_and_macintosh_codes_are_untagged():
+    # 0 and the QuickTime Macintosh codes (< 0x400) must not turn into a language,
+    # or the caption loses the filename's languages to garbage
+    for packed in (None, 0, 5):
+        info = parse(media.mp4(langs=(packed,)))
+        assert info["width"] == 1920
+        assert container_parser.audio_languages(info) == []
+        assert track_languages(container_parser.audio_languages(info)) is None
+
+def test_mkv_without_language_element_is_english():
+    # Matroska's default for a missing Language element is "eng"
+    info = parse(media.mkv(langs=(None, "jpn")))
+    assert container_parser.audio_languages(info) == ["eng", "jpn"]
+
+# ================= HOSTILE SIZES =================
+def test_child_running_past_its_parent_is_rejected():
+    tracks = media._el(0xAE, media._uint(0xD7, 1) + b"\x86" + media._vint(1000) + b"V_MPEG4")
+    data = media.mkv()
+    at = data.index(b"\x16\x54\xAE\x6B")
+    assert parse(data[:at] + media._el(0x1654AE6B, tracks) + data[at:]) is None
+
+def test_probe_never_reads_past_its_budget():
+    # Every level claims ~300 MB, so the CodecID read looks legitimate all the way down
+    huge = 300_000_000
+    entry = b"\xAE" + media._vint(huge + 100) + media._uint(0xD7, 1) + media._uint(0x83, 1) + b"\x86" + media._vint(huge)
+    tracks = b"\x16\x54\xAE\x6B" + media._vint(huge + 200) + entry
+    data = media._el(0x1A45DFA3, media._str(0x4282, "matroska")) + b"\x18\x53\x80\x67" + media._vint(huge + 300) + tracks
+    requested = []
+    async def read(start, length):
+        requested.append(length)
+        return data[start:start + length].ljust(length, b"\0")
+    assert asyncio.run(probe.probe_reader(read, huge + 1000, "hostile.mkv")) is None
+    assert max(requested) < huge
+    assert sum(requested) <= probe.PROBE_MAX_BYTES + probe.PROBE_TAIL_BYTES
@@ -0,0 +1,36 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import MediaScheduler
+
+# ================= SHUTDOWN DRAIN =================
+# stop() lets the queue finish within its timeout and only cancels what is still left after it.
+def run_jobs(delay, timeout, jobs=4):
+    async def main():
+        scheduler = MediaScheduler(concurrency=1)
+        scheduler.start()
+        done = []
+        for i in range(jobs):
+            async def job(i=i):
+                await asyncio.sleep(delay)
+                done.append(i)
+            await scheduler.submit(1, job)
+        await scheduler.stop(timeout)
+        return done, scheduler.stats()
+    return asyncio.run(main())
+
+def test_stop_drains_queue():
+    done, stats = run_jobs(delay=0.01, timeout=5)
+    assert done == [0, 1, 2, 3]
+    assert stats["queued"] == 0 and stats["active"] == 0
+
+def test_stop_cancels_after_timeout():
+    done, stats = run_jobs(delay=0.2, timeout=0.3)
+    assert done == [0]
+
+def test_stop_without_timeout_cancels_now():
+    done, _ = run_jobs(delay=0.01, timeout=0)
+    assert done == []
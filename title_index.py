@@ -0,0 +1,271 @@
+import os
+import re
+import sys
+import gzip
+import json
+import mmap
+import time
+import bisect
+import struct
+import difflib
+import logging
+import argparse
+import array
+import unicodedata
+from collections import defaultdict
+
+from cache import CACHE_DIR
+
+# ================= OFFLINE TITLE INDEX =================
+# Built from TMDB's daily id exports (movie_ids_*.json.gz / tv_series_ids_*.json.gz: id,
+# original title, popularity) into one memory-mapped file:
+#
+#   header | title records | token records | postings (uint32) | strings
+#
+# Titles are sorted by popularity, so every postings list is already best-first and a
+# lookup only ever reads the head of it. Exports carry the *original* title only: "Dune"
+# and "The Dark Knight" resolve locally, "Parasite" (기생충) doesn't and falls back to search.
+TITLE_INDEX_PATH = os.getenv("TITLE_INDEX_PATH", os.path.join(CACHE_DIR, "title_index.bin"))
+INDEX_MIN_SCORE = float(os.getenv("TITLE_INDEX_MIN_SCORE", 0.88))
+INDEX_SCAN_LIMIT = int(os.getenv("TITLE_INDEX_SCAN_LIMIT", 2000))
+EXPORT_URL = "http://files.tmdb.org/p/exports/{kind}_ids_{date}.json.gz"
+
+MAGIC = b"TTLIDX01"
+HEADER = struct.Struct("<8sIII")         # magic, titles, tokens, postings
+TITLE = struct.Struct("<IfIHBx")         # tmdb id, popularity, name offset, name length, kind
+TOKEN = struct.Struct("<IIIHxx")         # postings offset, postings count, token offset, token length
+KINDS = ("movie", "tv")
+
+RE_APOSTROPHE = re.compile(r"['’`]")
+RE_TOKEN = re.compile(r"\w+")
+
+def normalize(title):
+    # Accents off, case folded, apostrophes dropped ("Schindler's" == "Schindlers"), punctuation -> space
+    text = unicodedata.normalize("NFKD", str(title))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(RE_TOKEN.findall(RE_APOSTROPHE.sub("", text.casefold())))
+
+# ================= IMPORTER =================
+def read_export(path, kind, min_popularity):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try: rec = json.loads(line)
+            except ValueError: continue
+            if rec.get("adult"): continue
+            popularity = float(rec.get("popularity") or 0)
+            if popularity < min_popularity: continue
+            name = normalize(rec.get("original_title") or rec.get("original_name") or "")
+            if name: yield popularity, int(rec["id"]), KINDS.index(kind), name
+
+def build(sources, out_path=TITLE_INDEX_PATH, min_popularity=1.0):
+    entries = []
+    for path, kind in sources: entries.extend(read_export(path, kind, min_popularity))
+    entries.sort(key=lambda e: -e[0])
+
+    titles, strings = bytearray(), bytearray()
+    postings = defaultdict(list)
+    for i, (popularity, tmdb_id, kind, name) in enumerate(entries):
+        raw = name.encode()[:0xFFFF]
+        titles += TITLE.pack(tmdb_id, popularity, len(strings), len(raw), kind)
+        strings += raw
+        for token in set(name.split()): postings[token].append(i)
+
+    tokens, flat = bytearray(), []
+    for token in sorted(postings, key=lambda t: t.encode()):
+        raw = token.encode()
+        tokens += TOKEN.pack(len(flat), len(postings[token]), len(strings), len(raw))
+        strings += raw
+        flat.extend(postings[token])
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(entries), len(postings), len(flat)))
+        f.write(titles)
+        f.write(tokens)
+        packed = array.array("I", flat)
+        if sys.byteorder != "little": packed.byteswap()
+        f.write(packed.tobytes())
+        f.write(strings)
+    os.replace(tmp, out_path)
+    return len(entries), len(postings)
+
+def download(date, directory):
+    # date as MM_DD_YYYY, the way TMDB names the files (published daily around 08:00 UTC)
+    import httpx
+    paths = []
+    for kind, export in (("movie", "movie"), ("tv", "tv_series")):
+        url = EXPORT_URL.format(kind=export, date=date)
+        path = os.path.join(directory, os.path.basename(url))
+        with httpx.stream("GET", url, timeout=60, follow_redirects=True) as res:
+            res.raise_for_status()
+            with open(path, "wb") as f:
+                for chunk in res.iter_bytes(): f.write(chunk)
+        paths.append((path, kind))
+    return paths
+
+# ================= LOOKUP =================
+class _Tokens:
+    # Sequence view over the sorted token table, so bisect can search the mmap directly
+    def __init__(self, index): self.index = index
+    def __len__(self): return self.index.token_count
+    def __getitem__(self, i): return self.index._token_bytes(i)
+
+class TitleIndex:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.title_count, self.token_count, self.posting_count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC: raise ValueError(f"{path} is not a title index")
+        self._titles_at = HEADER.size
+        self._tokens_at = self._titles_at + self.title_count * TITLE.size
+        self._postings_at = self._tokens_at + self.token_count * TOKEN.size
+        self._strings_at = self._postings_at + self.posting_count * 4
+        self._token_seq = _Tokens(self)
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def _string(self, offset, length):
+        start = self._strings_at + offset
+        return self._mm[start:start + length]
+
+    def _token_bytes(self, i):
+        _, _, offset, length = TOKEN.unpack_from(self._mm, self._tokens_at + i * TOKEN.size)
+        return self._string(offset, length)
+
+    def title(self, i):
+        tmdb_id, popularity, offset, length, kind = TITLE.unpack_from(self._mm, self._titles_at + i * TITLE.size)
+        return {"id": tmdb_id, "kind": KINDS[kind], "popularity": round(popularity, 3), "title": self._string(offset, length).decode()}
+
+    def _postings(self, token, limit):
+        raw = token.encode()
+        i = bisect.bisect_left(self._token_seq, raw)
+        if i >= self.token_count or self._token_bytes(i) != raw: return None
+        offset, count, _, _ = TOKEN.unpack_from(self._mm, self._tokens_at + i * TOKEN.size)
+        count = min(count, limit)
+        return struct.unpack_from(f"<{count}I", self._mm, self._postings_at + offset * 4)
+
+    def _close_tokens(self, token, scan=400):
+        # Typos: compare against the tokens sharing the first two characters only
+        prefix = token[:2].encode()
+        start = bisect.bisect_left(self._token_seq, prefix)
+        pool = []
+        for i in range(start, min(start + scan, self.token_count)):
+            raw = self._token_bytes(i)
+            if not raw.startswith(prefix): break
+            pool.append(raw.decode())
+        return difflib.get_close_matches(token, pool, n=2, cutoff=0.8)
+
+    def search(self, query, limit=3, min_score=INDEX_MIN_SCORE):
+        wanted = normalize(query)
+        tokens = wanted.split()
+        if not tokens: return []
+
+        lists = []
+        for token in set(tokens):
+            found = self._postings(token, INDEX_SCAN_LIMIT)
+            if found is None:
+                for near in self._close_tokens(token):
+                    found = (found or ()) + self._postings(near, INDEX_SCAN_LIMIT)
+            if found: lists.append(set(found))
+        if not lists: return []
+
+        # Titles carrying all (or all but one) of the query's words; the rest can't score high anyway
+        need = max(1, len(lists) - 1)
+        hits = defaultdict(int)
+        for found in lists:
+            for i in found: hits[i] += 1
+
+        scored = []
+        for i, shared in hits.items():
+            if shared < need: continue
+            entry = self.title(i)
+            ratio = difflib.SequenceMatcher(None, wanted, entry["title"]).ratio()
+            if ratio < min_score: continue
+            entry["score"] = round(ratio, 3)
+            scored.append(entry)
+        # Same score (remakes, same-name shows): the more popular one first
+        scored.sort(key=lambda e: (-e["score"], -e["popularity"]))
+        return scored[:limit]
+
+# ================= LAZY SINGLETON =================
+_index = None
+_missing = False
+_stats = {"lookups": 0, "matched": 0, "lookup_ms": 0.0}
+
+def get_index():
+    global _index, _missing
+    if _index is None and not _missing:
+        if not os.path.exists(TITLE_INDEX_PATH):
+            _missing = True
+            logging.info(f"No title index at {TITLE_INDEX_PATH}, TMDB lookups use free-text search")
+            return None
+        try:
+            _index = TitleIndex(TITLE_INDEX_PATH)
+            logging.info(f"📇 Title index loaded: {_index.title_count} titles, {_index.token_count} tokens")
+        except Exception as e:
+            _missing = True
+            logging.warning(f"Title index at {TITLE_INDEX_PATH} unusable: {e!r}")
+    return _index
+
+def warm():
+    # Opening is just an mmap; touching the token table pulls the hot pages in before the first lookup
+    index = get_index()
+    if index: index._token_bytes(index.token_count // 2)
+
+def lookup(query, limit=3):
+    index = get_index()
+    if index is None: return []
+    start = time.perf_counter()
+    try: found = index.search(query, limit)
+    except Exception as e:
+        logging.warning(f"Title index lookup failed for '{query}': {e!r}")
+        found = []
+    _stats["lookups"] += 1
+    _stats["matched"] += bool(found)
+    _stats["lookup_ms"] += (time.perf_counter() - start) * 1000
+    return found
+
+def stats():
+    index = _index
+    return {
+        "path": TITLE_INDEX_PATH,
+        "loaded": index is not None,
+        "titles": index.title_count if index else 0,
+        "lookups": _stats["lookups"],
+        "matched": _stats["matched"],
+        "avg_lookup_ms": round(_stats["lookup_ms"] / _stats["lookups"], 3) if _stats["lookups"] else 0,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Build or query the offline TMDB title index")
+    ap.add_argument("--movies", help="movie_ids_MM_DD_YYYY.json.gz")
+    ap.add_argument("--tv", help="tv_series_ids_MM_DD_YYYY.json.gz")
+    ap.add_argument("--download", metavar="MM_DD_YYYY", help="fetch both exports for that day from files.tmdb.org first")
+    ap.add_argument("--out", default=TITLE_INDEX_PATH)
+    ap.add_argument("--min-popularity", type=float, default=1.0, help="drop the long tail nobody forwards")
+    ap.add_argument("--query", action="append", default=[], help="look a title up in --out (repeatable)")
+    args = ap.parse_args()
+
+    sources = [(p, k) for p, k in ((args.movies, "movie"), (args.tv, "tv")) if p]
+    if args.download: sources = download(args.download, os.path.dirname(args.out) or ".")
+    if sources:
+        start = time.perf_counter()
+        titles, tokens = build(sources, args.out, args.min_popularity)
+        print(f"📇 {titles} titles, {tokens} tokens -> {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB, {time.perf_counter() - start:.1f}s)")
+
+    if args.query:
+        index = TitleIndex(args.out)
+        for q in args.query:
+            start = time.perf_counter()
+            found = index.search(q)
+            print(f"🔎 {q!r} ({(time.perf_counter() - start) * 1000:.2f} ms): {found}")
+    if not sources and not args.query: ap.print_help()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
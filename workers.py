@@ -0,0 +1,60 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# ================= CPU WORKER POOL =================
+# guessit and hachoir are pure-Python CPU work; running them here keeps the event loop free
+# for callbacks and /start. WORKER_MODE=process spreads them over every core in the container.
+WORKER_MODE = os.getenv("WORKER_MODE", "thread").lower()
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", os.cpu_count() or 2))
+WORKER_TIMEOUT = float(os.getenv("WORKER_TIMEOUT", 10))
+
+_executor = None
+_stats = {"submitted": 0, "completed": 0, "failed": 0, "timeouts": 0, "cancelled": 0}
+_pending = 0
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        if WORKER_MODE == "process":
+            # spawn, not fork: by now this process has an event loop, sockets and threads
+            _executor = ProcessPoolExecutor(max_workers=WORKER_COUNT, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            _executor = ThreadPoolExecutor(max_workers=WORKER_COUNT, thread_name_prefix="cpu-worker")
+        logging.info(f"CPU worker pool ready: {WORKER_COUNT} {WORKER_MODE} worker(s)")
+    return _executor
+
+async def run_cpu(func, *args, timeout=None):
+    # func and args must be picklable in process mode (module-level functions, plain data)
+    global _pending
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_executor(), func, *args)
+    _stats["submitted"] += 1
+    _pending += 1
+    try:
+        result = await asyncio.wait_for(future, timeout or WORKER_TIMEOUT)
+        _stats["completed"] += 1
+        return result
+    except asyncio.TimeoutError:
+        # Queued work is dropped; a job already running finishes in the background and is discarded
+        _stats["timeouts"] += 1
+        raise
+    except asyncio.CancelledError:
+        _stats["cancelled"] += 1
+        raise
+    except Exception:
+        _stats["failed"] += 1
+        raise
+    finally:
+        _pending -= 1
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def stats():
+    return {"mode": WORKER_MODE, "workers": WORKER_COUNT, "pending": _pending, **_stats}